@@ -15,25 +15,72 @@ class Settings(BaseSettings):
     supabase_url: Optional[str] = None
     supabase_service_key: Optional[str] = None
     supabase_storage_bucket: Optional[str] = None
+    job_aggregate_function: Optional[str] = "get_job_aggregate"
+    job_metrics_merge_function: Optional[str] = "merge_job_metrics"
+    job_metrics_append_function: Optional[str] = "append_job_metrics_item"
+    discrepancy_totals_function: Optional[str] = "job_discrepancy_totals"
+    progress_flush_window_seconds: float = 0.5
+    repository_pool_size: int = 16
+    job_repository_backend: str = "supabase"
+    job_repository_sqlite_path: Optional[str] = None
 
     azure_storage_connection_string: Optional[str] = None
     azure_storage_container: Optional[str] = None
+    # None picks "azure" or "supabase" when that storage is configured, else "local"
+    artifact_backend: Optional[str] = None
+    # Set to a directory the API and the Celery workers share to allow the local backend with Celery
+    artifact_dir: Optional[str] = None
 
     azure_afr_endpoint: Optional[str] = None
     azure_afr_api_key: Optional[str] = None
     azure_afr_contract_model_id: str = "prebuilt-contract"
+    azure_split_min_pages: int = 100
+    azure_page_range_size: int = 50
+    azure_page_range_concurrency: int = 4
+
+    pdf_text_workers: Optional[int] = None
+    pdf_text_shard_pages: int = 50
+    pdf_text_cache_max_bytes: int = 256 * 1024 * 1024
+    clause_validation_threshold: float = 0.75
 
     openai_api_key: Optional[str] = None
     openai_model: str = "gpt-4o-mini"
     openai_embedding_model: str = "text-embedding-ada-002"
+    deep_insights_mode: str = "single_call"
+    # Model-call seconds (latency.calls_seconds) measured with deep_insights_mode = "two_call";
+    # when set, every run records its delta against this baseline
+    deep_insights_two_call_baseline_seconds: Optional[float] = None
+    llm_summary_concurrency: int = 8
+    fallback_extraction_concurrency: int = 4
+    llm_reduce_group_size: int = 8
+    llm_digest_cache_max_bytes: int = 64 * 1024 * 1024
 
     rag_contract_table: str = "contract_chunks"
     rag_billing_table: str = "billing_chunks"
+    rag_vector_backend: str = "supabase"
+    rag_match_function: Optional[str] = "match_rag_chunks"
+    rag_local_index_dir: Optional[str] = None
+    rag_ivf_nprobe: int = 16
+    rag_local_exact_threshold: int = 5000
+    rag_vector_dtype: str = "int8"
+    rag_rescore_factor: int = 4
+    rag_cache_max_bytes: int = 256 * 1024 * 1024
+    rag_cache_ttl_seconds: float = 600.0
+    rag_embedding_concurrency: int = 4
+    rag_embedding_tokens_per_minute: int = 1_000_000
+    rag_embedding_max_retries: int = 4
+    rag_retrieval_mode: str = "hybrid"
+    rag_lexical_index_dir: Optional[str] = None
+    rag_rrf_k: int = 60
 
     supabase_jwt_secret: Optional[str] = None
 
     redis_broker_url: str = "redis://localhost:6379/0"
     redis_result_backend: str = "redis://localhost:6379/1"
+    stream_redis_url: Optional[str] = None
+    job_cache_redis_url: Optional[str] = None
+    job_cache_ttl_seconds: float = 5.0
+    job_cache_max_bytes: int = 64 * 1024 * 1024
 
     class Config:
         env_file = ".env"
@@ -1,6 +1,58 @@
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+class MetricsDict(dict):
+    """
+    ``dict`` that records which top-level keys changed since the last save, so
+    ``job_repository.save_metrics`` can persist a patch instead of the blob.
+    In-place mutation of a nested value must be flagged with ``mark_dirty``;
+    ``setdefault`` flags its key because callers usually mutate the result.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.dirty: Set[str] = set()
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        super().__setitem__(key, value)
+        self.dirty.add(key)
+
+    def __delitem__(self, key: str) -> None:
+        super().__delitem__(key)
+        self.dirty.add(key)
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        self.dirty.add(key)
+        return super().setdefault(key, default)
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        changes = dict(*args, **kwargs)
+        super().update(changes)
+        self.dirty.update(changes)
+
+    def pop(self, key: str, *default: Any) -> Any:
+        if key in self:
+            self.dirty.add(key)
+        return super().pop(key, *default)
+
+    def clear(self) -> None:
+        self.dirty.update(self)
+        super().clear()
+
+    def mark_dirty(self, *keys: str) -> None:
+        self.dirty.update(keys)
+
+    def mark_clean(self) -> None:
+        self.dirty.clear()
+
+    def take_changes(self) -> Tuple[Dict[str, Any], List[str]]:
+        """(patch of changed keys, removed keys) since the last save; resets tracking."""
+        patch = {key: self[key] for key in self.dirty if key in self}
+        removed = sorted(key for key in self.dirty if key not in self)
+        self.dirty.clear()
+        return patch, removed
 
 
 @dataclass
@@ -10,7 +62,7 @@ class Job:
     created_at: datetime = field(default_factory=datetime.utcnow)
     status: str = "queued"
     message: Optional[str] = None
-    metrics: Dict = field(default_factory=dict)
+    metrics: Dict = field(default_factory=MetricsDict)
     stages: List[Dict] = field(
         default_factory=lambda: [
             {"name": "upload", "status": "pending"},
@@ -22,5 +74,7 @@ class Job:
     discrepancies: List[Dict] = field(default_factory=list)
     contracts: List[Dict] = field(default_factory=list)
     billing_records: List[Dict] = field(default_factory=list)
+    # Which job_repository projection this instance was loaded with
+    projection: str = "full"
 
 
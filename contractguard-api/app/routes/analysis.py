@@ -1,16 +1,23 @@
 import asyncio
-from fastapi import APIRouter, Depends, HTTPException
+import json
+import logging
+from typing import Any, Dict, List, Literal, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 
 from app.auth import require_user
-from app.schemas import AnalysisSummary, JobStatus, ChatRequest, ChatResponse
-from app.services import job_manager, rag_store
+from app.schemas import AnalysisSummary, JobStatus, ChatRequest, ChatResponse, DiscrepancyPage, DiscrepancyTotals
+from app.services import job_manager, job_repository_async, rag_store, token_stream
 from app.config import get_settings
 
 try:
-    from openai import OpenAI
+    from openai import AsyncOpenAI, OpenAI
 except ImportError:
+    AsyncOpenAI = None
     OpenAI = None
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
 
 _chat_client = None
@@ -20,14 +27,57 @@ if OpenAI and getattr(settings, "openai_api_key", None):
     except Exception:
         _chat_client = None
 
+_async_chat_client = None
+if AsyncOpenAI and getattr(settings, "openai_api_key", None):
+    try:
+        _async_chat_client = AsyncOpenAI(api_key=settings.openai_api_key)
+    except Exception:
+        _async_chat_client = None
+
+_CHAT_FALLBACK_NOTE = "\n\n(I could not reach the AI service, so here is the contextual summary instead.)"
+_SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
 router = APIRouter()
 
 
+DiscrepancySort = Literal["value", "priority", "due"]
+
+
+class DiscrepancyQuery:
+    """Query parameters shared by the paginated discrepancy endpoints."""
+
+    def __init__(
+        self,
+        sort: DiscrepancySort = "value",
+        limit: int = Query(100, ge=1, le=500),
+        cursor: Optional[str] = None,
+        priority: Optional[str] = None,
+        customer: Optional[str] = None,
+        discrepancy_type: Optional[str] = Query(None, alias="type"),
+    ):
+        self.sort = sort
+        self.limit = limit
+        self.cursor = cursor
+        self.filters = {"priority": priority, "customer": customer, "type": discrepancy_type}
+
+    async def fetch(self, job_id: str) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        try:
+            return await job_repository_async.query_discrepancies(job_id, self.sort, self.limit, self.cursor, self.filters)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
 @router.get("/{job_id}/summary", response_model=AnalysisSummary)
-async def analysis_summary(job_id: str, current_user=Depends(require_user)) -> AnalysisSummary:
-    job = job_manager.get_job(job_id, current_user.get("organization_id"))
+async def analysis_summary(
+    job_id: str,
+    page: DiscrepancyQuery = Depends(),
+    current_user=Depends(require_user),
+) -> AnalysisSummary:
+    """Job status and metrics with the first (or ``cursor``) page of discrepancies."""
+    job = await job_manager.get_job_async(job_id, current_user.get("organization_id"), projection="summary")
     if not job:
         raise HTTPException(status_code=404, detail="Job not found.")
+    discrepancies, next_cursor = await page.fetch(job.id)
     job_status = JobStatus(
         job_id=job.id,
         created_at=job.created_at,
@@ -36,21 +86,91 @@ async def analysis_summary(job_id: str, current_user=Depends(require_user)) -> A
         stages=job.stages,
         metrics=job.metrics,
     )
-    return AnalysisSummary(job=job_status, discrepancies=job.discrepancies)
+    return AnalysisSummary(job=job_status, discrepancies=discrepancies, next_cursor=next_cursor)
 
 
-@router.post("/{job_id}/chat", response_model=ChatResponse)
-async def insights_chat(job_id: str, payload: ChatRequest, current_user=Depends(require_user)) -> ChatResponse:
-    job = job_manager.get_job(job_id, current_user.get("organization_id"))
+@router.get("/{job_id}/discrepancies", response_model=DiscrepancyPage)
+async def list_discrepancies(
+    job_id: str,
+    page: DiscrepancyQuery = Depends(),
+    current_user=Depends(require_user),
+) -> DiscrepancyPage:
+    """One page of discrepancies without reloading the job's metrics."""
+    job = await job_manager.get_job_async(job_id, current_user.get("organization_id"), projection="status")
     if not job:
         raise HTTPException(status_code=404, detail="Job not found.")
+    discrepancies, next_cursor = await page.fetch(job.id)
+    return DiscrepancyPage(discrepancies=discrepancies, next_cursor=next_cursor)
+
+
+@router.get("/{job_id}/discrepancies/totals", response_model=DiscrepancyTotals)
+async def discrepancy_totals(job_id: str, current_user=Depends(require_user)) -> DiscrepancyTotals:
+    """Discrepancy count and value overall, by priority and by customer."""
+    job = await job_manager.get_job_async(job_id, current_user.get("organization_id"), projection="status")
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return DiscrepancyTotals(**await job_repository_async.discrepancy_totals(job.id))
+
+
+def _sse(event: Dict[str, Any]) -> str:
+    return f"data: {json.dumps(event, default=str)}\n\n"
+
+
+@router.get("/{job_id}/summary/stream")
+async def stream_llm_summary(job_id: str, current_user=Depends(require_user)) -> StreamingResponse:
+    """Server-Sent Events stream of the deep-insights summary while it is generated."""
+    job = await job_manager.get_job_async(job_id, current_user.get("organization_id"), projection="summary")
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+
+    def _finished_event(current) -> Optional[Dict[str, Any]]:
+        llm_stage = next((stage for stage in current.stages if stage["name"] == "llm_extraction"), {})
+        if llm_stage.get("status") == "completed" and current.metrics.get("llm_summary"):
+            return {"type": "done", "text": current.metrics["llm_summary"]}
+        if current.status == "failed" or llm_stage.get("status") == "failed":
+            return {"type": "error", "message": current.message or "Analysis failed."}
+        return None
+
+    async def _poll_finished() -> Optional[Dict[str, Any]]:
+        # Ends the stream from stored state when events cannot reach this process
+        current = await job_manager.get_job_async(job.id, projection="summary")
+        return _finished_event(current) if current else {"type": "error", "message": "Job not found."}
 
-    context_summary = f"Vendor: {job.vendor_name}\nRecoverable amount: {job.metrics.get('recoverable_amount', 0)}\nDiscrepancies: {len(job.discrepancies)}"
+    async def _events():
+        finished = _finished_event(job)
+        if finished:
+            yield _sse(finished)
+            return
+        async for event in token_stream.subscribe(job.id, "summary", poll_finished=_poll_finished):
+            yield _sse(event)
+
+    return StreamingResponse(_events(), media_type="text/event-stream", headers=_SSE_HEADERS)
+
+
+async def _build_chat_context(job, question: str) -> Tuple[str, List[Dict[str, Any]], str, str]:
+    """Returns (context_summary, contexts, base_answer, prompt) for a chat question."""
+    # Summary-projected jobs carry no discrepancies; the count and the five largest come from SQL.
+    # Either query failing leaves that part out of the context rather than failing the chat.
+    totals, top_page = await asyncio.gather(
+        job_repository_async.discrepancy_totals(job.id),
+        job_repository_async.query_discrepancies(job.id, "value", 5),
+        return_exceptions=True,
+    )
+    if isinstance(totals, Exception):
+        logger.warning("Discrepancy totals unavailable for chat on job %s: %s", job.id, totals)
+        totals = None
+    if isinstance(top_page, Exception):
+        logger.warning("Top discrepancies unavailable for chat on job %s: %s", job.id, top_page)
+        top_page = ([], None)
+    top_discrepancies = top_page[0]
+    context_summary = f"Vendor: {job.vendor_name}\nRecoverable amount: {job.metrics.get('recoverable_amount', 0)}"
+    if totals is not None:
+        context_summary += f"\nDiscrepancies: {totals['count']}"
     llm_summary = job.metrics.get("llm_summary")
     if llm_summary:
         context_summary += f"\nInsight summary: {llm_summary[:500]}"
 
-    contexts = await rag_store.query_context(job.id, payload.question, top_k=4)
+    contexts = await rag_store.query_context(job.id, question, top_k=4)
     context_block = "\n".join(
         f"Source {idx + 1}: {ctx.get('text')} (type: {ctx.get('source_type')}, reference: {ctx.get('reference')})"
         for idx, ctx in enumerate(contexts)
@@ -60,18 +180,35 @@ async def insights_chat(job_id: str, payload: ChatRequest, current_user=Depends(
     if contexts:
         base_answer += "\nRelevant evidence:\n" + context_block
 
+    prompt = (
+        "You are ContractGuard Copilot. Answer questions about contract audits using the provided context. "
+        "Cite the relevant source when possible.\n\n"
+        f"Context summary:\n{context_summary}\n\n"
+        f"Top evidence chunks:\n{context_block or 'None'}\n\n"
+        f"Discrepancies:\n{top_discrepancies}\n\n"
+        f"Question: {question}\n"
+        "Answer for a finance / revenue operations lead."
+    )
+    return context_summary, contexts, base_answer, prompt
+
+
+def _chat_messages(prompt: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": "You are a revenue recovery assistant."},
+        {"role": "user", "content": prompt},
+    ]
+
+
+@router.post("/{job_id}/chat", response_model=ChatResponse)
+async def insights_chat(job_id: str, payload: ChatRequest, current_user=Depends(require_user)) -> ChatResponse:
+    job = await job_manager.get_job_async(job_id, current_user.get("organization_id"), projection="summary")
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+
+    context_summary, contexts, base_answer, prompt = await _build_chat_context(job, payload.question)
+
     answer = base_answer
     if _chat_client:
-        prompt = (
-            "You are ContractGuard Copilot. Answer questions about contract audits using the provided context. "
-            "Cite the relevant source when possible.\n\n"
-            f"Context summary:\n{context_summary}\n\n"
-            f"Top evidence chunks:\n{context_block or 'None'}\n\n"
-            f"Discrepancies:\n{job.discrepancies[:5]}\n\n"
-            f"Question: {payload.question}\n"
-            "Answer for a finance / revenue operations lead."
-        )
-
         loop = asyncio.get_running_loop()
 
         try:
@@ -79,17 +216,55 @@ async def insights_chat(job_id: str, payload: ChatRequest, current_user=Depends(
                 None,
                 lambda: _chat_client.chat.completions.create(
                     model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": "You are a revenue recovery assistant."},
-                        {"role": "user", "content": prompt},
-                    ],
+                    messages=_chat_messages(prompt),
                     temperature=0.2,
                     max_tokens=500,
                 ),
             )
             answer = response.choices[0].message.content.strip()
         except Exception:
-            answer = base_answer + "\n\n(I could not reach the AI service, so here is the contextual summary instead.)"
+            answer = base_answer + _CHAT_FALLBACK_NOTE
 
+    await job_manager.record_chat_answer_async(job, payload.question, answer)
     return ChatResponse(answer=answer, context_summary=context_summary, sources=contexts if contexts else None)
 
+
+@router.post("/{job_id}/chat/stream")
+async def insights_chat_stream(job_id: str, payload: ChatRequest, current_user=Depends(require_user)) -> StreamingResponse:
+    """Server-Sent Events variant of the chat endpoint that forwards tokens as they arrive."""
+    job = await job_manager.get_job_async(job_id, current_user.get("organization_id"), projection="summary")
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+
+    context_summary, contexts, base_answer, prompt = await _build_chat_context(job, payload.question)
+
+    async def _events():
+        yield _sse({"type": "context", "context_summary": context_summary, "sources": contexts or None})
+        answer = base_answer
+        if _async_chat_client:
+            parts: List[str] = []
+            try:
+                stream = await _async_chat_client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=_chat_messages(prompt),
+                    temperature=0.2,
+                    max_tokens=500,
+                    stream=True,
+                )
+                async for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        parts.append(delta)
+                        yield _sse({"type": "token", "text": delta})
+                answer = "".join(parts).strip()
+            except Exception:
+                answer = base_answer + _CHAT_FALLBACK_NOTE
+                yield _sse({"type": "reset"})
+                yield _sse({"type": "token", "text": answer})
+        else:
+            yield _sse({"type": "token", "text": answer})
+
+        await job_manager.record_chat_answer_async(job, payload.question, answer)
+        yield _sse({"type": "done", "answer": answer})
+
+    return StreamingResponse(_events(), media_type="text/event-stream", headers=_SSE_HEADERS)
@@ -6,13 +6,13 @@ from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import FileResponse
 
 from app.auth import require_user
-from app.services import job_manager
+from app.services import artifact_store, job_manager
 
 router = APIRouter()
 
 
 def _find_local_file(job_id: str, filename: str, category: str, organization_id: str | None) -> Path | None:
-    job = job_manager.get_job(job_id, organization_id)
+    job = job_manager.get_job(job_id, organization_id, projection="summary")
     if not job:
         return None
 
@@ -41,3 +41,18 @@ def download_contract(job_id: str, filename: str, current_user=Depends(require_u
         raise HTTPException(status_code=404, detail="Contract file not found.")
     return FileResponse(path, filename=filename, media_type="application/pdf")
 
+
+@router.get("/jobs/{job_id}/documents/{filename}/extraction")
+def document_extraction_detail(job_id: str, filename: str, current_user=Depends(require_user)):
+    """Full extraction output for one contract, including the offloaded text, tables and key pairs."""
+    job = job_manager.get_job(job_id, current_user.get("organization_id"), projection="summary")
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    documents = job.metrics.get("documents") if isinstance(job.metrics.get("documents"), list) else []
+    document = next((doc for doc in documents if doc.get("filename") == filename), None)
+    if not document:
+        raise HTTPException(status_code=404, detail="Extracted document not found.")
+    try:
+        return artifact_store.load_document(document)
+    except (OSError, ValueError) as exc:
+        raise HTTPException(status_code=404, detail=f"Extraction artifact unavailable: {exc}")
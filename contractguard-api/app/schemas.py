@@ -27,6 +27,39 @@ class JobStatus(BaseModel):
 class AnalysisSummary(BaseModel):
     job: JobStatus
     discrepancies: List[dict]
+    # Pass back as ``cursor`` for the next page; None on the last page
+    next_cursor: Optional[str] = None
+
+
+class DiscrepancyPage(BaseModel):
+    discrepancies: List[dict]
+    next_cursor: Optional[str] = None
+
+
+class DiscrepancyGroup(BaseModel):
+    count: int
+    value: float
+
+
+class PriorityTotal(DiscrepancyGroup):
+    priority: Optional[str] = None
+
+
+class CustomerTotal(DiscrepancyGroup):
+    customer: Optional[str] = None
+
+
+class MonthTotal(DiscrepancyGroup):
+    month: str
+    category: str
+
+
+class DiscrepancyTotals(BaseModel):
+    count: int
+    total_value: float
+    by_priority: List[PriorityTotal]
+    by_customer: List[CustomerTotal]
+    by_month: List[MonthTotal] = []
 
 
 class ChatRequest(BaseModel):
@@ -0,0 +1,161 @@
+"""
+Content-addressed store for heavy extraction artifacts.
+
+Extracted documents keep their full text, tables and key/value pairs here
+instead of inside the ``job_metrics`` row; ``job.metrics["documents"]`` holds a
+reference plus small summaries, and ``load_document`` rehydrates on demand.
+Artifacts are gzip-compressed JSON named by the SHA-256 of their content, in a
+local directory or the configured Azure container / Supabase bucket
+(``artifact_backend``; unset, the configured blob storage is preferred).
+
+The pipeline writes artifacts in the Celery worker and the API reads them, so
+the local backend only works when both see the same ``artifact_dir``;
+``require_shared_backend`` refuses to queue jobs otherwise.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List
+
+from app.config import get_settings
+from app.services import storage_azure, storage_supabase
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+HEAVY_DOCUMENT_FIELDS = ("full_text", "tables", "key_pairs")
+_PREFIX = "artifacts"
+_MAX_CACHED_ARTIFACTS = 32
+
+_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def resolve_backend() -> str:
+    if settings.artifact_backend:
+        return settings.artifact_backend
+    if settings.azure_storage_connection_string and settings.azure_storage_container:
+        return "azure"
+    if settings.supabase_url and settings.supabase_service_key and settings.supabase_storage_bucket:
+        return "supabase"
+    return "local"
+
+
+def require_shared_backend() -> None:
+    """Raises unless artifacts written by another process (a Celery worker) will be readable here."""
+    if resolve_backend() == "local" and not settings.artifact_dir:
+        raise RuntimeError(
+            "Artifacts would be written to the worker's temp directory, which the API cannot read. "
+            "Configure Azure or Supabase storage, or set ARTIFACT_DIR to a directory both share."
+        )
+
+
+def _local_path(digest: str) -> Path:
+    root = Path(settings.artifact_dir or Path(tempfile.gettempdir()) / "contractguard_artifacts")
+    return root / digest[:2] / f"{digest}.json.gz"
+
+
+def _write(backend: str, digest: str, data: bytes) -> None:
+    name = f"{_PREFIX}/{digest}.json.gz"
+    if backend == "azure":
+        client = storage_azure.get_client()
+        if client and settings.azure_storage_container:
+            blob = client.get_container_client(settings.azure_storage_container).get_blob_client(name)
+            if not blob.exists():
+                blob.upload_blob(data)
+            return
+    elif backend == "supabase":
+        client = storage_supabase.get_client()
+        if client and settings.supabase_storage_bucket:
+            client.storage.from_(settings.supabase_storage_bucket).upload(
+                name, data, {"contentType": "application/gzip", "upsert": "true"}
+            )
+            return
+    path = _local_path(digest)
+    if path.exists():
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_bytes(data)
+    tmp.replace(path)
+
+
+def _read(backend: str, digest: str) -> bytes:
+    name = f"{_PREFIX}/{digest}.json.gz"
+    if backend == "azure":
+        client = storage_azure.get_client()
+        if client and settings.azure_storage_container:
+            blob = client.get_container_client(settings.azure_storage_container).get_blob_client(name)
+            return blob.download_blob().readall()
+    elif backend == "supabase":
+        client = storage_supabase.get_client()
+        if client and settings.supabase_storage_bucket:
+            return client.storage.from_(settings.supabase_storage_bucket).download(name)
+    return _local_path(digest).read_bytes()
+
+
+def put(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Stores ``payload`` and returns its reference."""
+    raw = json.dumps(payload, default=str, sort_keys=True).encode("utf-8")
+    digest = hashlib.sha256(raw).hexdigest()
+    data = gzip.compress(raw, compresslevel=6)
+    backend = resolve_backend()
+    try:
+        _write(backend, digest, data)
+    except Exception as exc:
+        # Never lose an artifact because the remote store is unavailable
+        logger.warning("Failed to store artifact in %s; keeping it locally: %s", backend, exc)
+        backend = "local"
+        _write(backend, digest, data)
+    return {"sha256": digest, "backend": backend, "bytes": len(raw), "stored_bytes": len(data)}
+
+
+def get(ref: Dict[str, Any]) -> Dict[str, Any]:
+    digest = ref["sha256"]
+    with _cache_lock:
+        if digest in _cache:
+            _cache.move_to_end(digest)
+            return _cache[digest]
+    payload = json.loads(gzip.decompress(_read(ref.get("backend", "local"), digest)))
+    with _cache_lock:
+        _cache[digest] = payload
+        while len(_cache) > _MAX_CACHED_ARTIFACTS:
+            _cache.popitem(last=False)
+    return payload
+
+
+def offload_document(document: Dict[str, Any]) -> Dict[str, Any]:
+    """A copy of ``document`` with its heavy fields replaced by an artifact reference and sizes."""
+    heavy = {field: document[field] for field in HEAVY_DOCUMENT_FIELDS if document.get(field)}
+    if not heavy:
+        return document
+    slim = {key: value for key, value in document.items() if key not in heavy}
+    slim["artifact"] = put(heavy)
+    slim["artifact_summary"] = {
+        "text_chars": len(heavy.get("full_text") or ""),
+        "tables": len(heavy.get("tables") or []),
+        "key_pairs": len(heavy.get("key_pairs") or []),
+    }
+    return slim
+
+
+def offload_documents(documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [offload_document(document) for document in documents]
+
+
+def load_document(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Rehydrates a document produced by ``offload_document``; others are returned unchanged."""
+    ref = document.get("artifact")
+    if not ref:
+        return document
+    hydrated = {key: value for key, value in document.items() if key not in ("artifact", "artifact_summary")}
+    hydrated.update(get(ref))
+    return hydrated
@@ -5,12 +5,20 @@ Combines Azure Document Intelligence with OpenAI GPT-4o for maximum accuracy
 
 from __future__ import annotations
 
+import hashlib
 import logging
 import mimetypes
 import json
 import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import date, datetime
 from pathlib import Path
+from types import SimpleNamespace
 from typing import Any, Dict, List, Tuple, Optional
 import re
 
@@ -24,7 +32,8 @@ except ImportError:
     OpenAI = None
 
 from app.config import get_settings
-from app.services import job_manager, rag_store
+from app.services import artifact_store, job_manager, rag_store
+from app.services.file_lock import atomic_write
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -33,18 +42,28 @@ _CLAUSE_KEYWORDS: Dict[str, Dict[str, Any]] = {
     "cpi_uplift": {
         "keywords": ["cpi", "consumer price", "annual increase", "escalat", "uplift", "inflation"],
         "context": ["percentage", "increase", "anniversary", "senior", "year", "effective"],
+        "expects": ["percentage", "effective_date"],
     },
-    "discount_floor": {"keywords": ["discount", "rebate", "markdown"], "context": ["floor", "minimum", "base"]},
-    "renewal_notice": {"keywords": ["renewal", "terminate", "expiration", "notice period"], "context": []},
-    "service_credits": {"keywords": ["service credit", "credit", "sla", "uptime", "downtime"], "context": []},
-    "billing_cap": {"keywords": ["cap", "not exceed", "maximum fee", "spend cap"], "context": []},
+    "discount_floor": {
+        "keywords": ["discount", "rebate", "markdown"],
+        "context": ["floor", "minimum", "base"],
+        "expects": ["percentage"],
+    },
+    "renewal_notice": {"keywords": ["renewal", "terminate", "expiration", "notice period"], "context": [], "expects": []},
+    "service_credits": {
+        "keywords": ["service credit", "credit", "sla", "uptime", "downtime"],
+        "context": [],
+        "expects": ["percentage"],
+    },
+    "billing_cap": {"keywords": ["cap", "not exceed", "maximum fee", "spend cap"], "context": [], "expects": ["currency"]},
 }
 
 CPI_DATE_PATTERN = re.compile(
     r"(?:effective\s+on|commence(?:s|d)?|start(?:s|ed)?)\s+(?P<date>\w+\s+\d{1,2},\s*\d{4})", re.IGNORECASE
 )
 PERCENT_PATTERN = re.compile(r"(\d{1,3}(?:\.\d+)?)\s*%")
-CURRENCY_PATTERN = re.compile(r"\b(?:USD|INR|EUR|GBP|\$|₹|€|£)\b")
+# Symbols are not word characters, so only the ISO codes take \b boundaries
+CURRENCY_PATTERN = re.compile(r"\b(?:USD|INR|EUR|GBP)\b|[$₹€£]")
 
 
 # --- LLM Enhancement Layer ---
@@ -316,6 +335,144 @@ def _guess_content_type(path: Path) -> str:
     return mime_type or "application/octet-stream"
 
 
+# --- Fallback PDF text extraction (process pool) ---
+
+_TEXT_CACHE_DIR = Path(tempfile.gettempdir()) / "contractguard_text_cache"
+_pdf_pool: Executor | None = None
+
+
+def _get_pdf_pool() -> Executor:
+    """
+    Process pool for PyPDF2 work. Daemonic processes (Celery prefork workers)
+    may not start children, so there the work runs on a thread pool instead.
+    """
+    global _pdf_pool
+    if _pdf_pool is None:
+        workers = settings.pdf_text_workers or os.cpu_count() or 1
+        if multiprocessing.current_process().daemon:
+            logger.info("Running in a daemonic process; extracting PDF text on threads")
+            _pdf_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pdf-text")
+        else:
+            _pdf_pool = ProcessPoolExecutor(max_workers=workers)
+    return _pdf_pool
+
+
+async def _run_in_pdf_pool(func, *args) -> Any:
+    """Runs ``func`` on the PDF pool, rebuilding the pool once if a worker process died."""
+    global _pdf_pool
+    loop = asyncio.get_running_loop()
+    pool = _get_pdf_pool()
+    try:
+        return await loop.run_in_executor(pool, func, *args)
+    except BrokenProcessPool:
+        logger.warning("PDF text process pool broke; rebuilding it")
+        if _pdf_pool is pool:
+            _pdf_pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+        return await loop.run_in_executor(_get_pdf_pool(), func, *args)
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _pdf_page_count(path: str) -> int:
+    import PyPDF2
+
+    with open(path, "rb") as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+
+def _extract_pdf_page_range(path: str, start: int, end: int) -> List[str]:
+    """Runs in a worker process; returns the text of pages [start, end)."""
+    import PyPDF2
+
+    with open(path, "rb") as f:
+        pdf_reader = PyPDF2.PdfReader(f)
+        return [pdf_reader.pages[idx].extract_text() or "" for idx in range(start, end)]
+
+
+def _load_cached_pages(file_hash: str) -> List[str] | None:
+    cache_path = _TEXT_CACHE_DIR / f"{file_hash}.json"
+    if not cache_path.exists():
+        return None
+    try:
+        pages = json.loads(cache_path.read_text(encoding="utf-8"))
+        os.utime(cache_path)  # mtime orders eviction, so hits stay cached
+        return pages
+    except (OSError, ValueError):
+        return None
+
+
+def _prune_text_cache(max_bytes: int) -> None:
+    """Evicts least recently used entries until the cache fits in ``max_bytes``."""
+    entries = []
+    for path in _TEXT_CACHE_DIR.glob("*.json"):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+
+
+def _store_cached_pages(file_hash: str, pages: List[str]) -> None:
+    try:
+        _TEXT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        atomic_write(_TEXT_CACHE_DIR / f"{file_hash}.json", json.dumps(pages).encode("utf-8"))
+        _prune_text_cache(settings.pdf_text_cache_max_bytes)
+    except OSError as exc:
+        logger.warning("Failed to cache extracted PDF text: %s", exc)
+
+
+async def _extract_pdf_pages(local_path: Path) -> Tuple[List[str], bool]:
+    """
+    Extract PDF page text off the event loop, sharding large PDFs by page range
+    across the process pool. Returns (pages, cache_hit).
+    """
+    file_hash = await asyncio.to_thread(_file_sha256, local_path)
+    cached = await asyncio.to_thread(_load_cached_pages, file_hash)
+    if cached is not None:
+        return cached, True
+
+    page_count = await _run_in_pdf_pool(_pdf_page_count, str(local_path))
+    shard_size = max(1, settings.pdf_text_shard_pages)
+    shards = await asyncio.gather(*[
+        _run_in_pdf_pool(_extract_pdf_page_range, str(local_path), start, min(start + shard_size, page_count))
+        for start in range(0, page_count, shard_size)
+    ])
+    pages = [text for shard in shards for text in shard]
+    await asyncio.to_thread(_store_cached_pages, file_hash, pages)
+    return pages, False
+
+
+async def _read_fallback_text(local_path: Path, stats: Dict[str, int]) -> str:
+    # Read document as text if possible
+    if local_path.suffix.lower() in ['.txt', '.md']:
+        return await asyncio.to_thread(local_path.read_text, encoding='utf-8')
+    # For PDFs, try basic extraction or use GPT-4o vision
+    try:
+        pages, cache_hit = await _extract_pdf_pages(local_path)
+    except Exception as exc:
+        # Fallback to GPT-4o vision for images/scanned PDFs
+        logger.warning("PDF text extraction failed for %s; using GPT-4o vision: %s", local_path.name, exc)
+        return await _gpt4o_enhancer.extract_from_image(local_path)
+    stats["pages"] += len(pages)
+    stats["cache_hits"] += int(cache_hit)
+    if not cache_hit:
+        stats["extracted_pages"] += len(pages)
+    return "\n".join(pages)
+
+
 def _match_clause_label(text: str) -> Tuple[str | None, Dict[str, Any]]:
     lowered = text.lower()
     for label, config in _CLAUSE_KEYWORDS.items():
@@ -406,6 +563,44 @@ def _normalize_region(region: Any, page_meta: Dict[str, float] | None) -> Dict[s
     return {"page": page_number, "polygon": polygon, "normalized_polygon": normalized_polygon, "bounds": bounds}
 
 
+_NEUTRAL_CONTEXT_SCORE = 0.075
+_NEUTRAL_EXPECTS_SCORE = 0.25
+
+
+def _score_clause(text: str, config: Dict[str, Any], extracted: Dict[str, Any]) -> float:
+    """
+    Local confidence for a keyword-matched paragraph, from 0.0 to 1.0.
+    Combines keyword/context hits with how unambiguously the regexes resolved
+    the values this clause type needs; only low scores go to GPT-4o. Clause
+    types without context terms or expected values get half credit for that
+    part, since nothing was checked.
+
+    >>> round(_score_clause("Renewal notice period applies.", _CLAUSE_KEYWORDS["renewal_notice"], {}), 3)
+    0.675
+    >>> cap = "Fees shall not exceed $50,000 per year (spend cap)."
+    >>> round(_score_clause(cap, _CLAUSE_KEYWORDS["billing_cap"], {"currency": _extract_currency(cap)}), 3)
+    0.925
+    >>> round(_score_clause("Service credit for downtime.", _CLAUSE_KEYWORDS["service_credits"], {}), 3)
+    0.425
+    """
+    lowered = text.lower()
+    keyword_hits = sum(1 for keyword in config.get("keywords", []) if keyword in lowered)
+    context_terms = config.get("context", [])
+    context_hits = sum(1 for term in context_terms if term in lowered)
+
+    score = 0.25 if keyword_hits == 1 else 0.35
+    score += 0.15 * min(1.0, context_hits / 2) if context_terms else _NEUTRAL_CONTEXT_SCORE
+
+    patterns = {"percentage": PERCENT_PATTERN, "effective_date": CPI_DATE_PATTERN, "currency": CURRENCY_PATTERN}
+    expected = config.get("expects", [])
+    if not expected:
+        return score + _NEUTRAL_EXPECTS_SCORE
+    resolved = sum(
+        1 for name in expected if extracted.get(name) is not None and len(patterns[name].findall(text)) == 1
+    )
+    return score + 0.5 * resolved / len(expected)
+
+
 async def _extract_clause_hits_enhanced(
     paragraphs: List[Any],
     page_meta: Dict[int, Dict[str, float]],
@@ -436,12 +631,21 @@ async def _extract_clause_hits_enhanced(
         effective_date = _extract_date(text)
         currency = _extract_currency(text)
         
-        # 🔥 NEW: Validate and enhance with GPT-4o
-        validation = await _gpt4o_enhancer.validate_clause(
-            clause_text=text,
-            detected_label=label,
-            context=full_text[max(0, full_text.find(text) - 200):full_text.find(text) + len(text) + 200]
+        # Clear regex hits keep their local score; only ambiguous ones go to GPT-4o
+        local_score = _score_clause(
+            text, config, {"percentage": percentage, "effective_date": effective_date, "currency": currency}
         )
+        if local_score >= settings.clause_validation_threshold:
+            validation = {"confidence": local_score}
+            validation_source = "local"
+        else:
+            # 🔥 NEW: Validate and enhance with GPT-4o
+            validation = await _gpt4o_enhancer.validate_clause(
+                clause_text=text,
+                detected_label=label,
+                context=full_text[max(0, full_text.find(text) - 200):full_text.find(text) + len(text) + 200]
+            )
+            validation_source = "gpt4o"
         
         # Use GPT-4o extracted values if they're better
         if validation.get("is_valid", True):
@@ -464,6 +668,8 @@ async def _extract_clause_hits_enhanced(
             "percentage": percentage,
             "effective_date": effective_date,
             "currency": currency,
+            "local_score": round(local_score, 3),
+            "validation_source": validation_source,
             "gpt4o_validated": validation.get("is_valid", False),
             "gpt4o_reasoning": validation.get("reasoning")
         })
@@ -493,17 +699,24 @@ def _normalize_table(table: Any) -> Dict[str, Any]:
     }
 
 
+def _field_rank(field: Dict[str, Any]) -> Tuple[bool, float]:
+    return field["value"] not in (None, "", [], {}), field["confidence"]
+
+
 async def _summarize_result_enhanced(result: Any, full_text: str) -> Dict[str, Any]:
     """Enhanced summarization with GPT-4o clause extraction."""
     page_meta = _build_page_map(result)
     
     doc_fields: Dict[str, Dict[str, Any]] = {}
+    # A split PDF yields one document per page range; each field keeps its best non-empty reading
     for document in getattr(result, "documents", []) or []:
         for name, field in (getattr(document, "fields", {}) or {}).items():
-            doc_fields[name] = {
+            candidate = {
                 "value": _coerce_field_value(field),
                 "confidence": float(getattr(field, "confidence", 0.0) or 0.0),
             }
+            if name not in doc_fields or _field_rank(candidate) > _field_rank(doc_fields[name]):
+                doc_fields[name] = candidate
     
     key_pairs = []
     for pair in getattr(result, "key_value_pairs", []) or []:
@@ -525,6 +738,8 @@ async def _summarize_result_enhanced(result: Any, full_text: str) -> Dict[str, A
     totals = {
         "page_count": len(getattr(result, "pages", []) or []),
         "clause_hits": len(clause_hits),
+        "clauses_validated": sum(1 for hit in clause_hits if hit["validation_source"] == "gpt4o"),
+        "clauses_skipped": sum(1 for hit in clause_hits if hit["validation_source"] == "local"),
         "word_count": sum(len((getattr(p, "content", "") or "").split()) for p in getattr(result, "paragraphs", []) or []),
     }
     
@@ -538,6 +753,104 @@ async def _summarize_result_enhanced(result: Any, full_text: str) -> Dict[str, A
     }
 
 
+async def _count_pdf_pages(local_path: Path) -> int | None:
+    if local_path.suffix.lower() != ".pdf":
+        return None
+    try:
+        return await _run_in_pdf_pool(_pdf_page_count, str(local_path))
+    except Exception as exc:
+        logger.debug("Could not count pages for %s: %s", local_path.name, exc)
+        return None
+
+
+def _page_ranges(page_count: int, size: int) -> List[Tuple[int, int]]:
+    """1-based inclusive (first, last) page ranges."""
+    return [(start, min(start + size - 1, page_count)) for start in range(1, page_count + 1, size)]
+
+
+def _split_pdf(path: str, ranges: List[Tuple[int, int]], out_dir: str) -> List[str]:
+    """Runs in a worker process; writes each page range to its own PDF and returns the paths."""
+    import PyPDF2
+
+    parts: List[str] = []
+    with open(path, "rb") as f:
+        pdf_reader = PyPDF2.PdfReader(f)
+        for first, last in ranges:
+            writer = PyPDF2.PdfWriter()
+            for idx in range(first - 1, last):
+                writer.add_page(pdf_reader.pages[idx])
+            part_path = os.path.join(out_dir, f"pages-{first}-{last}.pdf")
+            with open(part_path, "wb") as out:
+                writer.write(out)
+            parts.append(part_path)
+    return parts
+
+
+async def _analyze_pages(client: DocumentIntelligenceClient, local_path: Path, content_type: str) -> Any:
+    # Stream the upload from disk so memory stays flat for large scanned bundles
+    with local_path.open("rb") as document_stream:
+        poller = await client.begin_analyze_document(
+            model_id=settings.azure_afr_contract_model_id,
+            body=document_stream,
+            content_type=content_type,
+            features=["ocrHighResolution"],
+            output_content_format="markdown",
+        )
+    return await poller.result()
+
+
+_REBASE_CHILDREN = ("cells", "lines", "words", "key", "value", "fields", "value_array", "value_object")
+
+
+def _rebase(node: Any, page_offset: int, content_offset: int) -> None:
+    """Shift page numbers and content spans of one range's result in place, recursing into nested elements."""
+    if node is None or isinstance(node, (str, int, float, bool)):
+        return
+    if isinstance(node, dict):
+        for value in node.values():
+            _rebase(value, page_offset, content_offset)
+        return
+    if isinstance(node, (list, tuple)):
+        for item in node:
+            _rebase(item, page_offset, content_offset)
+        return
+    if page_offset and getattr(node, "page_number", None) is not None:
+        node.page_number += page_offset
+    for region in getattr(node, "bounding_regions", None) or []:
+        if getattr(region, "page_number", None) is not None:
+            region.page_number += page_offset
+    if content_offset:
+        spans = list(getattr(node, "spans", None) or [])
+        if getattr(node, "span", None) is not None:
+            spans.append(node.span)
+        for span in spans:
+            span.offset += content_offset
+    for attr in _REBASE_CHILDREN:
+        _rebase(getattr(node, attr, None), page_offset, content_offset)
+
+
+def _merge_results(results: List[Any], ranges: List[Tuple[int, int]]) -> SimpleNamespace:
+    """
+    Stitch page-range results back into one result-like object. Each range was
+    analysed as its own file, so page numbers restart at 1 and spans at 0;
+    both are rebased onto the whole document and the newline-joined content.
+    Documents stay one per range; _summarize_result_enhanced merges their fields.
+    """
+    merged = SimpleNamespace(pages=[], paragraphs=[], tables=[], key_value_pairs=[], documents=[])
+    contents: List[str] = []
+    content_offset = 0
+    for result, (first, _) in zip(results, ranges):
+        for attr in ("pages", "paragraphs", "tables", "key_value_pairs", "documents"):
+            items = getattr(result, attr, None) or []
+            _rebase(items, first - 1, content_offset)
+            getattr(merged, attr).extend(items)
+        content = getattr(result, "content", "") or ""
+        contents.append(content)
+        content_offset += len(content) + 1
+    merged.content = "\n".join(contents)
+    return merged
+
+
 async def _analyze_document(client: DocumentIntelligenceClient, document_meta: Dict[str, Any]) -> Dict[str, Any]:
     """Enhanced document analysis with GPT-4o."""
     local_path = Path(document_meta.get("local_path", ""))
@@ -545,16 +858,26 @@ async def _analyze_document(client: DocumentIntelligenceClient, document_meta: D
         raise FileNotFoundError(local_path)
     
     content_type = _guess_content_type(local_path)
-    document_bytes = local_path.read_bytes()
     
-    poller = await client.begin_analyze_document(
-        model_id=settings.azure_afr_contract_model_id,
-        body=document_bytes,
-        content_type=content_type,
-        features=["ocrHighResolution"],
-        output_content_format="markdown",
-    )
-    result = await poller.result()
+    # Large PDFs are split into page-range files analysed in parallel and merged back together
+    page_count = await _count_pdf_pages(local_path)
+    page_ranges: List[Tuple[int, int]] = []
+    if page_count and page_count >= settings.azure_split_min_pages:
+        page_ranges = _page_ranges(page_count, max(1, settings.azure_page_range_size))
+    
+    if len(page_ranges) > 1:
+        semaphore = asyncio.Semaphore(max(1, settings.azure_page_range_concurrency))
+        
+        async def _analyze_range(part_path: str) -> Any:
+            async with semaphore:
+                return await _analyze_pages(client, Path(part_path), content_type)
+        
+        with tempfile.TemporaryDirectory(prefix="contractguard-ranges-") as parts_dir:
+            parts = await _run_in_pdf_pool(_split_pdf, str(local_path), page_ranges, parts_dir)
+            results = await asyncio.gather(*[_analyze_range(part) for part in parts])
+        result = _merge_results(results, page_ranges)
+    else:
+        result = await _analyze_pages(client, local_path, content_type)
     
     # Extract full text from result
     full_text = getattr(result, "content", "")
@@ -579,6 +902,7 @@ async def _analyze_document(client: DocumentIntelligenceClient, document_meta: D
     summary["storage_path"] = document_meta.get("storage_path")
     summary["local_path"] = str(local_path)
     summary["storage"] = document_meta.get("storage")
+    summary["page_ranges"] = [f"{first}-{last}" for first, last in page_ranges]
     
     return summary
 
@@ -599,50 +923,61 @@ async def run(job, documents: List[Dict]) -> Dict:
         logger.warning("Azure Document Intelligence credentials missing; falling back to GPT-4o-only extraction.")
         
         # 🔥 Fallback: Pure GPT-4o extraction
-        for doc in documents:
-            local_path = Path(doc.get("local_path", ""))
-            if not local_path.exists():
-                continue
-            
+        available = [doc for doc in documents if Path(doc.get("local_path", "")).exists()]
+        text_stats = {"pages": 0, "cache_hits": 0, "extracted_pages": 0}
+        started = time.perf_counter()
+        texts = await asyncio.gather(
+            *[_read_fallback_text(Path(doc["local_path"]), text_stats) for doc in available],
+            return_exceptions=True,
+        )
+        text_seconds = time.perf_counter() - started
+
+        # Bounded like the summary calls, so large uploads do not open one GPT-4o request per document at once
+        semaphore = asyncio.Semaphore(max(1, settings.fallback_extraction_concurrency))
+
+        async def _extract_terms(doc: Dict[str, Any], contract_text: Any) -> Dict[str, Any]:
             try:
-                # Read document as text if possible
-                if local_path.suffix.lower() in ['.txt', '.md']:
-                    contract_text = local_path.read_text(encoding='utf-8')
-                else:
-                    # For PDFs, try basic extraction or use GPT-4o vision
-                    try:
-                        import PyPDF2
-                        with open(local_path, 'rb') as f:
-                            pdf_reader = PyPDF2.PdfReader(f)
-                            contract_text = "\n".join(page.extract_text() for page in pdf_reader.pages)
-                    except:
-                        # Fallback to GPT-4o vision for images/scanned PDFs
-                        contract_text = await _gpt4o_enhancer.extract_from_image(local_path)
-                
+                if isinstance(contract_text, BaseException):
+                    raise contract_text
                 # Extract with GPT-4o
-                contract_terms = await _gpt4o_enhancer.extract_contract_terms(
-                    contract_text,
-                    doc.get("filename", "")
-                )
-                
-                extracted_docs.append({
+                async with semaphore:
+                    contract_terms = await _gpt4o_enhancer.extract_contract_terms(
+                        contract_text,
+                        doc.get("filename", "")
+                    )
+                return {
                     "filename": doc.get("filename"),
                     "gpt4o_contract_terms": contract_terms,
                     "clauses": [],
                     "totals": {"clause_hits": 0},
                     "extraction_method": "gpt4o_only"
-                })
+                }
             except Exception as e:
                 logger.error(f"GPT-4o extraction failed for {doc.get('filename')}: {e}")
-                extracted_docs.append({
+                return {
                     "filename": doc.get("filename"),
                     "error": str(e),
                     "clauses": [],
                     "totals": {"clause_hits": 0}
-                })
-        
+                }
+
+        extracted_docs = list(await asyncio.gather(*[
+            _extract_terms(doc, text) for doc, text in zip(available, texts)
+        ]))
+
+        job.metrics["fallback_text_extraction"] = {
+            "pages": text_stats["pages"],
+            "cache_hits": text_stats["cache_hits"],
+            "seconds": round(text_seconds, 3),
+            # Cache hits cost a hash and a read, so only freshly extracted pages count towards throughput
+            "pages_per_second": (
+                round(text_stats["extracted_pages"] / text_seconds, 2)
+                if text_seconds > 0 and text_stats["extracted_pages"] else None
+            ),
+        }
+
         total_clauses = 0
-        job.metrics["documents"] = extracted_docs
+        job.metrics["documents"] = await asyncio.to_thread(artifact_store.offload_documents, extracted_docs)
         job.metrics["total_clauses"] = total_clauses
         job.metrics["extraction_method"] = "gpt4o_fallback"
         await rag_store.index_contracts(job, extracted_docs)
@@ -665,11 +1000,17 @@ async def run(job, documents: List[Dict]) -> Dict:
                 })
 
     total_clauses = sum(doc.get("totals", {}).get("clause_hits", 0) for doc in extracted_docs)
-    job.metrics["documents"] = extracted_docs
+    # Full text, tables and key pairs go to the artifact store; the returned documents stay complete
+    job.metrics["documents"] = await asyncio.to_thread(artifact_store.offload_documents, extracted_docs)
     job.metrics["total_clauses"] = total_clauses
     job.metrics["ocr_engine"] = "azure_document_intelligence"
     job.metrics["azure_model_id"] = settings.azure_afr_contract_model_id
     job.metrics["llm_enhancer"] = "gpt4o"
+    job.metrics["clause_validation"] = {
+        "threshold": settings.clause_validation_threshold,
+        "validated": sum(doc.get("totals", {}).get("clauses_validated", 0) for doc in extracted_docs),
+        "skipped": sum(doc.get("totals", {}).get("clauses_skipped", 0) for doc in extracted_docs),
+    }
     
     await rag_store.index_contracts(job, extracted_docs)
 
@@ -1,5 +1,7 @@
+import asyncio
 import os
 from pathlib import Path
+import shutil
 import tempfile
 from typing import List, Literal
 
@@ -9,6 +11,12 @@ from app.services import storage_azure
 
 UPLOAD_DIR = Path(tempfile.gettempdir()) / "contractguard_uploads"
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+_COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def _copy_to_disk(source, target: Path) -> None:
+    with target.open("wb") as handle:
+        shutil.copyfileobj(source, handle, _COPY_CHUNK_SIZE)
 
 
 async def _persist_locally(files: List[UploadFile], job_id: str, category: str) -> List[Path]:
@@ -17,16 +25,15 @@ async def _persist_locally(files: List[UploadFile], job_id: str, category: str)
     saved_paths: List[Path] = []
     for file in files:
         target = job_dir / file.filename
-        content = await file.read()
-        target.write_bytes(content)
+        await file.seek(0)
+        await asyncio.to_thread(_copy_to_disk, file.file, target)
         saved_paths.append(target)
     return saved_paths
 
 
 async def store_contracts(job_id: str, files: List[UploadFile]) -> List[dict]:
     local_paths = await _persist_locally(files, job_id, "contracts")
-    memory_files = [(path.name, path.read_bytes()) for path in local_paths]
-    remote_paths = await storage_azure.upload_files(memory_files, prefix=f"{job_id}/contracts")
+    remote_paths = await storage_azure.upload_paths(local_paths, prefix=f"{job_id}/contracts")
     metadata = []
     for idx, path_obj in enumerate(local_paths):
         remote = remote_paths[idx] if remote_paths and idx < len(remote_paths) else str(path_obj)
@@ -43,8 +50,7 @@ async def store_contracts(job_id: str, files: List[UploadFile]) -> List[dict]:
 
 async def store_billing(job_id: str, files: List[UploadFile]) -> List[dict]:
     local_paths = await _persist_locally(files, job_id, "billing")
-    memory_files = [(path.name, path.read_bytes()) for path in local_paths]
-    remote_paths = await storage_azure.upload_files(memory_files, prefix=f"{job_id}/billing")
+    remote_paths = await storage_azure.upload_paths(local_paths, prefix=f"{job_id}/billing")
     metadata = []
     for idx, path_obj in enumerate(local_paths):
         remote = remote_paths[idx] if remote_paths and idx < len(remote_paths) else str(path_obj)
@@ -0,0 +1,162 @@
+"""
+Read-through cache for job aggregates, keyed by (job id, projection).
+
+Entries are the serialized aggregates returned by ``job_repository`` and live
+in an in-process LRU bounded by ``job_cache_max_bytes`` for at most
+``job_cache_ttl_seconds``. When ``job_cache_redis_url`` is set, a Redis tier
+shares entries between API replicas and workers, and a per-job version counter
+stamped on every entry lets a write in any process invalidate all of them.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import get_settings
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_PROJECTIONS = ("status", "summary", "full")
+
+# (job id, projection) -> (payload, version, stored_at)
+_entries: "OrderedDict[Tuple[str, str], Tuple[str, Any, float]]" = OrderedDict()
+_size = 0
+_lock = threading.Lock()
+# Bumped on every local invalidation so loads that started before a write are not cached
+_generations: Dict[str, int] = {}
+_redis_client = None
+
+
+def _get_redis():
+    global _redis_client
+    if _redis_client is None and redis and settings.job_cache_redis_url:
+        _redis_client = redis.Redis.from_url(settings.job_cache_redis_url)
+    return _redis_client
+
+
+def _entry_key(job_id: str, projection: str) -> str:
+    return f"contractguard:job:{job_id}:{projection}"
+
+
+def _version_key(job_id: str) -> str:
+    return f"contractguard:job:{job_id}:version"
+
+
+def _drop(key: Tuple[str, str]) -> None:
+    global _size
+    entry = _entries.pop(key, None)
+    if entry:
+        _size -= len(entry[0])
+
+
+def _store_local(key: Tuple[str, str], payload: str, version: Any) -> None:
+    global _size
+    if len(payload) > settings.job_cache_max_bytes:
+        return
+    with _lock:
+        _drop(key)
+        _entries[key] = (payload, version, time.monotonic())
+        _size += len(payload)
+        while _size > settings.job_cache_max_bytes:
+            _drop(next(iter(_entries)))
+
+
+def version(job_id: str) -> Tuple[int, Optional[int]]:
+    """Stamp to take before loading from the database and hand back to ``put``."""
+    shared: Optional[int] = None
+    client = _get_redis()
+    if client:
+        try:
+            shared = int(client.get(_version_key(job_id)) or 0)
+        except Exception as exc:
+            logger.warning("Failed to read job cache version for %s: %s", job_id, exc)
+    with _lock:
+        return _generations.get(job_id, 0), shared
+
+
+def get(job_id: str, projection: str) -> Dict[str, Any] | None:
+    """A fresh copy of the cached aggregate, or None on a miss."""
+    if settings.job_cache_ttl_seconds <= 0:
+        return None
+    key = (job_id, projection)
+    client = _get_redis()
+    with _lock:
+        entry = _entries.get(key)
+        if entry and time.monotonic() - entry[2] > settings.job_cache_ttl_seconds:
+            _drop(key)
+            entry = None
+        if entry:
+            _entries.move_to_end(key)
+
+    if client:
+        try:
+            if entry:
+                current = int(client.get(_version_key(job_id)) or 0)
+                if current == entry[1]:
+                    return json.loads(entry[0])
+                with _lock:
+                    _drop(key)
+            payload, current = client.mget(_entry_key(job_id, projection), _version_key(job_id))
+            if payload is None:
+                return None
+            current = int(current or 0)
+            cached_version, _, text = payload.decode("utf-8").partition(":")
+            if int(cached_version) != current:
+                return None
+            _store_local(key, text, current)
+            return json.loads(text)
+        except Exception as exc:
+            logger.warning("Job cache lookup in Redis failed for %s: %s", job_id, exc)
+    return json.loads(entry[0]) if entry else None
+
+
+def put(job_id: str, projection: str, aggregate: Dict[str, Any], stamp: Tuple[int, Optional[int]]) -> None:
+    """Caches ``aggregate`` unless the job was written since ``stamp`` was taken."""
+    if settings.job_cache_ttl_seconds <= 0 or not aggregate:
+        return
+    generation, shared = stamp
+    with _lock:
+        if _generations.get(job_id, 0) != generation:
+            return
+    payload = json.dumps(aggregate, default=str)
+    client = _get_redis()
+    if client and shared is not None:
+        try:
+            # Versioned payload; a reader ignores it once the version moved on
+            client.set(
+                _entry_key(job_id, projection),
+                f"{shared}:{payload}",
+                ex=max(1, int(settings.job_cache_ttl_seconds)),
+            )
+        except Exception as exc:
+            logger.warning("Failed to store job %s in Redis cache: %s", job_id, exc)
+    _store_local((job_id, projection), payload, shared)
+
+
+def invalidate(job_id: str) -> None:
+    """Drops every projection of ``job_id`` here and, through the version bump, everywhere else."""
+    with _lock:
+        _generations[job_id] = _generations.get(job_id, 0) + 1
+        for projection in _PROJECTIONS:
+            _drop((job_id, projection))
+    client = _get_redis()
+    if client:
+        try:
+            pipe = client.pipeline()
+            pipe.incr(_version_key(job_id))
+            pipe.expire(_version_key(job_id), 86400)
+            pipe.delete(*[_entry_key(job_id, projection) for projection in _PROJECTIONS])
+            pipe.execute()
+        except Exception as exc:
+            logger.warning("Failed to invalidate job %s in Redis cache: %s", job_id, exc)
@@ -5,7 +5,16 @@ from datetime import datetime
 from fastapi.concurrency import run_in_threadpool
 
 from app.models import Job
-from app.services import document_extraction, llm_extraction, reconciliation, job_repository
+from app.services import (
+    artifact_store,
+    document_extraction,
+    llm_extraction,
+    reconciliation,
+    job_repository,
+    job_repository_async,
+    token_stream,
+)
+from app.services.progress_writer import ProgressWriter
 
 try:
     from app.workers.tasks import process_job as celery_task
@@ -14,12 +23,37 @@ try:
 except Exception:
     CELERY_AVAILABLE = False
 
+_CHAT_HISTORY_LIMIT = 50
+
 def create_job(vendor_name: str, organization_id: str | None) -> Job:
     return job_repository.create_job_record(vendor_name, organization_id)
 
 
-def get_job(job_id: str, organization_id: str | None = None) -> Job | None:
-    return job_repository.load_job(job_id, organization_id)
+def get_job(job_id: str, organization_id: str | None = None, projection: str = "full") -> Job | None:
+    return job_repository.load_job(job_id, organization_id, projection)
+
+
+# Awaitable variants for async routes; the blocking work runs on the repository pool
+
+
+async def create_job_async(vendor_name: str, organization_id: str | None) -> Job:
+    return await job_repository_async.create_job_record(vendor_name, organization_id)
+
+
+async def get_job_async(job_id: str, organization_id: str | None = None, projection: str = "full") -> Job | None:
+    return await job_repository_async.load_job(job_id, organization_id, projection)
+
+
+async def attach_contracts_async(job: Job, documents: list[dict]) -> None:
+    await job_repository_async.run(attach_contracts, job, documents)
+
+
+async def attach_billing_async(job: Job, documents: list[dict]) -> None:
+    await job_repository_async.run(attach_billing, job, documents)
+
+
+async def record_chat_answer_async(job: Job, question: str, answer: str) -> None:
+    await job_repository_async.run(record_chat_answer, job, question, answer)
 
 
 def attach_contracts(job: Job, documents: list[dict]) -> None:
@@ -54,7 +88,13 @@ def attach_billing(job: Job, documents: list[dict]) -> None:
     job_repository.save_metrics(job.id, job.metrics)
 
 
-def update_stage(job: Job, stage_name: str, status: str, detail: str | None = None) -> None:
+def update_stage(
+    job: Job,
+    stage_name: str,
+    status: str,
+    detail: str | None = None,
+    progress: ProgressWriter | None = None,
+) -> None:
     for stage in job.stages:
         if stage["name"] == stage_name:
             stage["status"] = status
@@ -63,13 +103,24 @@ def update_stage(job: Job, stage_name: str, status: str, detail: str | None = No
             if status == "completed":
                 stage["completed_at"] = datetime.utcnow().isoformat()
             break
-    job_repository.update_stage(job.id, stage_name, status, detail)
+    if progress:
+        progress.stage(stage_name, status, detail)
+    else:
+        job_repository.update_stage(job.id, stage_name, status, detail)
 
 
-def set_job_status(job: Job, status: str, message: str | None = None) -> None:
+def set_job_status(job: Job, status: str, message: str | None = None, progress: ProgressWriter | None = None) -> None:
     job.status = status
     job.message = message
-    job_repository.update_job_status(job.id, status, message)
+    if progress:
+        progress.status(status, message)
+    else:
+        job_repository.update_job_status(job.id, status, message)
+
+
+def record_chat_answer(job: Job, question: str, answer: str) -> None:
+    entry = {"question": question, "answer": answer, "answered_at": datetime.utcnow().isoformat()}
+    job_repository.append_metrics_item(job.id, "chat_history", entry, _CHAT_HISTORY_LIMIT)
 
 
 async def simulate_latency(seconds: float = 1.0) -> None:
@@ -78,6 +129,7 @@ async def simulate_latency(seconds: float = 1.0) -> None:
 
 def enqueue_job(job_id: str):
     if CELERY_AVAILABLE:
+        artifact_store.require_shared_backend()
         celery_task.delay(job_id)
     else:
         # fallback: run in background thread
@@ -92,28 +144,33 @@ def run_pipeline_sync(job_id: str):
     job = get_job(job_id)
     if not job:
         return
+    # Progress writes are batched off the critical path; stage completions and failures flush promptly
+    progress = ProgressWriter(job.id)
     try:
-        set_job_status(job, "in_progress")
-        update_stage(job, "upload", "completed", "Files stored and ready.")
+        set_job_status(job, "in_progress", progress=progress)
+        update_stage(job, "upload", "completed", "Files stored and ready.", progress=progress)
 
-        update_stage(job, "document_extraction", "in_progress")
+        update_stage(job, "document_extraction", "in_progress", progress=progress)
         extraction = asyncio.run(document_extraction.run(job, job.contracts))
-        update_stage(job, "document_extraction", "completed")
-        job_repository.save_metrics(job.id, job.metrics)
+        progress.metrics(job.metrics)
+        update_stage(job, "document_extraction", "completed", progress=progress)
 
-        update_stage(job, "llm_extraction", "in_progress")
+        update_stage(job, "llm_extraction", "in_progress", progress=progress)
         llm_output = asyncio.run(llm_extraction.analyze(job, extraction["documents"]))
-        update_stage(job, "llm_extraction", "completed")
-        job_repository.save_metrics(job.id, job.metrics)
+        progress.metrics(job.metrics)
+        update_stage(job, "llm_extraction", "completed", progress=progress)
 
-        update_stage(job, "reconciliation", "in_progress")
+        update_stage(job, "reconciliation", "in_progress", progress=progress)
         asyncio.run(reconciliation.run(job, llm_output))
-        update_stage(job, "reconciliation", "completed")
-        job_repository.save_metrics(job.id, job.metrics)
+        progress.metrics(job.metrics)
+        update_stage(job, "reconciliation", "completed", progress=progress)
         job_repository.replace_discrepancies(job.id, job.discrepancies)
 
-        set_job_status(job, "completed", "Analysis finished.")
+        set_job_status(job, "completed", "Analysis finished.", progress=progress)
     except Exception as exc:
-        set_job_status(job, "failed", str(exc))
-
-
+        # Summary readers would otherwise wait for a "done" that never comes
+        token_stream.publish(job.id, "summary", {"type": "error", "message": str(exc)})
+        # Also reached when progress could not be persisted; this status write then raises in turn
+        set_job_status(job, "failed", str(exc), progress=progress)
+    finally:
+        progress.close()
@@ -1,21 +1,126 @@
 from __future__ import annotations
 
+import base64
+import hashlib
+import json
 import logging
-from datetime import datetime
-from typing import Any, Dict, List, Optional
-from uuid import uuid4
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import NAMESPACE_URL, uuid5
 
-from app.models import Job
-from app.services.storage_supabase import get_client
+from app.config import get_settings
+from app.models import Job, MetricsDict
 
 logger = logging.getLogger(__name__)
-
-
-def _client():
-    client = get_client()
-    if not client:
-        raise RuntimeError("Supabase client not configured")
-    return client
+settings = get_settings()
+
+# "status" carries the job row, stages and a handful of metric keys for polling; "summary" drops the
+# heavy metrics (chat history, per-document full_text) and the discrepancies, which readers page through
+# with query_discrepancies; "full" is everything the pipeline needs.
+PROJECTIONS = ("status", "summary", "full")
+_STATUS_METRIC_KEYS = (
+    "reconciliation_progress",
+    "recoverable_amount",
+    "currency",
+    "total_clauses",
+    "audit_time_seconds",
+)
+_SUMMARY_DROPPED_METRICS = ("chat_history",)
+_SUMMARY_DROPPED_DOCUMENT_FIELDS = ("full_text",)
+
+_DISCREPANCY_IDENTITY_FIELDS = ("type", "customer", "invoice_reference", "invoice_date", "issue")
+
+# Sort name -> (column, descending); ties break on id. Nulls sort last in both directions, so a
+# missing value never outranks a real one (e.g. the top-by-value rows fed to chat).
+DISCREPANCY_SORTS = {"value": ("value", True), "priority": ("priority_rank", False), "due": ("due", False)}
+DISCREPANCY_FILTERS = ("priority", "customer", "type")
+_PRIORITY_RANKS = {"critical": 0, "high": 1, "medium": 2, "low": 3, "info": 4}
+_UNKNOWN_PRIORITY_RANK = 5
+# Leakage trend categories, matched on the issue text in this order; anything else is an escalator
+_LEAKAGE_CATEGORIES = (("discount", "discounts"), ("renewal", "renewals"))
+
+
+class JobRepositoryBackend(ABC):
+    """
+    Storage primitives behind the module-level functions, which keep the
+    shared behaviour (natural keys, projections, cursors, metric patches) and
+    delegate reads and writes to the backend selected by
+    ``job_repository_backend``.
+    """
+
+    @abstractmethod
+    def create_job_record(self, vendor_name: str, organization_id: Optional[str]) -> Job:
+        ...
+
+    @abstractmethod
+    def load_job(self, job_id: str, organization_id: Optional[str], projection: str) -> Job | None:
+        ...
+
+    @abstractmethod
+    def update_job_status(self, job_id: str, status: str, message: Optional[str]) -> None:
+        ...
+
+    @abstractmethod
+    def update_stage_fields(self, job_id: str, stage_name: str, fields: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def sync_rows(self, table: str, job_id: str, rows: List[Dict[str, Any]], scope: Dict[str, Any], prune: bool) -> None:
+        """
+        Upsert-and-prune by (job_id, natural_key): only rows whose content hash
+        changed are written and, with ``prune``, rows no longer present in
+        ``rows`` (within ``scope``) are deleted.
+        """
+
+    @abstractmethod
+    def save_metrics_patch(
+        self, job_id: str, patch: Dict[str, Any], removed: List[str], metrics: Dict[str, Any]
+    ) -> None:
+        """Merges ``patch`` and drops ``removed`` keys; ``metrics`` is the whole document, for backends that need it."""
+
+    @abstractmethod
+    def append_metrics_item(self, job_id: str, key: str, item: Any, limit: Optional[int]) -> None:
+        """Atomically appends ``item`` to the list under ``metrics[key]``, keeping the last ``limit`` entries."""
+
+    @abstractmethod
+    def replace_metrics(self, job_id: str, metrics: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def query_discrepancies(
+        self,
+        job_id: str,
+        sort: str,
+        limit: int,
+        after: Optional[Tuple[Any, str]],
+        filters: Dict[str, Any],
+    ) -> List[Dict[str, Any]]:
+        """Up to ``limit`` rows (id, sort column, data) in ``DISCREPANCY_SORTS`` order after the (value, id) keyset."""
+
+    @abstractmethod
+    def discrepancy_totals(self, job_id: str) -> Dict[str, Any]:
+        ...
+
+
+_backend: JobRepositoryBackend | None = None
+
+
+def get_backend() -> JobRepositoryBackend:
+    """The backend selected by ``job_repository_backend``, created on first use."""
+    global _backend
+    if _backend is None:
+        if settings.job_repository_backend == "supabase":
+            from app.services.job_repository_supabase import SupabaseJobRepository
+
+            _backend = SupabaseJobRepository()
+        elif settings.job_repository_backend == "sqlite":
+            from app.services.job_repository_sqlite import SQLiteJobRepository
+
+            _backend = SQLiteJobRepository(settings.job_repository_sqlite_path)
+        else:
+            raise ValueError(f"Unknown job repository backend: {settings.job_repository_backend}")
+    return _backend
 
 
 def _default_stages():
@@ -28,78 +133,35 @@ def _default_stages():
 
 
 def create_job_record(vendor_name: str, organization_id: Optional[str]) -> Job:
-    client = _client()
-    job_id = str(uuid4())
-    now = datetime.utcnow().isoformat()
-
-    client.table("jobs").insert(
-        {
-            "id": job_id,
-            "vendor_name": vendor_name,
-            "organization_id": organization_id,
-            "created_at": now,
-            "updated_at": now,
-        }
-    ).execute()
-
-    stage_rows = []
-    for stage in _default_stages():
-        stage_rows.append(
-            {
-                "id": str(uuid4()),
-                "job_id": job_id,
-                "name": stage["name"],
-                "status": stage["status"],
-                "sequence": stage["sequence"],
-            }
-        )
-    client.table("job_stages").insert(stage_rows).execute()
-    client.table("job_metrics").upsert({"job_id": job_id, "metrics": {}, "updated_at": now}).execute()
-
-    return load_job(job_id)
-
-
-def load_job(job_id: str, organization_id: Optional[str] = None) -> Job | None:
-    client = _client()
-    query = client.table("jobs").select("*").eq("id", job_id)
-    if organization_id:
-        query = query.eq("organization_id", organization_id)
-    response = query.limit(1).execute()
-    rows = response.data or []
-    if not rows:
-        return None
-    job_row = rows[0]
-
-    stages = (
-        client.table("job_stages")
-        .select("*")
-        .eq("job_id", job_id)
-        .order("sequence", desc=False)
-        .execute()
-        .data
-        or []
-    )
-
-    documents = (
-        client.table("job_documents").select("*").eq("job_id", job_id).execute().data
-        or []
-    )
-
-    discrepancies = (
-        client.table("job_discrepancies").select("*").eq("job_id", job_id).execute().data
-        or []
-    )
-
-    metrics_resp = client.table("job_metrics").select("metrics").eq("job_id", job_id).limit(1).execute().data or []
-    metrics = metrics_resp[0]["metrics"] if metrics_resp else {}
-
+    return get_backend().create_job_record(vendor_name, organization_id)
+
+
+def _project_metrics(metrics: Dict[str, Any], projection: str) -> Dict[str, Any]:
+    if projection == "status":
+        return {key: metrics[key] for key in _STATUS_METRIC_KEYS if key in metrics}
+    if projection == "summary":
+        metrics = {key: value for key, value in metrics.items() if key not in _SUMMARY_DROPPED_METRICS}
+        if isinstance(metrics.get("documents"), list):
+            metrics["documents"] = [
+                {key: value for key, value in doc.items() if key not in _SUMMARY_DROPPED_DOCUMENT_FIELDS}
+                if isinstance(doc, dict)
+                else doc
+                for doc in metrics["documents"]
+            ]
+    return metrics
+
+
+def _job_from_aggregate(aggregate: Dict[str, Any], projection: str = "full") -> Job:
+    job_row = aggregate["job"]
+    documents = aggregate.get("documents") or []
     job = Job(
         id=job_row["id"],
         vendor_name=job_row["vendor_name"],
         created_at=datetime.fromisoformat(job_row["created_at"].replace("Z", "+00:00")),
         status=job_row.get("status", "queued"),
         message=job_row.get("message"),
-        metrics=metrics or {},
+        metrics=MetricsDict(_project_metrics(aggregate.get("metrics") or {}, projection)),
+        projection=projection,
         stages=[
             {
                 "name": stage["name"],
@@ -108,7 +170,7 @@ def load_job(job_id: str, organization_id: Optional[str] = None) -> Job | None:
                 "started_at": stage.get("started_at"),
                 "completed_at": stage.get("completed_at"),
             }
-            for stage in stages
+            for stage in aggregate.get("stages") or []
         ],
     )
 
@@ -134,102 +196,238 @@ def load_job(job_id: str, organization_id: Optional[str] = None) -> Job | None:
         for doc in documents
         if doc.get("document_type") == "billing"
     ]
-    job.discrepancies = [row.get("data") or {} for row in discrepancies]
+    job.discrepancies = [row.get("data") or {} for row in aggregate.get("discrepancies") or []]
     return job
 
 
+def load_job(job_id: str, organization_id: Optional[str] = None, projection: str = "full") -> Job | None:
+    """
+    Loads a job aggregate. ``projection`` is one of ``PROJECTIONS``; jobs loaded
+    with anything but "full" carry partial metrics and must not be saved back.
+    """
+    if projection not in PROJECTIONS:
+        raise ValueError(f"Unknown job projection: {projection}")
+    return get_backend().load_job(job_id, organization_id, projection)
+
+
 def update_job_status(job_id: str, status: str, message: Optional[str]) -> None:
-    client = _client()
-    client.table("jobs").update({"status": status, "message": message, "updated_at": datetime.utcnow().isoformat()}).eq(
-        "id", job_id
-    ).execute()
+    get_backend().update_job_status(job_id, status, message)
 
 
-def update_stage(job_id: str, stage_name: str, status: str, detail: Optional[str]) -> None:
-    client = _client()
-    resp = (
-        client.table("job_stages")
-        .select("id, status, started_at, completed_at")
-        .eq("job_id", job_id)
-        .eq("name", stage_name)
-        .limit(1)
-        .execute()
-    )
-    rows = resp.data or []
-    if not rows:
-        return
-    row_id = rows[0]["id"]
-    payload: Dict[str, Any] = {"status": status, "detail": detail}
+def stage_update_fields(status: str, detail: Optional[str]) -> Dict[str, Any]:
+    fields: Dict[str, Any] = {"status": status, "detail": detail}
     if status == "in_progress":
-        payload["started_at"] = datetime.utcnow().isoformat()
+        fields["started_at"] = datetime.utcnow().isoformat()
     if status == "completed":
-        payload["completed_at"] = datetime.utcnow().isoformat()
-    client.table("job_stages").update(payload).eq("id", row_id).execute()
+        fields["completed_at"] = datetime.utcnow().isoformat()
+    return fields
+
+
+def update_stage_fields(job_id: str, stage_name: str, fields: Dict[str, Any]) -> None:
+    get_backend().update_stage_fields(job_id, stage_name, fields)
+
+
+def update_stage(job_id: str, stage_name: str, status: str, detail: Optional[str]) -> None:
+    update_stage_fields(job_id, stage_name, stage_update_fields(status, detail))
+
+
+def _row_id(table: str, job_id: str, natural_key: str) -> str:
+    return str(uuid5(NAMESPACE_URL, f"contractguard:{table}:{job_id}:{natural_key}"))
+
+
+def _content_hash(row: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(row, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:32]
+
+
+def _keyed_rows(table: str, job_id: str, rows: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Attaches id, natural_key and content_hash to (natural_key, row) pairs; the last duplicate key wins."""
+    keyed: Dict[str, Dict[str, Any]] = {}
+    for natural_key, row in rows:
+        keyed[natural_key] = {
+            **row,
+            "id": _row_id(table, job_id, natural_key),
+            "job_id": job_id,
+            "natural_key": natural_key,
+            "content_hash": _content_hash(row),
+        }
+    return list(keyed.values())
+
+
+def _sync_rows(table: str, job_id: str, rows: List[Dict[str, Any]], scope: Dict[str, Any], prune: bool = True) -> None:
+    get_backend().sync_rows(table, job_id, rows, scope, prune)
+
+
+def _document_rows(job_id: str, documents: List[Dict[str, Any]], document_type: str) -> List[Dict[str, Any]]:
+    return _keyed_rows(
+        "job_documents",
+        job_id,
+        [
+            (
+                f"{document_type}:{doc.get('storage_path') or doc.get('filename')}",
+                {
+                    "document_type": document_type,
+                    "filename": doc.get("filename"),
+                    "storage_provider": doc.get("storage"),
+                    "storage_path": doc.get("storage_path"),
+                    "local_path": doc.get("local_path"),
+                    "metadata": doc.get("metadata") or {},
+                },
+            )
+            for doc in documents
+        ],
+    )
 
 
 def upsert_documents(job_id: str, documents: List[Dict[str, Any]], document_type: str) -> None:
     if not documents:
         return
-    client = _client()
-    rows = []
-    for doc in documents:
-        rows.append(
-            {
-                "id": str(uuid4()),
-                "job_id": job_id,
-                "document_type": document_type,
-                "filename": doc.get("filename"),
-                "storage_provider": doc.get("storage"),
-                "storage_path": doc.get("storage_path"),
-                "local_path": doc.get("local_path"),
-                "metadata": doc.get("metadata") or {},
-            }
-        )
-    client.table("job_documents").insert(rows).execute()
+    rows = _document_rows(job_id, documents, document_type)
+    _sync_rows("job_documents", job_id, rows, {"document_type": document_type}, prune=False)
 
 
 def replace_billing_files(job_id: str, billing_docs: List[Dict[str, Any]]) -> None:
-    client = _client()
-    client.table("job_documents").delete().eq("job_id", job_id).eq("document_type", "billing").execute()
-    upsert_documents(job_id, billing_docs, "billing")
+    rows = _document_rows(job_id, billing_docs, "billing")
+    _sync_rows("job_documents", job_id, rows, {"document_type": "billing"})
 
 
 def replace_contract_files(job_id: str, contract_docs: List[Dict[str, Any]]) -> None:
-    client = _client()
-    client.table("job_documents").delete().eq("job_id", job_id).eq("document_type", "contract").execute()
-    upsert_documents(job_id, contract_docs, "contract")
+    rows = _document_rows(job_id, contract_docs, "contract")
+    _sync_rows("job_documents", job_id, rows, {"document_type": "contract"})
+
+
+def _discrepancy_fingerprint(discrepancy: Dict[str, Any]) -> str:
+    identity = [discrepancy.get(field) for field in _DISCREPANCY_IDENTITY_FIELDS]
+    return hashlib.sha256(json.dumps(identity, default=str).encode("utf-8")).hexdigest()[:32]
+
+
+def _leakage_category(issue: Any) -> str:
+    text = str(issue or "").lower()
+    return next((category for keyword, category in _LEAKAGE_CATEGORIES if keyword in text), "escalators")
+
+
+def _invoice_month(discrepancy: Dict[str, Any]) -> Optional[str]:
+    """YYYY-MM of the discrepancy's invoice date, falling back to the first dated evidence item."""
+    candidates = [discrepancy.get("invoice_date")]
+    candidates += [item.get("invoice_date") for item in discrepancy.get("evidence") or [] if isinstance(item, dict)]
+    for candidate in candidates:
+        try:
+            return date.fromisoformat(str(candidate)[:10]).strftime("%Y-%m")
+        except ValueError:
+            continue
+    return None
 
 
 def replace_discrepancies(job_id: str, discrepancies: List[Dict[str, Any]]) -> None:
-    client = _client()
-    client.table("job_discrepancies").delete().eq("job_id", job_id).execute()
-    if not discrepancies:
-        return
-    rows = []
+    rows: List[Tuple[str, Dict[str, Any]]] = []
+    occurrences: Dict[str, int] = {}
     for discrepancy in discrepancies:
+        fingerprint = _discrepancy_fingerprint(discrepancy)
+        # Identical identities (e.g. two findings on one invoice) stay distinct rows
+        occurrences[fingerprint] = occurrences.get(fingerprint, 0) + 1
+        natural_key = fingerprint if occurrences[fingerprint] == 1 else f"{fingerprint}#{occurrences[fingerprint]}"
         rows.append(
-            {
-                "id": str(uuid4()),
-                "job_id": job_id,
-                "customer": discrepancy.get("customer"),
-                "issue": discrepancy.get("issue"),
-                "priority": discrepancy.get("priority"),
-                "value": discrepancy.get("value"),
-                "due": discrepancy.get("due"),
-                "data": discrepancy,
-            }
+            (
+                natural_key,
+                {
+                    "type": discrepancy.get("type"),
+                    "customer": discrepancy.get("customer"),
+                    "issue": discrepancy.get("issue"),
+                    "priority": discrepancy.get("priority"),
+                    "priority_rank": _PRIORITY_RANKS.get(discrepancy.get("priority"), _UNKNOWN_PRIORITY_RANK),
+                    "value": discrepancy.get("value"),
+                    "due": discrepancy.get("due"),
+                    "invoice_month": _invoice_month(discrepancy),
+                    "leakage_category": _leakage_category(discrepancy.get("issue")),
+                    "data": discrepancy,
+                },
+            )
         )
-    client.table("job_discrepancies").insert(rows).execute()
+    _sync_rows("job_discrepancies", job_id, _keyed_rows("job_discrepancies", job_id, rows), {})
+
+
+def _encode_cursor(sort: str, value: Any, row_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([sort, value, row_id]).encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str, sort: str) -> Tuple[Any, str]:
+    try:
+        cursor_sort, value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid discrepancy cursor") from exc
+    if cursor_sort != sort:
+        raise ValueError(f"Cursor was issued for sort '{cursor_sort}', not '{sort}'")
+    return value, str(row_id)
+
+
+def query_discrepancies(
+    job_id: str,
+    sort: str = "value",
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    filters: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    One keyset page of a job's discrepancies: (discrepancies, next cursor).
+    ``sort`` is a ``DISCREPANCY_SORTS`` key, ``filters`` maps
+    ``DISCREPANCY_FILTERS`` columns to exact values, and ``cursor`` is the
+    value returned with the previous page (None once the last page is reached).
+    """
+    if sort not in DISCREPANCY_SORTS:
+        raise ValueError(f"Unknown discrepancy sort: {sort}")
+    filters = {column: value for column, value in (filters or {}).items() if value is not None}
+    unknown = [column for column in filters if column not in DISCREPANCY_FILTERS]
+    if unknown:
+        raise ValueError(f"Unknown discrepancy filters: {', '.join(unknown)}")
+    after = _decode_cursor(cursor, sort) if cursor else None
+    column, descending = DISCREPANCY_SORTS[sort]
+
+    rows = get_backend().query_discrepancies(job_id, sort, limit + 1, after, filters)
+
+    # The extra row only tells us whether another page exists
+    page = rows[:limit]
+    next_cursor = _encode_cursor(sort, page[-1].get(column), page[-1]["id"]) if len(rows) > limit else None
+    return [row.get("data") or {} for row in page], next_cursor
+
+
+def discrepancy_totals(job_id: str) -> Dict[str, Any]:
+    """
+    Discrepancy count and value for a job, overall and grouped by priority, by
+    customer and by invoice month and leakage category (dated rows only).
+    """
+    return get_backend().discrepancy_totals(job_id)
+
+
+def save_metrics_patch(job_id: str, patch: Dict[str, Any], removed: List[str], metrics: Dict[str, Any]) -> None:
+    """
+    Merges ``patch`` into the stored metrics and drops ``removed`` keys. Where
+    the merge cannot happen in the database the whole ``metrics`` document is
+    rewritten instead.
+    """
+    get_backend().save_metrics_patch(job_id, patch, removed, metrics)
+
+
+def append_metrics_item(job_id: str, key: str, item: Any, limit: Optional[int] = None) -> None:
+    """
+    Appends ``item`` to the list stored under ``metrics[key]`` and keeps its
+    last ``limit`` entries, inside the database so concurrent appends cannot
+    drop each other.
+    """
+    get_backend().append_metrics_item(job_id, key, item, limit)
 
 
 def save_metrics(job_id: str, metrics: Dict[str, Any]) -> None:
-    client = _client()
-    client.table("job_metrics").upsert(
-        {
-            "job_id": job_id,
-            "metrics": metrics or {},
-            "updated_at": datetime.utcnow().isoformat(),
-        }
-    ).execute()
-
-
+    """
+    Persists ``metrics``. A ``MetricsDict`` only sends its dirty top-level keys
+    (merged server-side); plain dicts are written whole.
+    """
+    if not isinstance(metrics, MetricsDict):
+        get_backend().replace_metrics(job_id, metrics or {})
+        return
+    if not metrics.dirty:
+        return
+    patch, removed = metrics.take_changes()
+    try:
+        save_metrics_patch(job_id, patch, removed, metrics)
+    except Exception:
+        metrics.mark_dirty(*patch, *removed)
+        raise
@@ -0,0 +1,81 @@
+"""
+Awaitable twin of ``job_repository`` for async routes.
+
+The Supabase client is synchronous, so each call runs on a dedicated, bounded
+thread pool (``repository_pool_size``) instead of the event loop. A slow query
+then only occupies a pool thread, and the pool bound caps how many requests a
+worker can have in flight against the database at once.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from app.config import get_settings
+from app.models import Job
+from app.services import job_repository
+
+settings = get_settings()
+
+T = TypeVar("T")
+
+_executor = ThreadPoolExecutor(max_workers=settings.repository_pool_size, thread_name_prefix="job-repo")
+
+
+async def run(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Runs a blocking repository (or job_manager) call on the repository pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+async def create_job_record(vendor_name: str, organization_id: Optional[str]) -> Job:
+    return await run(job_repository.create_job_record, vendor_name, organization_id)
+
+
+async def load_job(job_id: str, organization_id: Optional[str] = None, projection: str = "full") -> Job | None:
+    return await run(job_repository.load_job, job_id, organization_id, projection)
+
+
+async def update_job_status(job_id: str, status: str, message: Optional[str]) -> None:
+    await run(job_repository.update_job_status, job_id, status, message)
+
+
+async def update_stage(job_id: str, stage_name: str, status: str, detail: Optional[str]) -> None:
+    await run(job_repository.update_stage, job_id, stage_name, status, detail)
+
+
+async def upsert_documents(job_id: str, documents: List[Dict[str, Any]], document_type: str) -> None:
+    await run(job_repository.upsert_documents, job_id, documents, document_type)
+
+
+async def replace_billing_files(job_id: str, billing_docs: List[Dict[str, Any]]) -> None:
+    await run(job_repository.replace_billing_files, job_id, billing_docs)
+
+
+async def replace_contract_files(job_id: str, contract_docs: List[Dict[str, Any]]) -> None:
+    await run(job_repository.replace_contract_files, job_id, contract_docs)
+
+
+async def replace_discrepancies(job_id: str, discrepancies: List[Dict[str, Any]]) -> None:
+    await run(job_repository.replace_discrepancies, job_id, discrepancies)
+
+
+async def save_metrics(job_id: str, metrics: Dict[str, Any]) -> None:
+    await run(job_repository.save_metrics, job_id, metrics)
+
+
+async def query_discrepancies(
+    job_id: str,
+    sort: str = "value",
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    filters: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    return await run(job_repository.query_discrepancies, job_id, sort, limit, cursor, filters)
+
+
+async def discrepancy_totals(job_id: str) -> Dict[str, Any]:
+    return await run(job_repository.discrepancy_totals, job_id)
@@ -0,0 +1,392 @@
+"""
+Embedded SQLite backend for ``job_repository``.
+
+Selected with ``job_repository_backend = "sqlite"`` for single-node
+deployments, offline runs and tests: jobs, stages, documents, discrepancies
+and metrics live in one local database file (``job_repository_sqlite_path``)
+with the same tables and natural keys as the Supabase schema. The database
+runs in WAL mode so status polling never waits behind pipeline writes; each
+thread keeps its own connection.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from app.models import Job
+from app.services import job_repository
+from app.services.job_repository import JobRepositoryBackend
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+create table if not exists jobs (
+    id text primary key,
+    vendor_name text not null,
+    organization_id text,
+    status text not null default 'queued',
+    message text,
+    created_at text not null,
+    updated_at text not null
+);
+
+create table if not exists job_stages (
+    id text primary key,
+    job_id text not null references jobs (id) on delete cascade,
+    name text not null,
+    status text not null default 'pending',
+    detail text,
+    sequence integer not null default 0,
+    started_at text,
+    completed_at text,
+    unique (job_id, name)
+);
+
+create table if not exists job_documents (
+    id text primary key,
+    job_id text not null references jobs (id) on delete cascade,
+    natural_key text not null,
+    content_hash text,
+    document_type text not null,
+    filename text,
+    storage_provider text,
+    storage_path text,
+    local_path text,
+    metadata text not null default '{}',
+    unique (job_id, natural_key)
+);
+
+create table if not exists job_discrepancies (
+    id text primary key,
+    job_id text not null references jobs (id) on delete cascade,
+    natural_key text not null,
+    content_hash text,
+    type text,
+    customer text,
+    issue text,
+    priority text,
+    priority_rank integer,
+    value real,
+    due text,
+    invoice_month text,
+    leakage_category text,
+    data text not null default '{}',
+    unique (job_id, natural_key)
+);
+
+create table if not exists job_metrics (
+    job_id text primary key references jobs (id) on delete cascade,
+    metrics text not null default '{}',
+    updated_at text not null
+);
+
+create index if not exists idx_jobs_org on jobs (organization_id);
+create index if not exists idx_job_discrepancies_value on job_discrepancies (job_id, value desc, id);
+create index if not exists idx_job_discrepancies_priority_rank on job_discrepancies (job_id, priority_rank, id);
+create index if not exists idx_job_discrepancies_due on job_discrepancies (job_id, due, id);
+create index if not exists idx_job_discrepancies_priority on job_discrepancies (job_id, priority);
+create index if not exists idx_job_discrepancies_customer on job_discrepancies (job_id, customer);
+create index if not exists idx_job_discrepancies_type on job_discrepancies (job_id, type);
+"""
+
+# Columns written by ``sync_rows`` per table; JSON columns are stored as text
+_TABLE_COLUMNS = {
+    "job_documents": (
+        "id",
+        "job_id",
+        "natural_key",
+        "content_hash",
+        "document_type",
+        "filename",
+        "storage_provider",
+        "storage_path",
+        "local_path",
+        "metadata",
+    ),
+    "job_discrepancies": (
+        "id",
+        "job_id",
+        "natural_key",
+        "content_hash",
+        "type",
+        "customer",
+        "issue",
+        "priority",
+        "priority_rank",
+        "value",
+        "due",
+        "invoice_month",
+        "leakage_category",
+        "data",
+    ),
+}
+_JSON_COLUMNS = {"job_documents": ("metadata",), "job_discrepancies": ("data",)}
+_STAGE_COLUMNS = ("status", "detail", "started_at", "completed_at")
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, default=str)
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+class SQLiteJobRepository(JobRepositoryBackend):
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path or Path(tempfile.gettempdir()) / "contractguard_jobs.sqlite3")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+            # Databases created before a column was added get it here; new rows fill it in
+            for table, columns in _TABLE_COLUMNS.items():
+                existing = {row["name"] for row in conn.execute(f"pragma table_info({table})")}
+                for column in columns:
+                    if column not in existing:
+                        conn.execute(f"alter table {table} add column {column} text")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0)
+            conn.row_factory = sqlite3.Row
+            conn.execute("pragma journal_mode=wal")
+            # WAL keeps committed data durable across crashes at NORMAL; only the last commit may roll back
+            conn.execute("pragma synchronous=normal")
+            conn.execute("pragma foreign_keys=on")
+            self._local.conn = conn
+        return conn
+
+    def create_job_record(self, vendor_name: str, organization_id: Optional[str]) -> Job:
+        job_id = str(uuid4())
+        now = _now()
+        with self._connection() as conn:
+            conn.execute(
+                "insert into jobs (id, vendor_name, organization_id, created_at, updated_at) values (?, ?, ?, ?, ?)",
+                (job_id, vendor_name, organization_id, now, now),
+            )
+            conn.executemany(
+                "insert into job_stages (id, job_id, name, status, sequence) values (?, ?, ?, ?, ?)",
+                [
+                    (str(uuid4()), job_id, stage["name"], stage["status"], stage["sequence"])
+                    for stage in job_repository._default_stages()
+                ],
+            )
+            conn.execute("insert into job_metrics (job_id, metrics, updated_at) values (?, '{}', ?)", (job_id, now))
+        return self.load_job(job_id, None, "full")
+
+    def _load_metrics(self, conn: sqlite3.Connection, job_id: str, projection: str) -> Dict[str, Any]:
+        if projection == "status":
+            # json_each keeps the polled keys' extraction inside SQLite instead of decoding the whole blob
+            placeholders = ",".join("?" for _ in job_repository._STATUS_METRIC_KEYS)
+            rows = conn.execute(
+                "select e.key, json_quote(e.value) as value from job_metrics m, json_each(m.metrics) e "
+                f"where m.job_id = ? and e.key in ({placeholders})",
+                (job_id, *job_repository._STATUS_METRIC_KEYS),
+            ).fetchall()
+            return {row["key"]: json.loads(row["value"]) for row in rows}
+        row = conn.execute("select metrics from job_metrics where job_id = ?", (job_id,)).fetchone()
+        return json.loads(row["metrics"]) if row else {}
+
+    def load_job(self, job_id: str, organization_id: Optional[str], projection: str) -> Job | None:
+        conn = self._connection()
+        query = "select * from jobs where id = ?"
+        params: List[Any] = [job_id]
+        if organization_id:
+            query += " and organization_id = ?"
+            params.append(organization_id)
+        # One read transaction, so the aggregate is a consistent snapshot while the pipeline writes
+        with conn:
+            conn.execute("begin")
+            job_row = conn.execute(query, params).fetchone()
+            if job_row is None:
+                return None
+            aggregate: Dict[str, Any] = {
+                "job": dict(job_row),
+                "stages": [
+                    dict(row)
+                    for row in conn.execute("select * from job_stages where job_id = ? order by sequence", (job_id,))
+                ],
+                "metrics": self._load_metrics(conn, job_id, projection),
+            }
+            if projection != "status":
+                aggregate["documents"] = [
+                    {**dict(row), "metadata": json.loads(row["metadata"])}
+                    for row in conn.execute("select * from job_documents where job_id = ?", (job_id,))
+                ]
+            if projection == "full":
+                aggregate["discrepancies"] = [
+                    {"data": json.loads(row["data"])}
+                    for row in conn.execute("select data from job_discrepancies where job_id = ? order by rowid", (job_id,))
+                ]
+        return job_repository._job_from_aggregate(aggregate, projection)
+
+    def update_job_status(self, job_id: str, status: str, message: Optional[str]) -> None:
+        with self._connection() as conn:
+            conn.execute(
+                "update jobs set status = ?, message = ?, updated_at = ? where id = ?",
+                (status, message, _now(), job_id),
+            )
+
+    def update_stage_fields(self, job_id: str, stage_name: str, fields: Dict[str, Any]) -> None:
+        columns = [column for column in fields if column in _STAGE_COLUMNS]
+        if not columns:
+            return
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        with self._connection() as conn:
+            conn.execute(
+                f"update job_stages set {assignments} where job_id = ? and name = ?",
+                (*(fields[column] for column in columns), job_id, stage_name),
+            )
+
+    def sync_rows(self, table: str, job_id: str, rows: List[Dict[str, Any]], scope: Dict[str, Any], prune: bool) -> None:
+        columns = _TABLE_COLUMNS[table]
+        json_columns = _JSON_COLUMNS[table]
+        scope_sql = "".join(f" and {column} = ?" for column in scope)
+        scope_params = list(scope.values())
+        upsert_sql = (
+            f"insert into {table} ({', '.join(columns)}) values ({', '.join('?' for _ in columns)}) "
+            f"on conflict (job_id, natural_key) do update set "
+            + ", ".join(f"{column} = excluded.{column}" for column in columns if column not in ("id", "job_id", "natural_key"))
+        )
+        with self._connection() as conn:
+            existing = dict(
+                conn.execute(
+                    f"select natural_key, content_hash from {table} where job_id = ?{scope_sql}",
+                    (job_id, *scope_params),
+                ).fetchall()
+            )
+            changed = [row for row in rows if existing.get(row["natural_key"]) != row["content_hash"]]
+            desired = {row["natural_key"] for row in rows}
+            stale = [key for key in existing if key not in desired] if prune else []
+            conn.executemany(
+                upsert_sql,
+                [
+                    tuple(_dumps(row.get(column)) if column in json_columns else row.get(column) for column in columns)
+                    for row in changed
+                ],
+            )
+            conn.executemany(
+                f"delete from {table} where job_id = ?{scope_sql} and natural_key = ?",
+                [(job_id, *scope_params, key) for key in stale],
+            )
+        logger.debug(
+            "Synced %s for job %s: %s written, %s pruned, %s unchanged",
+            table,
+            job_id,
+            len(changed),
+            len(stale),
+            len(rows) - len(changed),
+        )
+
+    def save_metrics_patch(
+        self, job_id: str, patch: Dict[str, Any], removed: List[str], metrics: Dict[str, Any]
+    ) -> None:
+        conn = self._connection()
+        # Same top-level merge as merge_job_metrics; the immediate lock serialises concurrent patches
+        with conn:
+            conn.execute("begin immediate")
+            row = conn.execute("select metrics from job_metrics where job_id = ?", (job_id,)).fetchone()
+            stored = json.loads(row["metrics"]) if row else {}
+            for key in removed:
+                stored.pop(key, None)
+            stored.update(patch)
+            self._write_metrics(conn, job_id, stored)
+
+    def append_metrics_item(self, job_id: str, key: str, item: Any, limit: Optional[int]) -> None:
+        conn = self._connection()
+        path = f"$.{json.dumps(key)}"
+        # Only the one key is read and rewritten; the immediate lock serialises concurrent appends
+        with conn:
+            conn.execute("begin immediate")
+            row = conn.execute(
+                "select json_extract(metrics, ?) as items from job_metrics where job_id = ?", (path, job_id)
+            ).fetchone()
+            if row is None:
+                self._write_metrics(conn, job_id, {})
+            items = json.loads(row["items"]) if row and row["items"] else []
+            items = [*items, item][-limit:] if limit else [*items, item]
+            conn.execute(
+                "update job_metrics set metrics = json_set(metrics, ?, json(?)), updated_at = ? where job_id = ?",
+                (path, _dumps(items), _now(), job_id),
+            )
+
+    def replace_metrics(self, job_id: str, metrics: Dict[str, Any]) -> None:
+        with self._connection() as conn:
+            self._write_metrics(conn, job_id, metrics)
+
+    def query_discrepancies(
+        self,
+        job_id: str,
+        sort: str,
+        limit: int,
+        after: Optional[Tuple[Any, str]],
+        filters: Dict[str, Any],
+    ) -> List[Dict[str, Any]]:
+        column, descending = job_repository.DISCREPANCY_SORTS[sort]
+        clauses = ["job_id = ?", *(f"{filter_column} = ?" for filter_column in filters)]
+        params: List[Any] = [job_id, *filters.values()]
+        if after:
+            # Same keyset as the Supabase path: nulls sort last in both directions
+            value, row_id = after
+            if value is None:
+                clauses.append(f"({column} is null and id > ?)")
+                params.append(row_id)
+            else:
+                clauses.append(
+                    f"({column} {'<' if descending else '>'} ? or ({column} = ? and id > ?) or {column} is null)"
+                )
+                params.extend([value, value, row_id])
+        order = f"{column} {'desc' if descending else 'asc'} nulls last"
+        rows = self._connection().execute(
+            f"select id, {column}, data from job_discrepancies where {' and '.join(clauses)} order by {order}, id limit ?",
+            (*params, limit),
+        )
+        return [{**dict(row), "data": json.loads(row["data"])} for row in rows]
+
+    def discrepancy_totals(self, job_id: str) -> Dict[str, Any]:
+        conn = self._connection()
+        with conn:
+            conn.execute("begin")
+            count, total_value = conn.execute(
+                "select count(*), coalesce(sum(value), 0) from job_discrepancies where job_id = ?", (job_id,)
+            ).fetchone()
+            by_priority = conn.execute(
+                "select priority, count(*) as count, coalesce(sum(value), 0) as value from job_discrepancies "
+                "where job_id = ? group by priority order by min(priority_rank)",
+                (job_id,),
+            ).fetchall()
+            by_customer = conn.execute(
+                "select customer, count(*) as count, coalesce(sum(value), 0) as value from job_discrepancies "
+                "where job_id = ? group by customer order by value desc, customer",
+                (job_id,),
+            ).fetchall()
+            by_month = conn.execute(
+                "select invoice_month as month, coalesce(leakage_category, 'escalators') as category, "
+                "count(*) as count, coalesce(sum(value), 0) as value from job_discrepancies "
+                "where job_id = ? and invoice_month is not null group by month, category order by month, category",
+                (job_id,),
+            ).fetchall()
+        return {
+            "count": count,
+            "total_value": total_value,
+            "by_priority": [dict(row) for row in by_priority],
+            "by_customer": [dict(row) for row in by_customer],
+            "by_month": [dict(row) for row in by_month],
+        }
+
+    def _write_metrics(self, conn: sqlite3.Connection, job_id: str, metrics: Dict[str, Any]) -> None:
+        conn.execute(
+            "insert into job_metrics (job_id, metrics, updated_at) values (?, ?, ?) "
+            "on conflict (job_id) do update set metrics = excluded.metrics, updated_at = excluded.updated_at",
+            (job_id, _dumps(metrics), _now()),
+        )
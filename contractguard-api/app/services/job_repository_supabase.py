@@ -0,0 +1,384 @@
+"""
+Supabase backend for ``job_repository`` (``job_repository_backend = "supabase"``,
+the default).
+
+Jobs, stages, documents, discrepancies and metrics live in the Postgres tables
+from ``supabase/migrations`` and are read and written through PostgREST.
+Set-based work runs in database functions (job aggregate, metrics merge and
+append, discrepancy totals) when they are deployed, with client-side fallbacks
+when they are not. Loaded aggregates are cached in ``job_cache`` and every
+write invalidates the job's entries.
+"""
+
+from __future__ import annotations
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from app.config import get_settings
+from app.models import Job
+from app.services import job_cache, job_repository
+from app.services.job_repository import JobRepositoryBackend
+from app.services.storage_supabase import get_client
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Fallback loads fan out the per-table queries; the Supabase client is safe to share across threads
+_load_executor = ThreadPoolExecutor(max_workers=10, thread_name_prefix="job-load")
+
+_WRITE_CHUNK_SIZE = 500
+# Deletes filter on natural keys in the URL, so they go in smaller chunks
+_DELETE_CHUNK_SIZE = 100
+
+
+def _client():
+    client = get_client()
+    if not client:
+        raise RuntimeError("Supabase client not configured")
+    return client
+
+
+def _missing_function(exc: Exception) -> bool:
+    return "PGRST202" in str(exc) or "Could not find the function" in str(exc)
+
+
+def _query_job(client, job_id: str, organization_id: Optional[str]) -> List[Dict[str, Any]]:
+    query = client.table("jobs").select("*").eq("id", job_id)
+    if organization_id:
+        query = query.eq("organization_id", organization_id)
+    return query.limit(1).execute().data or []
+
+
+def _query_stages(client, job_id: str) -> List[Dict[str, Any]]:
+    query = client.table("job_stages").select("*").eq("job_id", job_id).order("sequence", desc=False)
+    return query.execute().data or []
+
+
+def _query_documents(client, job_id: str) -> List[Dict[str, Any]]:
+    return client.table("job_documents").select("*").eq("job_id", job_id).execute().data or []
+
+
+def _query_discrepancies(client, job_id: str) -> List[Dict[str, Any]]:
+    return client.table("job_discrepancies").select("*").eq("job_id", job_id).execute().data or []
+
+
+def _query_metrics(client, job_id: str, projection: str = "full") -> Dict[str, Any]:
+    if projection == "status":
+        # JSON-path selects so only the polled keys leave the database
+        columns = ",".join(f"{key}:metrics->{key}" for key in job_repository._STATUS_METRIC_KEYS)
+        rows = client.table("job_metrics").select(columns).eq("job_id", job_id).limit(1).execute().data or []
+        return {key: value for key, value in rows[0].items() if value is not None} if rows else {}
+    rows = client.table("job_metrics").select("metrics").eq("job_id", job_id).limit(1).execute().data or []
+    return rows[0]["metrics"] if rows else {}
+
+
+def _fetch_aggregate_concurrent(
+    client,
+    job_id: str,
+    organization_id: Optional[str],
+    projection: str = "full",
+) -> Dict[str, Any]:
+    """The table reads issued in parallel: one round trip of wall time instead of five."""
+    futures = {
+        "job": _load_executor.submit(_query_job, client, job_id, organization_id),
+        "stages": _load_executor.submit(_query_stages, client, job_id),
+        "metrics": _load_executor.submit(_query_metrics, client, job_id, projection),
+    }
+    if projection != "status":
+        futures["documents"] = _load_executor.submit(_query_documents, client, job_id)
+    if projection == "full":
+        futures["discrepancies"] = _load_executor.submit(_query_discrepancies, client, job_id)
+    results = {name: future.result() for name, future in futures.items()}
+    if not results["job"]:
+        return {}
+    results["job"] = results["job"][0]
+    return results
+
+
+def _existing_hashes(client, table: str, job_id: str, scope: Dict[str, Any]) -> Dict[str, str]:
+    hashes: Dict[str, str] = {}
+    while True:
+        query = client.table(table).select("natural_key, content_hash").eq("job_id", job_id)
+        for column, value in scope.items():
+            query = query.eq(column, value)
+        page = query.order("natural_key").range(len(hashes), len(hashes) + _WRITE_CHUNK_SIZE - 1).execute().data or []
+        hashes.update((row["natural_key"], row.get("content_hash")) for row in page)
+        if len(page) < _WRITE_CHUNK_SIZE:
+            return hashes
+
+
+def _postgrest_literal(value: Any) -> str:
+    if isinstance(value, (int, float)):
+        return str(value)
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def _keyset_filter(column: str, descending: bool, value: Any, row_id: str) -> str:
+    """PostgREST ``or`` tree selecting rows after (value, id) in ``column`` order, nulls last."""
+    after_id = f"id.gt.{row_id}"
+    if value is None:
+        return f"and({column}.is.null,{after_id})"
+    literal = _postgrest_literal(value)
+    return ",".join(
+        [f"{column}.{'lt' if descending else 'gt'}.{literal}", f"and({column}.eq.{literal},{after_id})", f"{column}.is.null"]
+    )
+
+
+def _totals_from_rows(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    by_priority: Dict[Any, Dict[str, Any]] = {}
+    by_customer: Dict[Any, Dict[str, Any]] = {}
+    by_month: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for row in rows:
+        value = float(row.get("value") or 0)
+        groups = [
+            by_priority.setdefault(row.get("priority"), {"priority": row.get("priority"), "count": 0, "value": 0.0}),
+            by_customer.setdefault(row.get("customer"), {"customer": row.get("customer"), "count": 0, "value": 0.0}),
+        ]
+        if row.get("invoice_month"):
+            key = (row["invoice_month"], row.get("leakage_category") or "escalators")
+            groups.append(by_month.setdefault(key, {"month": key[0], "category": key[1], "count": 0, "value": 0.0}))
+        for group in groups:
+            group["count"] += 1
+            group["value"] += value
+    ranks, unknown_rank = job_repository._PRIORITY_RANKS, job_repository._UNKNOWN_PRIORITY_RANK
+    return {
+        "count": len(rows),
+        "total_value": sum(group["value"] for group in by_priority.values()),
+        "by_priority": sorted(by_priority.values(), key=lambda group: ranks.get(group["priority"], unknown_rank)),
+        "by_customer": sorted(by_customer.values(), key=lambda group: (-group["value"], str(group["customer"]))),
+        "by_month": [by_month[key] for key in sorted(by_month)],
+    }
+
+
+class SupabaseJobRepository(JobRepositoryBackend):
+    def __init__(self) -> None:
+        # Each flag drops to False once PostgREST reports the function missing, so the fallback is taken directly
+        self._aggregate_rpc_available = True
+        self._merge_rpc_available = True
+        self._append_rpc_available = True
+        self._totals_rpc_available = True
+
+    def create_job_record(self, vendor_name: str, organization_id: Optional[str]) -> Job:
+        client = _client()
+        job_id = str(uuid4())
+        now = datetime.utcnow().isoformat()
+
+        client.table("jobs").insert(
+            {
+                "id": job_id,
+                "vendor_name": vendor_name,
+                "organization_id": organization_id,
+                "created_at": now,
+                "updated_at": now,
+            }
+        ).execute()
+
+        stage_rows = []
+        for stage in job_repository._default_stages():
+            stage_rows.append(
+                {
+                    "id": str(uuid4()),
+                    "job_id": job_id,
+                    "name": stage["name"],
+                    "status": stage["status"],
+                    "sequence": stage["sequence"],
+                }
+            )
+        client.table("job_stages").insert(stage_rows).execute()
+        client.table("job_metrics").upsert({"job_id": job_id, "metrics": {}, "updated_at": now}).execute()
+
+        return self.load_job(job_id, None, "full")
+
+    def _fetch_aggregate_rpc(
+        self,
+        client,
+        job_id: str,
+        organization_id: Optional[str],
+        projection: str = "full",
+    ) -> Dict[str, Any] | None:
+        """
+        One round trip through the ``job_aggregate_function`` RPC. Returns {} when
+        the job does not exist and None when the function is not deployed.
+        """
+        if not self._aggregate_rpc_available or not settings.job_aggregate_function:
+            return None
+        try:
+            response = client.rpc(
+                settings.job_aggregate_function,
+                {
+                    "p_job_id": job_id,
+                    "p_organization_id": organization_id,
+                    "p_projection": projection,
+                    "p_metric_keys": list(job_repository._STATUS_METRIC_KEYS),
+                },
+            ).execute()
+        except Exception as exc:
+            if _missing_function(exc):
+                logger.warning("Job aggregate function is not deployed; loading jobs with concurrent queries.")
+                self._aggregate_rpc_available = False
+            else:
+                logger.error("Job aggregate RPC failed for %s: %s", job_id, exc)
+            return None
+        return response.data or {}
+
+    def load_job(self, job_id: str, organization_id: Optional[str], projection: str) -> Job | None:
+        aggregate = job_cache.get(job_id, projection)
+        if aggregate is None:
+            client = _client()
+            stamp = job_cache.version(job_id)
+            aggregate = self._fetch_aggregate_rpc(client, job_id, organization_id, projection)
+            if aggregate is None:
+                aggregate = _fetch_aggregate_concurrent(client, job_id, organization_id, projection)
+            if not aggregate or not aggregate.get("job"):
+                return None
+            job_cache.put(job_id, projection, aggregate, stamp)
+        elif organization_id and aggregate["job"].get("organization_id") != organization_id:
+            return None
+        return job_repository._job_from_aggregate(aggregate, projection)
+
+    def update_job_status(self, job_id: str, status: str, message: Optional[str]) -> None:
+        client = _client()
+        client.table("jobs").update(
+            {"status": status, "message": message, "updated_at": datetime.utcnow().isoformat()}
+        ).eq("id", job_id).execute()
+        job_cache.invalidate(job_id)
+
+    def update_stage_fields(self, job_id: str, stage_name: str, fields: Dict[str, Any]) -> None:
+        # One statement keyed by (job_id, name); uq_job_stages_job_name keeps it to a single row
+        client = _client()
+        client.table("job_stages").update(fields).eq("job_id", job_id).eq("name", stage_name).execute()
+        job_cache.invalidate(job_id)
+
+    def sync_rows(self, table: str, job_id: str, rows: List[Dict[str, Any]], scope: Dict[str, Any], prune: bool) -> None:
+        client = _client()
+        existing = _existing_hashes(client, table, job_id, scope)
+        changed = [row for row in rows if existing.get(row["natural_key"]) != row["content_hash"]]
+        desired = {row["natural_key"] for row in rows}
+        stale = [key for key in existing if key not in desired] if prune else []
+
+        # Upsert before pruning so an interrupted sync leaves a superset, never a gap
+        for start in range(0, len(changed), _WRITE_CHUNK_SIZE):
+            chunk = changed[start : start + _WRITE_CHUNK_SIZE]
+            client.table(table).upsert(chunk, on_conflict="job_id,natural_key").execute()
+        for start in range(0, len(stale), _DELETE_CHUNK_SIZE):
+            query = client.table(table).delete().eq("job_id", job_id)
+            for column, value in scope.items():
+                query = query.eq(column, value)
+            query.in_("natural_key", stale[start : start + _DELETE_CHUNK_SIZE]).execute()
+        if changed or stale:
+            job_cache.invalidate(job_id)
+        logger.debug(
+            "Synced %s for job %s: %s written, %s pruned, %s unchanged",
+            table,
+            job_id,
+            len(changed),
+            len(stale),
+            len(rows) - len(changed),
+        )
+
+    def _merge_metrics_rpc(self, client, job_id: str, patch: Dict[str, Any], removed: List[str]) -> bool:
+        if not self._merge_rpc_available or not settings.job_metrics_merge_function:
+            return False
+        try:
+            client.rpc(
+                settings.job_metrics_merge_function,
+                {"p_job_id": job_id, "p_patch": patch, "p_removed": removed},
+            ).execute()
+        except Exception as exc:
+            if _missing_function(exc):
+                logger.warning("Metrics merge function is not deployed; saving whole metrics documents.")
+                self._merge_rpc_available = False
+                return False
+            raise
+        return True
+
+    def save_metrics_patch(
+        self, job_id: str, patch: Dict[str, Any], removed: List[str], metrics: Dict[str, Any]
+    ) -> None:
+        client = _client()
+        if not self._merge_metrics_rpc(client, job_id, patch, removed):
+            self.replace_metrics(job_id, dict(metrics or {}))
+            return
+        job_cache.invalidate(job_id)
+
+    def replace_metrics(self, job_id: str, metrics: Dict[str, Any]) -> None:
+        client = _client()
+        client.table("job_metrics").upsert(
+            {
+                "job_id": job_id,
+                "metrics": metrics,
+                "updated_at": datetime.utcnow().isoformat(),
+            }
+        ).execute()
+        job_cache.invalidate(job_id)
+
+    def append_metrics_item(self, job_id: str, key: str, item: Any, limit: Optional[int]) -> None:
+        client = _client()
+        if self._append_rpc_available and settings.job_metrics_append_function:
+            try:
+                client.rpc(
+                    settings.job_metrics_append_function,
+                    {"p_job_id": job_id, "p_key": key, "p_item": item, "p_limit": limit},
+                ).execute()
+                job_cache.invalidate(job_id)
+                return
+            except Exception as exc:
+                if not _missing_function(exc):
+                    raise
+                logger.warning("Metrics append function is not deployed; merging the appended key client-side.")
+                self._append_rpc_available = False
+        rows = client.table("job_metrics").select(f"items:metrics->{key}").eq("job_id", job_id).limit(1).execute().data
+        items = (rows[0].get("items") if rows else None) or []
+        items = [*items, item][-limit:] if limit else [*items, item]
+        if self._merge_metrics_rpc(client, job_id, {key: items}, []):
+            job_cache.invalidate(job_id)
+            return
+        # Neither function is deployed, so the whole document has to be rewritten
+        job = self.load_job(job_id, None, "full")
+        if job:
+            self.replace_metrics(job_id, {**job.metrics, key: items})
+
+    def query_discrepancies(
+        self,
+        job_id: str,
+        sort: str,
+        limit: int,
+        after: Optional[Tuple[Any, str]],
+        filters: Dict[str, Any],
+    ) -> List[Dict[str, Any]]:
+        column, descending = job_repository.DISCREPANCY_SORTS[sort]
+        query = _client().table("job_discrepancies").select(f"id, {column}, data").eq("job_id", job_id)
+        for filter_column, value in filters.items():
+            query = query.eq(filter_column, value)
+        if after:
+            query = query.or_(_keyset_filter(column, descending, *after))
+        # postgrest-py 0.13 can only append ``.nullsfirst``, so the nulls-last term is spelled out
+        direction = "desc" if descending else "asc"
+        return query.order(f"{column}.{direction}.nullslast").order("id").limit(limit).execute().data or []
+
+    def discrepancy_totals(self, job_id: str) -> Dict[str, Any]:
+        client = _client()
+        if self._totals_rpc_available and settings.discrepancy_totals_function:
+            try:
+                response = client.rpc(settings.discrepancy_totals_function, {"p_job_id": job_id}).execute()
+                return response.data or _totals_from_rows([])
+            except Exception as exc:
+                if not _missing_function(exc):
+                    raise
+                logger.warning("Discrepancy totals function is not deployed; aggregating discrepancy columns client-side.")
+                self._totals_rpc_available = False
+        # Fallback: only the grouped columns leave the database, never the data blobs
+        rows: List[Dict[str, Any]] = []
+        while True:
+            query = client.table("job_discrepancies").select(
+                "id, customer, priority, value, invoice_month, leakage_category"
+            ).eq("job_id", job_id)
+            page = query.order("id").range(len(rows), len(rows) + _WRITE_CHUNK_SIZE - 1).execute().data or []
+            rows.extend(page)
+            if len(page) < _WRITE_CHUNK_SIZE:
+                return _totals_from_rows(rows)
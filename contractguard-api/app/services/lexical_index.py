@@ -0,0 +1,169 @@
+"""
+Per-job BM25 index over the RAG chunks.
+
+Built at indexing time from the same chunks as the vector store and persisted
+as one JSON file per job, so the chat copilot can retrieve evidence without
+any network call, or fuse lexical ranks with vector ranks. Writers serialize
+on a per-job file lock and replace the file atomically.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import re
+import tempfile
+import threading
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from app.config import get_settings
+from app.services.file_lock import atomic_write, file_lock
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of", "on", "or",
+    "that", "the", "this", "to", "was", "will", "with", "what", "which", "who", "how", "do", "does",
+}
+_MAX_CACHED_JOBS = 32
+
+
+def _tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN_PATTERN.findall((text or "").lower()) if token not in _STOPWORDS]
+
+
+def _index_dir() -> Path:
+    return Path(settings.rag_lexical_index_dir or Path(tempfile.gettempdir()) / "contractguard_lexical_index")
+
+
+class BM25Index:
+    """Okapi BM25 over a list of chunk records, with in-memory posting lists."""
+
+    def __init__(self, chunks: List[Dict[str, Any]], k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.doc_lengths: List[int] = []
+        for idx, chunk in enumerate(chunks):
+            counts = Counter(_tokenize(chunk.get("text", "")))
+            self.doc_lengths.append(sum(counts.values()))
+            for term, freq in counts.items():
+                self.postings.setdefault(term, []).append((idx, freq))
+        self.avg_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+
+    def search(self, query: str, top_k: int) -> List[Tuple[float, Dict[str, Any]]]:
+        if not self.chunks or top_k <= 0:
+            return []
+        total = len(self.chunks)
+        scores: Dict[int, float] = {}
+        for term in set(_tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for idx, freq in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[idx] / (self.avg_length or 1.0))
+                scores[idx] = scores.get(idx, 0.0) + idf * freq * (self.k1 + 1) / (freq + norm)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [(score, self.chunks[idx]) for idx, score in ranked]
+
+
+_cache: "OrderedDict[str, Tuple[Tuple[int, int, int], BM25Index]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _job_path(job_id: str) -> Path:
+    return _index_dir() / f"{job_id}.json"
+
+
+def _load(job_id: str) -> BM25Index | None:
+    path = _job_path(job_id)
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    # Every write replaces the file, so the inode alone tells a reload is due; mtime guards in-place edits
+    stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        cached = _cache.get(job_id)
+        if cached and cached[0] == stamp:
+            _cache.move_to_end(job_id)
+            return cached[1]
+    try:
+        chunks = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as exc:
+        logger.error("Failed to load lexical index for job %s: %s", job_id, exc)
+        return None
+    index = BM25Index(chunks)
+    with _lock:
+        _cache[job_id] = (stamp, index)
+        _cache.move_to_end(job_id)
+        while len(_cache) > _MAX_CACHED_JOBS:
+            _cache.popitem(last=False)
+    return index
+
+
+def _lock_path(job_id: str) -> Path:
+    return _index_dir() / f"{job_id}.lock"
+
+
+def replace_chunks(job_id: str, table: str, chunks: List[Dict[str, Any]]) -> None:
+    """
+    Makes ``chunks`` the job's indexed chunks from ``table``: they are upserted
+    by id and any other chunk from that table is dropped. Chunks persisted
+    before they were tagged with a table count as the table being replaced.
+    The read-modify-write holds the job's file lock, so the API and a worker
+    indexing the same job cannot drop each other's chunks.
+    """
+    path = _job_path(job_id)
+    try:
+        with file_lock(_lock_path(job_id)):
+            # Read the file itself, not the cache: another process may have just replaced it
+            try:
+                existing = json.loads(path.read_text(encoding="utf-8"))
+            except FileNotFoundError:
+                if not chunks:
+                    return
+                existing = []
+            merged: Dict[str, Dict[str, Any]] = {
+                chunk["id"]: chunk for chunk in existing if chunk.get("source_table") not in (None, table)
+            }
+            for chunk in chunks:
+                merged[chunk["id"]] = {
+                    **{key: value for key, value in chunk.items() if key != "embedding"},
+                    "source_table": table,
+                }
+            atomic_write(path, json.dumps(list(merged.values()), default=str).encode("utf-8"))
+    except (OSError, ValueError) as exc:
+        logger.error("Failed to persist lexical index for job %s: %s", job_id, exc)
+        return
+    with _lock:
+        _cache.pop(job_id, None)
+
+
+def search(job_id: str, query: str, top_k: int) -> List[Tuple[float, Dict[str, Any]]]:
+    index = _load(job_id)
+    return index.search(query, top_k) if index else []
+
+
+def reciprocal_rank_fusion(
+    rankings: List[List[Tuple[float, Dict[str, Any]]]],
+    top_k: int,
+    k: int = 60,
+) -> List[Tuple[float, Dict[str, Any]]]:
+    """Fuse ranked (score, row) lists by summing 1 / (k + rank) per row id."""
+    fused: Dict[str, float] = {}
+    rows: Dict[str, Dict[str, Any]] = {}
+    for ranking in rankings:
+        for rank, (_, row) in enumerate(ranking, start=1):
+            row_id = row.get("id") or row.get("text")
+            fused[row_id] = fused.get(row_id, 0.0) + 1.0 / (k + rank)
+            rows.setdefault(row_id, row)
+    ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:top_k]
+    return [(score, rows[row_id]) for row_id, score in ranked]
@@ -5,17 +5,30 @@ Provides deep contract intelligence and generates audit rules automatically
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
+import logging
+import os
+import re
+import tempfile
+import time
 from collections import Counter
-from typing import Any, Dict, List
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from openai import APIError, OpenAI, AsyncOpenAI
 
 from app.config import get_settings
-from app.services import job_manager
+from app.services import job_manager, token_stream
+from app.services.file_lock import atomic_write
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
 
+_DIRECT_PAYLOAD_DOCUMENTS = 3
+_DIGEST_CACHE_DIR = Path(tempfile.gettempdir()) / "contractguard_digest_cache"
+
 _IMPACT_MULTIPLIER = {
     "cpi_uplift": 15000,
     "discount_floor": 9000,
@@ -39,11 +52,15 @@ def _shorten(text: str, limit: int = 320) -> str:
     return f"{text[:limit].rstrip()}…"
 
 
-def _prepare_prompt_payload(documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def _prepare_prompt_payload(
+    documents: List[Dict[str, Any]],
+    document_limit: int = 3,
+    clause_limit: int = 10,
+) -> List[Dict[str, Any]]:
     """Prepare document data for LLM analysis."""
     payload: List[Dict[str, Any]] = []
     
-    for doc in documents[:3]:
+    for doc in documents[:document_limit]:
         doc_summary = {
             "filename": doc.get("filename"),
             "clauses": [],
@@ -52,7 +69,7 @@ def _prepare_prompt_payload(documents: List[Dict[str, Any]]) -> List[Dict[str, A
         }
         
         # Include clause snippets
-        for clause in doc.get("clauses", [])[:10]:
+        for clause in doc.get("clauses", [])[:clause_limit]:
             doc_summary["clauses"].append({
                 "label": clause.get("label"),
                 "text": _shorten(clause.get("text", "")),
@@ -118,6 +135,13 @@ def _build_insights(clause_counts: Counter, documents: List[Dict[str, Any]]) ->
     return insights
 
 
+def _confidence_value(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
 def _extract_rules_from_gpt4o_terms(documents: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
     Extract audit rules from GPT-4o contract terms.
@@ -134,25 +158,38 @@ def _extract_rules_from_gpt4o_terms(documents: List[Dict[str, Any]]) -> Dict[str
         "service_credit_rate": None,
     }
     
+    # Across a portfolio, keep the value from the most confident extraction
+    # rather than whichever document happened to come first
+    best_confidence = {"base_amount": -1.0, "escalation_rate": -1.0, "effective_start_date": -1.0}
+    
     for doc in documents:
         gpt4o_terms = doc.get("gpt4o_contract_terms", {})
         
         if not gpt4o_terms:
             continue
         
+        confidence = gpt4o_terms.get("extraction_confidence") or {}
+        pricing_confidence = _confidence_value(confidence.get("base_pricing", confidence.get("overall")))
+        escalation_confidence = _confidence_value(confidence.get("escalation", confidence.get("overall")))
+        
         # Extract base pricing
         base_pricing = gpt4o_terms.get("base_pricing", {})
-        if base_pricing.get("amount") and not rules["base_amount"]:
+        if base_pricing.get("amount") and pricing_confidence > best_confidence["base_amount"]:
             rules["base_amount"] = base_pricing["amount"]
-        if base_pricing.get("currency"):
+            best_confidence["base_amount"] = pricing_confidence
+            if base_pricing.get("currency"):
+                rules["currency"] = base_pricing["currency"]
+        elif base_pricing.get("currency") and not rules["base_amount"]:
             rules["currency"] = base_pricing["currency"]
         
         # Extract escalation terms
         escalation = gpt4o_terms.get("escalation", {})
-        if escalation.get("rate") and not rules["escalation_rate"]:
+        if escalation.get("rate") and escalation_confidence > best_confidence["escalation_rate"]:
             rules["escalation_rate"] = escalation["rate"]
-        if escalation.get("effective_date") and not rules["effective_start_date"]:
+            best_confidence["escalation_rate"] = escalation_confidence
+        if escalation.get("effective_date") and escalation_confidence > best_confidence["effective_start_date"]:
             rules["effective_start_date"] = escalation["effective_date"]
+            best_confidence["effective_start_date"] = escalation_confidence
         
         # Extract invoice identifiers
         invoice_ids = gpt4o_terms.get("invoice_identifiers", {})
@@ -175,29 +212,273 @@ def _extract_rules_from_gpt4o_terms(documents: List[Dict[str, Any]]) -> Dict[str
     return rules
 
 
-async def analyze_with_gpt4o_deep_insights(
+_RISK_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "additionalProperties": False,
+    "required": ["title", "description", "impact", "priority"],
+    "properties": {
+        "title": {"type": "string"},
+        "description": {"type": "string"},
+        "impact": {"type": "number"},
+        "priority": {"type": "string", "enum": ["high", "medium", "low"]},
+    },
+}
+
+_RECOMMENDATION_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "additionalProperties": False,
+    "required": ["action", "priority", "category"],
+    "properties": {
+        "action": {"type": "string"},
+        "priority": {"type": "string", "enum": ["immediate", "short_term", "ongoing"]},
+        "category": {"type": "string", "enum": ["audit", "billing", "legal", "operational"]},
+    },
+}
+
+_DEEP_INSIGHTS_SCHEMA: Dict[str, Any] = {
+    "name": "contract_deep_insights",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "additionalProperties": False,
+        "required": [
+            "summary",
+            "risk_level",
+            "confidence_score",
+            "key_risks",
+            "recommendations",
+            "audit_triggers",
+            "missing_information",
+        ],
+        "properties": {
+            "summary": {"type": "string", "description": "The full analysis as well-formatted markdown."},
+            "risk_level": {"type": "string", "enum": ["high", "medium", "low"]},
+            "confidence_score": {"type": "number"},
+            "key_risks": {"type": "array", "items": _RISK_SCHEMA},
+            "recommendations": {"type": "array", "items": _RECOMMENDATION_SCHEMA},
+            "audit_triggers": {"type": "array", "items": {"type": "string"}},
+            "missing_information": {"type": "array", "items": {"type": "string"}},
+        },
+    },
+}
+
+_DEEP_INSIGHTS_SYSTEM_PROMPT = (
+    "You are ContractGuard AI, a revenue assurance expert. Provide clear, actionable insights focused on preventing revenue leakage."
+)
+
+
+class _JsonStringFieldStream:
+    """Incrementally decodes one string field out of a JSON object streamed as text chunks."""
+
+    def __init__(self, field: str):
+        self._marker = re.compile(r'"%s"\s*:\s*"' % re.escape(field))
+        self._buffer = ""
+        self._start: Optional[int] = None
+        self._end: Optional[int] = None
+        self._scanned = 0
+        self._escaped = False
+        self._emitted = 0
+
+    def feed(self, chunk: str) -> str:
+        """Add a chunk and return the newly decoded part of the field value."""
+        self._buffer += chunk
+        if self._end is not None:
+            return ""
+        if self._start is None:
+            match = self._marker.search(self._buffer)
+            if not match:
+                return ""
+            self._start = self._scanned = match.end()
+
+        # Find the closing quote, carrying escape state across chunks
+        while self._scanned < len(self._buffer):
+            char = self._buffer[self._scanned]
+            if self._escaped:
+                self._escaped = False
+            elif char == "\\":
+                self._escaped = True
+            elif char == '"':
+                self._end = self._scanned
+                break
+            self._scanned += 1
+
+        raw = self._buffer[self._start:self._end if self._end is not None else self._scanned]
+        if self._escaped:
+            raw = raw[:-1]
+        try:
+            decoded = json.loads(f'"{raw}"')
+        except ValueError:
+            # Incomplete \uXXXX escape; the next chunk completes it
+            return ""
+        if decoded and "\ud800" <= decoded[-1] <= "\udbff":
+            # Hold back half of a surrogate pair until its partner arrives
+            decoded = decoded[:-1]
+        delta = decoded[self._emitted:]
+        self._emitted = len(decoded)
+        return delta
+
+
+_DIGEST_SHAPE = """{
+  "documents": ["<filenames covered>"],
+  "summary": "<3-5 sentences on pricing, escalation and revenue leakage risk>",
+  "pricing_terms": ["<base amounts, currencies, frequencies, escalation rates and effective dates, with filename>"],
+  "risks": ["<specific revenue leakage risks, with filename>"]
+}"""
+
+
+def _digest_cache_path(cache_key: str) -> Path:
+    return _DIGEST_CACHE_DIR / f"{hashlib.sha256(cache_key.encode('utf-8')).hexdigest()}.json"
+
+
+def _load_cached_digest(cache_path: Path) -> Dict[str, Any] | None:
+    if not cache_path.exists():
+        return None
+    try:
+        digest = json.loads(cache_path.read_text(encoding="utf-8"))
+        os.utime(cache_path)  # mtime orders eviction, so hits stay cached
+        return digest
+    except (OSError, ValueError):
+        return None
+
+
+def _prune_digest_cache(max_bytes: int) -> None:
+    """Evicts least recently used digests until the cache fits in ``max_bytes``."""
+    entries = []
+    for path in _DIGEST_CACHE_DIR.glob("*.json"):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+
+
+def _store_cached_digest(cache_path: Path, digest: Dict[str, Any]) -> None:
+    try:
+        _DIGEST_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        atomic_write(cache_path, json.dumps(digest).encode("utf-8"))
+        _prune_digest_cache(settings.llm_digest_cache_max_bytes)
+    except OSError as exc:
+        logger.warning("Failed to cache contract digest: %s", exc)
+
+
+async def _digest_completion(client: AsyncOpenAI, prompt: str, max_tokens: int) -> Dict[str, Any]:
+    """JSON-mode completion for one map/reduce step, cached on disk by model and prompt."""
+    cache_path = _digest_cache_path(f"{settings.openai_model}\n{prompt}")
+    cached = await asyncio.to_thread(_load_cached_digest, cache_path)
+    if cached is not None:
+        return cached
+
+    response = await client.chat.completions.create(
+        model=settings.openai_model,
+        messages=[
+            {"role": "system", "content": "You condense contract analyses for revenue assurance. Return only valid JSON."},
+            {"role": "user", "content": prompt},
+        ],
+        response_format={"type": "json_object"},
+        temperature=0.1,
+        max_tokens=max_tokens,
+    )
+    digest = json.loads(response.choices[0].message.content)
+    await asyncio.to_thread(_store_cached_digest, cache_path, digest)
+    return digest
+
+
+async def _summarize_document(client: AsyncOpenAI, doc: Dict[str, Any]) -> Dict[str, Any]:
+    payload = _prepare_prompt_payload([doc], clause_limit=30)[0]
+    prompt = f"""Summarize this contract extraction for a portfolio-level revenue leakage review.
+
+DOCUMENT:
+{json.dumps(payload, indent=2, ensure_ascii=False)}
+
+Return JSON shaped as:
+{_DIGEST_SHAPE}"""
+    return await _digest_completion(client, prompt, max_tokens=500)
+
+
+async def _reduce_digests(client: AsyncOpenAI, digests: List[Dict[str, Any]]) -> Dict[str, Any]:
+    prompt = f"""Merge these contract digests into one digest. Keep every distinct pricing term and risk that
+matters for auditing invoices; drop repetition.
+
+DIGESTS:
+{json.dumps(digests, indent=2, ensure_ascii=False)}
+
+Return JSON shaped as:
+{_DIGEST_SHAPE}"""
+    return await _digest_completion(client, prompt, max_tokens=900)
+
+
+def _local_digest(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Digest built from extracted terms alone, used when the summary call fails."""
+    terms = doc.get("gpt4o_contract_terms") or {}
+    return {
+        "documents": [doc.get("filename")],
+        "summary": "",
+        "pricing_terms": [
+            json.dumps({key: terms.get(key) for key in ("base_pricing", "escalation") if terms.get(key)})
+        ] if terms else [],
+        "risks": [],
+    }
+
+
+def _merge_digests_locally(digests: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Concatenating merge, used when the reduce call fails."""
+    return {
+        "documents": [name for digest in digests for name in digest.get("documents") or []],
+        "summary": _shorten(" ".join(digest.get("summary") or "" for digest in digests).strip(), 1200),
+        "pricing_terms": [term for digest in digests for term in digest.get("pricing_terms") or []][:20],
+        "risks": [risk for digest in digests for risk in digest.get("risks") or []][:20],
+    }
+
+
+async def _build_portfolio_payload(
+    client: AsyncOpenAI,
     documents: List[Dict[str, Any]],
-    clause_counts: Counter
-) -> Dict[str, Any]:
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
     """
-    Use GPT-4o to generate deep contract insights and risk analysis.
-    This goes beyond simple clause detection to provide actionable intelligence.
+    Prompt payload covering every document at a bounded size. Small jobs send the
+    documents directly; larger ones are summarized per document concurrently and
+    reduced in groups of ``llm_reduce_group_size`` until one group remains.
+    Returns (payload, coverage).
     """
-    api_key = settings.openai_api_key
-    if not api_key:
-        return {
-            "summary": "GPT-4o analysis unavailable (missing API key)",
-            "risk_assessment": {},
-            "recommendations": []
-        }
-    
-    try:
-        client = AsyncOpenAI(api_key=api_key)
-        
-        # Prepare comprehensive contract data
-        prompt_payload = _prepare_prompt_payload(documents)
-        
-        prompt = f"""You are ContractGuard AI, an expert contract analyst specializing in revenue leakage detection.
+    group_size = max(2, settings.llm_reduce_group_size)
+    if len(documents) <= _DIRECT_PAYLOAD_DOCUMENTS:
+        return _prepare_prompt_payload(documents), {"documents": len(documents), "reduce_levels": 0}
+
+    semaphore = asyncio.Semaphore(max(1, settings.llm_summary_concurrency))
+
+    async def _summarize(doc: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                return await _summarize_document(client, doc)
+            except Exception as exc:
+                logger.warning("Digest call failed for %s, using extracted terms only: %s", doc.get("filename"), exc)
+                return _local_digest(doc)
+
+    async def _reduce(group: List[Dict[str, Any]]) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                return await _reduce_digests(client, group)
+            except Exception as exc:
+                logger.warning("Digest reduce call failed for %s digests, merging locally: %s", len(group), exc)
+                return _merge_digests_locally(group)
+
+    digests = list(await asyncio.gather(*[_summarize(doc) for doc in documents]))
+    levels = 0
+    while len(digests) > group_size:
+        groups = [digests[idx : idx + group_size] for idx in range(0, len(digests), group_size)]
+        digests = list(await asyncio.gather(*[_reduce(group) for group in groups]))
+        levels += 1
+    return digests, {"documents": len(documents), "reduce_levels": levels}
+
+
+def _build_deep_insights_prompt(prompt_payload: List[Dict[str, Any]], clause_counts: Counter) -> str:
+    return f"""You are ContractGuard AI, an expert contract analyst specializing in revenue leakage detection.
 
 CONTRACTS ANALYZED:
 {json.dumps(prompt_payload, indent=2, ensure_ascii=False)}
@@ -232,30 +513,95 @@ Provide a comprehensive analysis covering:
    - How confident are you in the extracted terms?
    - Any missing information needed for accurate auditing?
 
-Keep it concise but actionable. Focus on FINANCIAL IMPACT and NEXT STEPS.
-
-Respond in well-formatted markdown."""
-
-        response = await client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are ContractGuard AI, a revenue assurance expert. Provide clear, actionable insights focused on preventing revenue leakage."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.3,
-            max_tokens=2000
-        )
-        
-        analysis_text = response.choices[0].message.content
-        
-        # Now extract structured recommendations
-        structured_prompt = f"""Based on this contract analysis:
+Keep it concise but actionable. Focus on FINANCIAL IMPACT and NEXT STEPS."""
+
+
+# Output budgets for the single call; a completion cut off at one is retried once at the next
+_SINGLE_CALL_MAX_TOKENS = (3500, 8000)
+
+
+class _TruncatedCompletion(Exception):
+    """The model stopped at ``max_tokens``, so the JSON it streamed is incomplete."""
+
+
+async def _single_call_insights(
+    client: AsyncOpenAI,
+    prompt: str,
+    on_summary_delta: Optional[Callable[[str], None]] = None,
+    max_tokens: int = _SINGLE_CALL_MAX_TOKENS[0],
+) -> Dict[str, Any]:
+    """One structured-output call that returns the markdown summary and the risk fields together."""
+    stream = await client.chat.completions.create(
+        model="gpt-4o",
+        messages=[
+            {"role": "system", "content": _DEEP_INSIGHTS_SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": prompt
+                + "\n\nPut the full analysis, as well-formatted markdown, in the `summary` field and fill the "
+                "structured fields from the same analysis.",
+            },
+        ],
+        response_format={"type": "json_schema", "json_schema": _DEEP_INSIGHTS_SCHEMA},
+        temperature=0.3,
+        max_tokens=max_tokens,
+        stream=True,
+    )
+    parts: List[str] = []
+    finish_reason = None
+    summary_stream = _JsonStringFieldStream("summary")
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].finish_reason:
+            finish_reason = chunk.choices[0].finish_reason
+        content = chunk.choices[0].delta.content if chunk.choices else None
+        if not content:
+            continue
+        parts.append(content)
+        delta = summary_stream.feed(content)
+        if delta and on_summary_delta:
+            on_summary_delta(delta)
+    if finish_reason == "length":
+        raise _TruncatedCompletion(f"single-call output truncated at max_tokens={max_tokens}")
+    return json.loads("".join(parts))
+
+
+async def _two_call_insights(
+    client: AsyncOpenAI,
+    prompt: str,
+    on_summary_delta: Optional[Callable[[str], None]] = None,
+) -> Tuple[Dict[str, Any], float]:
+    """
+    Original flow: free-form markdown analysis, then a second call to structure it.
+    Also returns the latency of the structuring call.
+    """
+    stream = await client.chat.completions.create(
+        model="gpt-4o",
+        messages=[
+            {
+                "role": "system",
+                "content": _DEEP_INSIGHTS_SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": prompt + "\n\nRespond in well-formatted markdown."
+            }
+        ],
+        temperature=0.3,
+        max_tokens=2000,
+        stream=True
+    )
+    
+    parts: List[str] = []
+    async for chunk in stream:
+        content = chunk.choices[0].delta.content if chunk.choices else None
+        if content:
+            parts.append(content)
+            if on_summary_delta:
+                on_summary_delta(content)
+    analysis_text = "".join(parts)
+    
+    # Now extract structured recommendations
+    structured_prompt = f"""Based on this contract analysis:
 
 {analysis_text}
 
@@ -289,48 +635,122 @@ Extract structured data in JSON format:
 
 Return ONLY valid JSON."""
 
-        structured_response = await client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "Extract structured data from contract analysis. Return only valid JSON."
-                },
-                {
-                    "role": "user",
-                    "content": structured_prompt
-                }
-            ],
-            temperature=0.1,
-            max_tokens=1500
-        )
-        
-        structured_text = structured_response.choices[0].message.content.strip()
-        
-        # Clean JSON
-        if structured_text.startswith("```"):
-            structured_text = structured_text.split("```")[1]
-            if structured_text.startswith("json"):
-                structured_text = structured_text[4:]
-            structured_text = structured_text.strip()
+    structuring_started = time.perf_counter()
+    structured_response = await client.chat.completions.create(
+        model="gpt-4o",
+        messages=[
+            {
+                "role": "system",
+                "content": "Extract structured data from contract analysis. Return only valid JSON."
+            },
+            {
+                "role": "user",
+                "content": structured_prompt
+            }
+        ],
+        temperature=0.1,
+        max_tokens=1500
+    )
+    structuring_seconds = time.perf_counter() - structuring_started
+    
+    structured_text = structured_response.choices[0].message.content.strip()
+    
+    # Clean JSON
+    if structured_text.startswith("```"):
+        structured_text = structured_text.split("```")[1]
+        if structured_text.startswith("json"):
+            structured_text = structured_text[4:]
+        structured_text = structured_text.strip()
+    
+    structured_data = json.loads(structured_text)
+    structured_data["summary"] = analysis_text
+    return structured_data, structuring_seconds
+
+
+async def analyze_with_gpt4o_deep_insights(
+    documents: List[Dict[str, Any]],
+    clause_counts: Counter,
+    on_summary_delta: Optional[Callable[[str], None]] = None,
+    on_summary_reset: Optional[Callable[[], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Use GPT-4o to generate deep contract insights and risk analysis.
+    This goes beyond simple clause detection to provide actionable intelligence.
+
+    With ``deep_insights_mode == "single_call"`` the summary and structured fields
+    come back from one structured-output request; the two-call flow is used
+    otherwise, or when the single call fails. Summary text is passed to
+    ``on_summary_delta`` as it is generated; ``on_summary_reset`` fires if a
+    partially streamed single-call summary is abandoned for the fallback.
+    """
+    api_key = settings.openai_api_key
+    if not api_key:
+        return {
+            "summary": "GPT-4o analysis unavailable (missing API key)",
+            "risk_assessment": {},
+            "recommendations": []
+        }
+    
+    # "seconds" is always end to end (payload building through the last call), whichever path ran;
+    # "delta_seconds" is calls_seconds minus the configured two-call baseline (negative means faster)
+    latency: Dict[str, Any] = {"mode": "two_call"}
+    started = time.perf_counter()
+    try:
+        client = AsyncOpenAI(api_key=api_key)
+        # Prepare comprehensive contract data
+        prompt_payload, coverage = await _build_portfolio_payload(client, documents)
+        prompt = _build_deep_insights_prompt(prompt_payload, clause_counts)
+        latency["payload_seconds"] = round(time.perf_counter() - started, 3)
         
-        structured_data = json.loads(structured_text)
+        structured_data = None
+        if settings.deep_insights_mode == "single_call":
+            single_started = time.perf_counter()
+            for max_tokens in _SINGLE_CALL_MAX_TOKENS:
+                try:
+                    structured_data = await _single_call_insights(client, prompt, on_summary_delta, max_tokens)
+                    latency["mode"] = "single_call"
+                    latency["max_tokens"] = max_tokens
+                    break
+                except Exception as exc:
+                    if on_summary_reset:
+                        on_summary_reset()
+                    if isinstance(exc, _TruncatedCompletion):
+                        latency.setdefault("truncated_at_max_tokens", []).append(max_tokens)
+                        continue
+                    latency["single_call_error"] = str(exc)
+                    break
+            if structured_data is None:
+                latency["single_call_seconds"] = round(time.perf_counter() - single_started, 3)
+        if structured_data is None:
+            structured_data, structuring_seconds = await _two_call_insights(client, prompt, on_summary_delta)
+            latency["structuring_call_seconds"] = round(structuring_seconds, 3)
+        latency["seconds"] = round(time.perf_counter() - started, 3)
+        # Payload building is the same in both modes, so only the model-call time is compared
+        latency["calls_seconds"] = round(latency["seconds"] - latency["payload_seconds"], 3)
+        baseline = settings.deep_insights_two_call_baseline_seconds
+        if baseline:
+            latency["two_call_baseline_seconds"] = baseline
+            latency["delta_seconds"] = round(latency["calls_seconds"] - baseline, 3)
         
         return {
-            "summary": analysis_text,
+            "summary": structured_data.get("summary", ""),
             "risk_level": structured_data.get("risk_level", "medium"),
             "confidence_score": structured_data.get("confidence_score", 0.7),
             "key_risks": structured_data.get("key_risks", []),
             "recommendations": structured_data.get("recommendations", []),
             "audit_triggers": structured_data.get("audit_triggers", []),
-            "missing_information": structured_data.get("missing_information", [])
+            "missing_information": structured_data.get("missing_information", []),
+            "latency": latency,
+            "coverage": coverage,
         }
         
     except Exception as e:
+        latency["seconds"] = round(time.perf_counter() - started, 3)
         return {
             "summary": f"GPT-4o deep analysis failed: {str(e)}",
             "risk_assessment": {},
-            "recommendations": []
+            "recommendations": [],
+            "latency": latency,
         }
 
 
@@ -352,8 +772,14 @@ async def analyze(job, documents: List[Dict]) -> Dict:
     # Build basic insights
     insights = _build_insights(clause_counts, documents)
     
-    # 🔥 NEW: Get deep GPT-4o analysis
-    deep_analysis = await analyze_with_gpt4o_deep_insights(documents, clause_counts)
+    # 🔥 NEW: Get deep GPT-4o analysis, streaming the summary to SSE readers
+    token_stream.reset(job.id, "summary")
+    deep_analysis = await analyze_with_gpt4o_deep_insights(
+        documents,
+        clause_counts,
+        on_summary_delta=lambda text: token_stream.publish(job.id, "summary", {"type": "token", "text": text}),
+        on_summary_reset=lambda: token_stream.publish(job.id, "summary", {"type": "reset"}),
+    )
     
     # Combine with traditional insights
     if deep_analysis.get("key_risks"):
@@ -368,12 +794,17 @@ async def analyze(job, documents: List[Dict]) -> Dict:
             })
     
     summary = deep_analysis.get("summary", "No GPT-4o analysis available")
+    token_stream.publish(job.id, "summary", {"type": "done", "text": summary})
     
     # Store in job metrics
     job.metrics["llm_summary"] = summary
     job.metrics["llm_insights"] = insights
     job.metrics["clause_distribution"] = dict(clause_counts)
     job.metrics["gpt4o_analysis"] = deep_analysis
+    if deep_analysis.get("coverage"):
+        job.metrics["gpt4o_insights_coverage"] = deep_analysis["coverage"]
+    if deep_analysis.get("latency"):
+        job.metrics["gpt4o_insights_latency"] = deep_analysis["latency"]
     job.metrics["gpt4o_rules"] = rules  # 🔥 Auto-extracted rules!
     
     return {
@@ -0,0 +1,203 @@
+"""
+Write-behind persistence of pipeline progress.
+
+``ProgressWriter`` coalesces job status, stage and metrics updates made within
+``progress_flush_window_seconds`` and writes them from a background thread,
+keeping database round trips off the pipeline's critical path. Stage
+completion triggers an immediate flush; failures, terminal job statuses and
+``close()`` block until everything pending is durable. A failed write is put
+back under any newer updates and retried with backoff; ``flush()`` raises once
+``_FLUSH_ATTEMPTS`` writes in a row have failed, so callers can fail the job
+rather than report progress that was never stored.
+"""
+
+from __future__ import annotations
+
+import copy
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import get_settings
+from app.models import MetricsDict
+from app.services import job_repository
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_TERMINAL_STATUSES = {"completed", "failed"}
+_FLUSH_ATTEMPTS = 4
+_RETRY_BASE_SECONDS = 0.5
+_RETRY_MAX_SECONDS = 10.0
+
+
+class ProgressWriter:
+    def __init__(self, job_id: str, window_seconds: Optional[float] = None):
+        self.job_id = job_id
+        self.window_seconds = settings.progress_flush_window_seconds if window_seconds is None else window_seconds
+        self._status: Optional[Tuple[str, Optional[str]]] = None
+        self._stages: Dict[str, Dict[str, Any]] = {}
+        self._patch: Dict[str, Any] = {}
+        self._removed: set = set()
+        self._metrics: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._flushed = threading.Condition(self._lock)
+        self._urgent = False
+        self._closed = False
+        self._pending_writes = 0
+        self._in_flight = False
+        self._failed_writes = 0
+        self._consecutive_failures = 0
+        self._last_error: Optional[Exception] = None
+        self._thread = threading.Thread(target=self._run, name=f"progress-{job_id}", daemon=True)
+        self._thread.start()
+
+    def status(self, status: str, message: Optional[str] = None) -> None:
+        with self._lock:
+            self._status = (status, message)
+            self._pending_writes += 1
+        if status in _TERMINAL_STATUSES:
+            self.flush()
+        else:
+            self._notify()
+
+    def stage(self, name: str, status: str, detail: Optional[str] = None) -> None:
+        # Fields merge, so in_progress -> completed inside one window keeps started_at
+        with self._lock:
+            self._stages.setdefault(name, {}).update(job_repository.stage_update_fields(status, detail))
+            self._pending_writes += 1
+        if status == "failed":
+            self.flush()
+        else:
+            self._notify(urgent=status == "completed")
+
+    def metrics(self, metrics: MetricsDict) -> None:
+        """Captures the keys changed since the last call; the values are written on the next flush."""
+        patch, removed = metrics.take_changes()
+        if not patch and not removed:
+            return
+        # The pipeline keeps mutating these values while the write is pending
+        patch = copy.deepcopy(patch)
+        snapshot = copy.deepcopy(dict(metrics))
+        with self._lock:
+            for key in removed:
+                self._patch.pop(key, None)
+            self._removed.difference_update(patch)
+            self._removed.update(removed)
+            self._patch.update(patch)
+            self._metrics = snapshot
+            self._pending_writes += 1
+        self._notify()
+
+    def flush(self) -> None:
+        """Blocks until every update recorded so far has been written; raises if the writes keep failing."""
+        with self._lock:
+            failed_before = self._failed_writes
+            self._urgent = True
+            self._wake.notify()
+            while (self._pending_writes or self._in_flight) and self._thread.is_alive():
+                if self._failed_writes - failed_before >= _FLUSH_ATTEMPTS:
+                    raise RuntimeError(f"Could not persist progress for job {self.job_id}") from self._last_error
+                self._flushed.wait(timeout=1.0)
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            with self._lock:
+                self._closed = True
+                self._wake.notify()
+            self._thread.join(timeout=5.0)
+
+    def _notify(self, urgent: bool = False) -> None:
+        with self._lock:
+            self._urgent = self._urgent or urgent
+            self._wake.notify()
+
+    def _take(self) -> Tuple[Optional[Tuple[str, Optional[str]]], Dict[str, Dict[str, Any]], Dict[str, Any], List[str]]:
+        taken = (self._status, self._stages, self._patch, sorted(self._removed))
+        self._status, self._stages, self._patch, self._removed = None, {}, {}, set()
+        self._pending_writes = 0
+        self._urgent = False
+        self._in_flight = True
+        return taken
+
+    def _requeue(
+        self,
+        status: Optional[Tuple[str, Optional[str]]],
+        stages: Dict[str, Dict[str, Any]],
+        patch: Dict[str, Any],
+        removed: List[str],
+        metrics: Optional[Dict[str, Any]],
+    ) -> None:
+        """Puts a failed batch back beneath whatever was recorded while it was in flight."""
+        if self._status is None:
+            self._status = status
+        for name, fields in stages.items():
+            self._stages[name] = {**fields, **self._stages.get(name, {})}
+        for key, value in patch.items():
+            if key not in self._patch and key not in self._removed:
+                self._patch[key] = value
+        self._removed.update(key for key in removed if key not in self._patch)
+        if self._metrics is None:
+            self._metrics = metrics
+        self._pending_writes += 1
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while not self._pending_writes and not self._closed:
+                    self._wake.wait()
+                if not self._pending_writes and self._closed:
+                    return
+                # Let further updates within the window coalesce into this flush
+                deadline = time.monotonic() + self.window_seconds
+                while not self._urgent and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._wake.wait(timeout=remaining)
+                status, stages, patch, removed = self._take()
+                metrics = self._metrics
+                self._metrics = None
+            try:
+                self._write(status, stages, patch, removed, metrics)
+            except Exception as exc:
+                logger.error("Failed to persist progress for job %s: %s", self.job_id, exc)
+                with self._lock:
+                    self._requeue(status, stages, patch, removed, metrics)
+                    self._failed_writes += 1
+                    self._consecutive_failures += 1
+                    self._last_error = exc
+                    self._in_flight = False
+                    self._flushed.notify_all()
+                    if self._closed:
+                        logger.error("Dropping unsaved progress for job %s", self.job_id)
+                        return
+                    delay = min(_RETRY_MAX_SECONDS, _RETRY_BASE_SECONDS * 2 ** (self._consecutive_failures - 1))
+                    retry_at = time.monotonic() + delay
+                    while not self._closed and time.monotonic() < retry_at:
+                        self._wake.wait(timeout=retry_at - time.monotonic())
+                continue
+            with self._lock:
+                self._consecutive_failures = 0
+                self._in_flight = False
+                self._flushed.notify_all()
+
+    def _write(
+        self,
+        status: Optional[Tuple[str, Optional[str]]],
+        stages: Dict[str, Dict[str, Any]],
+        patch: Dict[str, Any],
+        removed: List[str],
+        metrics: Optional[Dict[str, Any]],
+    ) -> None:
+        # Metrics first so a stage shown as completed always has its outputs stored
+        if patch or removed:
+            job_repository.save_metrics_patch(self.job_id, patch, removed, metrics or {})
+        for name, fields in stages.items():
+            job_repository.update_stage_fields(self.job_id, name, fields)
+        if status:
+            job_repository.update_job_status(self.job_id, *status)
@@ -1,22 +1,35 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
 import json
 import logging
-from typing import Any, Dict, List, Tuple
-from uuid import uuid4
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+from uuid import NAMESPACE_URL, uuid5
+
+import numpy as np
 
 from app.config import get_settings
-from app.services.storage_supabase import get_client as get_supabase_client
+from app.services import lexical_index
+from app.services.file_lock import atomic_write
+from app.services.vector_store import get_vector_store
 
 try:
-    from openai import OpenAI
+    from openai import AsyncOpenAI, OpenAI
 except ImportError:
+    AsyncOpenAI = None
     OpenAI = None
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+_EMBEDDING_CACHE_DIR = Path(tempfile.gettempdir()) / "contractguard_embedding_cache"
+
 _embedding_client = None
 if OpenAI and settings.openai_api_key:
     try:
@@ -26,7 +39,9 @@ if OpenAI and settings.openai_api_key:
 
 
 def _is_ready() -> bool:
-    return bool(_embedding_client and settings.supabase_url and settings.supabase_service_key)
+    if not _embedding_client:
+        return False
+    return settings.rag_vector_backend == "local" or bool(settings.supabase_url and settings.supabase_service_key)
 
 
 def _batched(items: List[Any], size: int) -> List[List[Any]]:
@@ -54,18 +69,72 @@ def _embed_texts(texts: List[str]) -> List[List[float]]:
     return embeddings
 
 
-def _index_records(table: str, records: List[Dict[str, Any]]) -> None:
-    if not records:
-        return
-    supabase = get_supabase_client()
-    if not supabase:
-        logger.debug("Supabase client unavailable; skipping RAG indexing.")
-        return
-    for batch in _batched(records, 50):
-        try:
-            supabase.table(table).upsert(batch).execute()
-        except Exception as exc:
-            logger.error("Failed to upsert %s records into %s: %s", len(batch), table, exc)
+def _text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _chunk_id(*parts: Any) -> str:
+    """Deterministic chunk id so re-indexing the same content upserts the same row."""
+    return str(uuid5(NAMESPACE_URL, "contractguard:" + "|".join("" if part is None else str(part) for part in parts)))
+
+
+def _embedding_cache_path(text_hash: str) -> Path:
+    model_dir = settings.openai_embedding_model.replace("/", "_")
+    return _EMBEDDING_CACHE_DIR / model_dir / text_hash[:2] / f"{text_hash}.f32"
+
+
+def _load_cached_embedding(text_hash: str) -> List[float] | None:
+    path = _embedding_cache_path(text_hash)
+    try:
+        return np.fromfile(path, dtype=np.float32).tolist() if path.exists() else None
+    except (OSError, ValueError):
+        return None
+
+
+def _store_cached_embedding(text_hash: str, embedding: List[float]) -> None:
+    path = _embedding_cache_path(text_hash)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Full precision: the cache feeds the stores' float32 rescoring vectors, and quantization
+        # to rag_vector_dtype happens only in their in-memory code matrices
+        atomic_write(path, np.asarray(embedding, dtype=np.float32).tobytes())
+    except OSError as exc:
+        logger.debug("Failed to cache embedding: %s", exc)
+
+
+def _embed_texts_cached(texts: List[str]) -> List[List[float]]:
+    """
+    Embeds ``texts`` through a content-addressed cache keyed by (embedding model,
+    text hash). Duplicate texts are embedded once; returns [] if any miss fails.
+    """
+    unique = {text: _text_hash(text) for text in texts}
+    vectors: Dict[str, List[float]] = {}
+    misses: List[str] = []
+    for text, text_hash in unique.items():
+        cached = _load_cached_embedding(text_hash)
+        if cached is not None:
+            vectors[text] = cached
+        else:
+            misses.append(text)
+
+    if misses:
+        fresh = _embed_texts(misses)
+        if len(fresh) != len(misses):
+            return []
+        for text, embedding in zip(misses, fresh):
+            vectors[text] = embedding
+            _store_cached_embedding(unique[text], embedding)
+
+    logger.debug("Embedded %s texts: %s unique, %s cache misses", len(texts), len(unique), len(misses))
+    return [vectors[text] for text in texts]
+
+
+def _dedupe_chunks(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # One upsert batch cannot touch the same primary key twice
+    unique: Dict[str, Dict[str, Any]] = {}
+    for chunk in chunks:
+        unique.setdefault(chunk["id"], chunk)
+    return list(unique.values())
 
 
 def _build_contract_chunks(job, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -83,7 +152,7 @@ def _build_contract_chunks(job, documents: List[Dict[str, Any]]) -> List[Dict[st
                 if isinstance(first_region, dict):
                     region_bounds = first_region.get("bounds")
             chunk = {
-                "id": str(uuid4()),
+                "id": _chunk_id(job.id, "contract_clause", filename, clause.get("page"), _text_hash(text)),
                 "job_id": job.id,
                 "vendor": job.vendor_name,
                 "source_type": "contract_clause",
@@ -101,7 +170,7 @@ def _build_contract_chunks(job, documents: List[Dict[str, Any]]) -> List[Dict[st
         terms = doc.get("gpt4o_contract_terms")
         if terms:
             chunk = {
-                "id": str(uuid4()),
+                "id": _chunk_id(job.id, "contract_summary", filename),
                 "job_id": job.id,
                 "vendor": job.vendor_name,
                 "source_type": "contract_summary",
@@ -111,7 +180,7 @@ def _build_contract_chunks(job, documents: List[Dict[str, Any]]) -> List[Dict[st
                 "metadata": {},
             }
             chunks.append(chunk)
-    return chunks
+    return _dedupe_chunks(chunks)
 
 
 def _build_billing_chunks(job, discrepancies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -131,7 +200,7 @@ def _build_billing_chunks(job, discrepancies: List[Dict[str, Any]]) -> List[Dict
             + "\n".join(evidence_lines[:4])
         )
         chunk = {
-            "id": str(uuid4()),
+            "id": _chunk_id(job.id, "billing_discrepancy", discrepancy.get("customer"), _text_hash(text)),
             "job_id": job.id,
             "vendor": job.vendor_name,
             "source_type": "billing_discrepancy",
@@ -144,103 +213,201 @@ def _build_billing_chunks(job, discrepancies: List[Dict[str, Any]]) -> List[Dict
             },
         }
         chunks.append(chunk)
-    return chunks
+    return _dedupe_chunks(chunks)
 
 
-def _apply_embeddings(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    texts = [chunk["text"] for chunk in chunks]
-    embeddings = _embed_texts(texts)
-    if len(embeddings) != len(chunks):
-        logger.warning("Embedding count mismatch; skipping vector store update.")
-        return []
-    for chunk, embedding in zip(chunks, embeddings):
-        chunk["embedding"] = embedding
-    return chunks
+class _TokenRateLimiter:
+    """
+    Token bucket over a per-minute budget. Reservations are made under a
+    thread lock and waited out with ``asyncio.sleep``, so one limiter can be
+    shared by batches running on different event loops.
+    """
 
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = max(1, tokens_per_minute)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
 
-async def index_contracts(job, documents: List[Dict[str, Any]]) -> None:
-    if not _is_ready():
-        return
-    chunks = await asyncio.to_thread(_build_contract_chunks, job, documents)
-    if not chunks:
-        return
+    def _reserve(self, tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.capacity / 60)
+            self._updated = now
+            self._tokens -= min(tokens, self.capacity)
+            return 0.0 if self._tokens >= 0 else -self._tokens * 60 / self.capacity
 
-    def _process():
-        embedded = _apply_embeddings(chunks)
-        _index_records(settings.rag_contract_table, embedded)
+    async def acquire(self, tokens: int) -> None:
+        delay = self._reserve(tokens)
+        if delay:
+            await asyncio.sleep(delay)
 
-    await asyncio.to_thread(_process)
 
+_embedding_rate_limiter = _TokenRateLimiter(settings.rag_embedding_tokens_per_minute)
 
-async def index_billing(job, discrepancies: List[Dict[str, Any]]) -> None:
-    if not _is_ready():
-        return
-    chunks = await asyncio.to_thread(_build_billing_chunks, job, discrepancies)
-    if not chunks:
-        return
 
-    def _process():
-        embedded = _apply_embeddings(chunks)
-        _index_records(settings.rag_billing_table, embedded)
+def _estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
 
-    await asyncio.to_thread(_process)
 
+async def _embed_batch_with_retry(client: AsyncOpenAI, batch: List[str]) -> List[List[float]] | None:
+    tokens = sum(_estimate_tokens(text) for text in batch)
+    for attempt in range(settings.rag_embedding_max_retries + 1):
+        await _embedding_rate_limiter.acquire(tokens)
+        try:
+            response = await client.embeddings.create(model=settings.openai_embedding_model, input=batch)
+            embeddings = [item.embedding for item in response.data]
+            if len(embeddings) == len(batch):
+                return embeddings
+            raise ValueError(f"expected {len(batch)} embeddings, got {len(embeddings)}")
+        except Exception as exc:
+            if attempt == settings.rag_embedding_max_retries:
+                logger.error("Embedding batch of %s texts failed after %s attempts: %s", len(batch), attempt + 1, exc)
+                return None
+            delay = min(30.0, 2 ** attempt) * random.uniform(0.5, 1.0)
+            logger.warning("Embedding batch failed (attempt %s), retrying in %.1fs: %s", attempt + 1, delay, exc)
+            await asyncio.sleep(delay)
+    return None
+
+
+async def _index_chunks(table: str, chunks: List[Dict[str, Any]], job_id: str) -> None:
+    """
+    Embeds chunks through the content cache, running uncached batches
+    concurrently under the token-per-minute limiter, and upserts each batch as
+    soon as its embeddings are ready. A batch that still fails after retries
+    only drops its own chunks.
+    """
+    by_text: Dict[str, List[Dict[str, Any]]] = {}
+    for chunk in chunks:
+        by_text.setdefault(chunk["text"], []).append(chunk)
+    hashes = {text: _text_hash(text) for text in by_text}
+
+    cached = await asyncio.to_thread(lambda: {text: _load_cached_embedding(h) for text, h in hashes.items()})
+    misses = [text for text, embedding in cached.items() if embedding is None]
+    upserts: List[asyncio.Future] = []
+
+    def _upsert(texts: List[str], embeddings: List[List[float]]) -> None:
+        ready: List[Dict[str, Any]] = []
+        for text, embedding in zip(texts, embeddings):
+            for chunk in by_text[text]:
+                chunk["embedding"] = embedding
+                ready.append(chunk)
+        if ready:
+            upserts.append(asyncio.ensure_future(asyncio.to_thread(get_vector_store().upsert, table, ready)))
+
+    hits = [text for text in by_text if cached[text] is not None]
+    _upsert(hits, [cached[text] for text in hits])
+
+    client = AsyncOpenAI(api_key=settings.openai_api_key)
+    semaphore = asyncio.Semaphore(max(1, settings.rag_embedding_concurrency))
+    failed = 0
+
+    async def _process(batch: List[str]) -> None:
+        nonlocal failed
+        async with semaphore:
+            embeddings = await _embed_batch_with_retry(client, batch)
+        if embeddings is None:
+            failed += len(batch)
+            return
+        await asyncio.to_thread(
+            lambda: [_store_cached_embedding(hashes[text], embedding) for text, embedding in zip(batch, embeddings)]
+        )
+        _upsert(batch, embeddings)
 
-def _cosine_similarity(a: List[float], b: List[float]) -> float:
-    if not a or not b or len(a) != len(b):
-        return 0.0
-    dot = sum(x * y for x, y in zip(a, b))
-    norm_a = sum(x * x for x in a) ** 0.5
-    norm_b = sum(x * x for x in b) ** 0.5
-    if norm_a == 0 or norm_b == 0:
-        return 0.0
-    return dot / (norm_a * norm_b)
+    try:
+        await asyncio.gather(*[_process(batch) for batch in _batched(misses, 50)])
+        await asyncio.gather(*upserts)
+    finally:
+        await client.close()
+
+    if failed:
+        logger.warning("Indexed %s of %s chunk texts into %s; %s failed.", len(by_text) - failed, len(by_text), table, failed)
+
+
+async def _replace_chunks(table: str, job_id: str, chunks: List[Dict[str, Any]]) -> None:
+    """
+    Indexes the job's current chunks for ``table``, then deletes the ones an
+    earlier run stored that this build no longer produced (chunk ids hash the
+    content, so edited clauses and discrepancies get new ids).
+    """
+    # The lexical index needs no network, so it is built even when embeddings are unavailable
+    await asyncio.to_thread(lexical_index.replace_chunks, job_id, table, chunks)
+    store = get_vector_store()
+    try:
+        if chunks and _is_ready():
+            await _index_chunks(table, chunks, job_id)
+        removed = await asyncio.to_thread(store.prune, table, job_id, {chunk["id"] for chunk in chunks})
+        if removed:
+            logger.info("Removed %s stale chunks from %s for job %s", removed, table, job_id)
+    finally:
+        store.invalidate(job_id)
 
 
-def _fetch_rows(table: str, job_id: str) -> List[Dict[str, Any]]:
-    supabase = get_supabase_client()
-    if not supabase:
-        return []
-    try:
-        response = supabase.table(table).select("*").eq("job_id", job_id).limit(500).execute()
-        return response.data or []
-    except Exception as exc:
-        logger.error("Failed to fetch rows from %s: %s", table, exc)
-        return []
+async def index_contracts(job, documents: List[Dict[str, Any]]) -> None:
+    chunks = await asyncio.to_thread(_build_contract_chunks, job, documents)
+    await _replace_chunks(settings.rag_contract_table, job.id, chunks)
+
+
+async def index_billing(job, discrepancies: List[Dict[str, Any]]) -> None:
+    chunks = await asyncio.to_thread(_build_billing_chunks, job, discrepancies)
+    await _replace_chunks(settings.rag_billing_table, job.id, chunks)
+
+
+_SCORE_FIELDS = {"vector": "similarity", "bm25": "bm25_score", "hybrid": "rrf_score"}
+
+
+def _format_hits(
+    hits: List[Any],
+    retrieval: str,
+    similarities: Dict[str, float] | None = None,
+) -> List[Dict[str, Any]]:
+    """
+    Evidence rows with the ranking score under its own name per retrieval mode.
+    ``similarity`` is always a cosine similarity: fused rows take it from
+    ``similarities`` (by row id) and rows only BM25 found have None.
+    """
+    formatted = []
+    for score, row in hits:
+        hit = {
+            "text": row.get("text"),
+            "source_type": row.get("source_type"),
+            "reference": row.get("reference") or row.get("filename"),
+            "metadata": row.get("metadata"),
+            "similarity": (similarities or {}).get(row.get("id")),
+            "retrieval": retrieval,
+        }
+        hit[_SCORE_FIELDS[retrieval]] = score
+        formatted.append(hit)
+    return formatted
 
 
 async def query_context(job_id: str, question: str, top_k: int = 4) -> List[Dict[str, Any]]:
-    if not _is_ready() or not question.strip():
+    """
+    Retrieves evidence for ``question`` according to ``rag_retrieval_mode``:
+    "vector", "lexical" (BM25 only, no network) or "hybrid" (reciprocal rank
+    fusion of both). Falls back to BM25 when embeddings are unavailable.
+    """
+    if not question.strip():
         return []
+    mode = settings.rag_retrieval_mode
+    candidate_k = top_k * 5 if mode == "hybrid" else top_k
 
     def _search() -> List[Dict[str, Any]]:
-        question_embedding = _embed_texts([question])
+        if mode == "lexical" or not _is_ready():
+            return _format_hits(lexical_index.search(job_id, question, top_k), "bm25")
+
+        question_embedding = _embed_texts_cached([question])
         if not question_embedding:
-            return []
-        q_vector = question_embedding[0]
-        rows = _fetch_rows(settings.rag_contract_table, job_id) + _fetch_rows(settings.rag_billing_table, job_id)
-        scored: List[Tuple[float, Dict[str, Any]]] = []
-        for row in rows:
-            embedding = row.get("embedding")
-            if not isinstance(embedding, list):
-                continue
-            score = _cosine_similarity(q_vector, embedding)
-            if score <= 0:
-                continue
-            scored.append((score, row))
-        scored.sort(key=lambda item: item[0], reverse=True)
-        results = []
-        for score, row in scored[:top_k]:
-            results.append(
-                {
-                    "text": row.get("text"),
-                    "source_type": row.get("source_type"),
-                    "reference": row.get("reference") or row.get("filename"),
-                    "metadata": row.get("metadata"),
-                    "similarity": score,
-                }
-            )
-        return results
+            logger.warning("Question embedding failed for job %s; using lexical retrieval", job_id)
+            return _format_hits(lexical_index.search(job_id, question, top_k), "bm25")
+        q_vector = np.asarray(question_embedding[0], dtype=np.float32)
+        vector_hits = get_vector_store().search(
+            [settings.rag_contract_table, settings.rag_billing_table], q_vector, candidate_k, {"job_id": job_id}
+        )
+        lexical_hits = lexical_index.search(job_id, question, candidate_k) if mode == "hybrid" else []
+        if not lexical_hits:
+            return _format_hits(vector_hits[:top_k], "vector")
+        fused = lexical_index.reciprocal_rank_fusion([vector_hits, lexical_hits], top_k, k=settings.rag_rrf_k)
+        return _format_hits(fused, "hybrid", {row.get("id"): score for score, row in vector_hits})
 
     return await asyncio.to_thread(_search)
-
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import asyncio
+from pathlib import Path
 from typing import List
 from uuid import uuid4
 
@@ -20,20 +22,24 @@ def get_client() -> BlobServiceClient | None:
     return _blob_service
 
 
-async def upload_files(files: List[tuple[str, bytes]], prefix: str) -> List[str]:
+async def upload_paths(paths: List[Path], prefix: str) -> List[str]:
+    """Streams files from disk to the container without buffering them in memory."""
     client = get_client()
     container = settings.azure_storage_container
     if not client or not container:
-        # fallback to supabase/local handled elsewhere
         return []
 
     container_client = client.get_container_client(container)
+
+    def _upload(path: Path, blob_name: str) -> None:
+        with path.open("rb") as handle:
+            container_client.get_blob_client(blob_name).upload_blob(
+                handle, length=path.stat().st_size, overwrite=True
+            )
+
     stored_paths = []
-    for filename, data in files:
-        blob_name = f"{prefix}/{uuid4()}-{filename}"
-        blob_client = container_client.get_blob_client(blob_name)
-        blob_client.upload_blob(data, overwrite=True)
+    for path in paths:
+        blob_name = f"{prefix}/{uuid4()}-{path.name}"
+        await asyncio.to_thread(_upload, path, blob_name)
         stored_paths.append(blob_name)
     return stored_paths
-
-
@@ -0,0 +1,147 @@
+"""
+Fan-out of incremental LLM output from the pipeline to SSE readers.
+
+Events are appended to a per-job channel; readers replay what was already
+published and then follow new events until a terminal ``done`` event. When
+``stream_redis_url`` is configured a Redis stream carries the events, so the
+API can follow a pipeline running in a Celery worker. Otherwise an in-process
+buffer is used, which only sees pipelines running inside the API; readers
+then rely on ``poll_finished`` to end with the stored result.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from app.config import get_settings
+
+try:
+    import redis
+    import redis.asyncio as redis_async
+except ImportError:
+    redis = None
+    redis_async = None
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_STREAM_TTL_SECONDS = 3600
+_POLL_INTERVAL_SECONDS = 0.05
+_MAX_LOCAL_CHANNELS = 256
+_TERMINAL_EVENTS = {"done", "error"}
+
+_local_channels: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+_local_lock = threading.Lock()
+_redis_client = None
+
+
+def _key(job_id: str, channel: str) -> str:
+    return f"contractguard:stream:{job_id}:{channel}"
+
+
+def _get_redis():
+    global _redis_client
+    if _redis_client is None and redis and settings.stream_redis_url:
+        _redis_client = redis.Redis.from_url(settings.stream_redis_url)
+    return _redis_client
+
+
+def reset(job_id: str, channel: str) -> None:
+    """Drop previously published events, e.g. when a stage is re-run."""
+    key = _key(job_id, channel)
+    client = _get_redis()
+    if client:
+        try:
+            client.delete(key)
+        except Exception as exc:
+            logger.warning("Failed to reset Redis stream %s: %s", key, exc)
+    with _local_lock:
+        _local_channels.pop(key, None)
+
+
+def publish(job_id: str, channel: str, event: Dict[str, Any]) -> None:
+    key = _key(job_id, channel)
+    client = _get_redis()
+    if client:
+        try:
+            pipe = client.pipeline()
+            pipe.xadd(key, {"event": json.dumps(event, default=str)})
+            pipe.expire(key, _STREAM_TTL_SECONDS)
+            pipe.execute()
+            return
+        except Exception as exc:
+            logger.warning("Failed to publish stream event to Redis: %s", exc)
+    with _local_lock:
+        _local_channels.setdefault(key, []).append(event)
+        _local_channels.move_to_end(key)
+        while len(_local_channels) > _MAX_LOCAL_CHANNELS:
+            _local_channels.popitem(last=False)
+
+
+async def subscribe(
+    job_id: str,
+    channel: str,
+    timeout: float = 300.0,
+    poll_finished: Optional[Callable[[], Awaitable[Optional[Dict[str, Any]]]]] = None,
+    poll_interval: float = 2.0,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield events for ``channel`` until a terminal event arrives or ``timeout``
+    elapses. ``poll_finished`` is awaited every ``poll_interval`` seconds and
+    returns a terminal event once the producer has ended (from the job's stored
+    status), so readers do not wait out the timeout when events cannot reach
+    them: a Celery worker without ``stream_redis_url`` publishes into its own
+    buffer, and a crashed one publishes nothing.
+    """
+    key = _key(job_id, channel)
+    deadline = time.monotonic() + timeout
+    next_poll = time.monotonic() + poll_interval
+
+    async def _finished() -> Optional[Dict[str, Any]]:
+        nonlocal next_poll
+        if poll_finished is None or time.monotonic() < next_poll:
+            return None
+        next_poll = time.monotonic() + poll_interval
+        return await poll_finished()
+
+    if redis_async and settings.stream_redis_url:
+        client = redis_async.Redis.from_url(settings.stream_redis_url)
+        last_id = "0-0"
+        try:
+            while time.monotonic() < deadline:
+                entries = await client.xread({key: last_id}, block=1000)
+                for _, messages in entries or []:
+                    for message_id, fields in messages:
+                        last_id = message_id
+                        event = json.loads(fields[b"event"])
+                        yield event
+                        if event.get("type") in _TERMINAL_EVENTS:
+                            return
+                finished = await _finished()
+                if finished:
+                    yield finished
+                    return
+        finally:
+            await client.aclose()
+        return
+
+    position = 0
+    while time.monotonic() < deadline:
+        with _local_lock:
+            events = list(_local_channels.get(key, [])[position:])
+        position += len(events)
+        for event in events:
+            yield event
+            if event.get("type") in _TERMINAL_EVENTS:
+                return
+        finished = await _finished()
+        if finished:
+            yield finished
+            return
+        await asyncio.sleep(_POLL_INTERVAL_SECONDS)
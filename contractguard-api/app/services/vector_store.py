@@ -0,0 +1,810 @@
+"""
+Vector storage backends for RAG chunks.
+
+``SupabaseVectorStore`` keeps chunks in the pgvector tables and ranks them
+server-side through the ``rag_match_function`` RPC, falling back to ranking
+client-side. ``LocalVectorStore`` is an embedded, persistent IVF index that
+needs no network, for offline and air-gapped runs. Both keep vectors in memory
+as ``rag_vector_dtype`` codes (float16, or int8 with a per-row scale).
+``get_vector_store()`` picks one according to ``rag_vector_backend``.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.config import get_settings
+from app.services.file_lock import atomic_write, file_lock
+from app.services.storage_supabase import get_client as get_supabase_client
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_FILTER_FIELDS = ("job_id", "vendor", "source_type")
+
+
+class VectorStore(ABC):
+    """Interface shared by the RAG storage backends."""
+
+    @abstractmethod
+    def upsert(self, table: str, records: List[Dict[str, Any]]) -> None:
+        ...
+
+    @abstractmethod
+    def search(
+        self,
+        tables: List[str],
+        query: np.ndarray,
+        top_k: int,
+        filters: Dict[str, Any],
+    ) -> List[Tuple[float, Dict[str, Any]]]:
+        """Top-k (similarity, row) pairs across ``tables``; ``filters`` must include ``job_id``."""
+
+    @abstractmethod
+    def prune(self, table: str, job_id: str, keep_ids: Set[str]) -> int:
+        """Deletes the job's chunks in ``table`` whose ids are not in ``keep_ids``; returns how many."""
+
+    def invalidate(self, job_id: str) -> None:
+        """Called after a job's chunks were rewritten; a no-op unless the backend caches them."""
+
+
+def _batched(items: List[Any], size: int):
+    for idx in range(0, len(items), size):
+        yield items[idx : idx + size]
+
+
+def _matches(row: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+    return all(row.get(field) == value for field, value in filters.items() if value is not None)
+
+
+def _parse_embedding(value: Any) -> List[float] | None:
+    # PostgREST returns pgvector columns as "[0.1,0.2,...]" strings
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return None
+    if isinstance(value, np.ndarray):
+        return value if value.size else None
+    return value if isinstance(value, list) and value else None
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _build_embedding_matrix(rows: List[Dict[str, Any]], dim: int) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+    """Stack row embeddings of length ``dim`` into an L2-normalized float32 matrix."""
+    vectors: List[List[float]] = []
+    kept: List[Dict[str, Any]] = []
+    for row in rows:
+        embedding = _parse_embedding(row.get("embedding"))
+        if embedding is None or len(embedding) != dim:
+            continue
+        vectors.append(embedding)
+        kept.append(row)
+    if not vectors:
+        return np.empty((0, dim), dtype=np.float32), []
+    return _normalize_rows(np.asarray(vectors, dtype=np.float32)), kept
+
+
+def _top_k(matrix: np.ndarray, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+    """Cosine top-k over a pre-normalized matrix: one mat-vec product plus argpartition."""
+    if matrix.shape[0] == 0 or k <= 0:
+        return []
+    query_norm = np.linalg.norm(query)
+    if query_norm == 0:
+        return []
+    scores = matrix @ (query / query_norm)
+    k = min(k, scores.shape[0])
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    ordered = candidates[np.argsort(-scores[candidates])]
+    return [(int(idx), float(scores[idx])) for idx in ordered if scores[idx] > 0]
+
+
+def _quantize(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compresses normalized float32 rows to ``dtype``: "float16", or "int8" with a
+    symmetric per-row scale (row ~= codes * scale). Returns (codes, scales).
+    """
+    ones = np.ones(vectors.shape[0], dtype=np.float32)
+    if dtype == "float16":
+        return vectors.astype(np.float16), ones
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0 if vectors.shape[0] else ones
+        scales[scales == 0] = 1.0
+        codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    return vectors.astype(np.float32, copy=False), ones
+
+
+def _approximate_scores(codes: np.ndarray, scales: np.ndarray, query: np.ndarray, block: int = 2048) -> np.ndarray:
+    # Widen one block at a time so int8 codes never materialize as a full float32 matrix
+    scores = np.empty(codes.shape[0], dtype=np.float32)
+    for start in range(0, codes.shape[0], block):
+        widened = codes[start : start + block].astype(np.float32, copy=False)
+        scores[start : start + block] = (widened @ query) * scales[start : start + block]
+    return scores
+
+
+def _top_k_codes(
+    codes: np.ndarray,
+    scales: np.ndarray,
+    query: np.ndarray,
+    k: int,
+    full: Optional[np.ndarray] = None,
+    positions: Optional[np.ndarray] = None,
+) -> List[Tuple[int, float]]:
+    """
+    Cosine top-k over quantized unit rows. When ``full`` (float32 rows, usually
+    memory-mapped) is given, the best ``k * rag_rescore_factor`` approximate
+    candidates are rescored at full precision; ``positions`` maps code rows to
+    rows of ``full``. Returns (code row, score) pairs.
+    """
+    if codes.shape[0] == 0 or k <= 0:
+        return []
+    query_norm = np.linalg.norm(query)
+    if query_norm == 0:
+        return []
+    query = (query / query_norm).astype(np.float32)
+    scores = _approximate_scores(codes, scales, query)
+    rescore = full is not None and codes.dtype != np.float32
+    depth = min(scores.shape[0], k * max(1, settings.rag_rescore_factor) if rescore else k)
+    candidates = np.argpartition(-scores, depth - 1)[:depth]
+    if rescore:
+        rows = candidates if positions is None else positions[candidates]
+        # Sorted reads keep memory-mapped access sequential
+        order = np.argsort(rows)
+        candidates = candidates[order]
+        candidate_scores = np.asarray(full[rows[order]], dtype=np.float32) @ query
+    else:
+        candidate_scores = scores[candidates]
+    best = np.argsort(-candidate_scores)[:k]
+    return [(int(candidates[idx]), float(candidate_scores[idx])) for idx in best if candidate_scores[idx] > 0]
+
+
+class _EmbeddingMatrixCache:
+    """
+    LRU of per-job quantized embedding matrices (codes and scales) plus chunk
+    metadata, bounded by an approximate byte budget. Entries expire after ``ttl_seconds`` so chunks
+    indexed by another process (e.g. a Celery worker) are eventually seen.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[np.ndarray, np.ndarray, List[Dict[str, Any]], int, float]]" = (
+            OrderedDict()
+        )
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _estimate_bytes(codes: np.ndarray, scales: np.ndarray, rows: List[Dict[str, Any]]) -> int:
+        return int(codes.nbytes + scales.nbytes) + sum(len(row.get("text") or "") + 256 for row in rows)
+
+    def get(self, job_id: str, dim: int) -> Tuple[np.ndarray, np.ndarray, List[Dict[str, Any]]] | None:
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if not entry:
+                return None
+            codes, scales, rows, size, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl_seconds or codes.shape[1] != dim:
+                self._drop(job_id)
+                return None
+            self._entries.move_to_end(job_id)
+            return codes, scales, rows
+
+    def put(self, job_id: str, codes: np.ndarray, scales: np.ndarray, rows: List[Dict[str, Any]]) -> None:
+        size = self._estimate_bytes(codes, scales, rows)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._drop(job_id)
+            self._entries[job_id] = (codes, scales, rows, size, time.monotonic())
+            self._size += size
+            while self._size > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, job_id: str) -> None:
+        with self._lock:
+            self._drop(job_id)
+
+    def _drop(self, job_id: str) -> None:
+        entry = self._entries.pop(job_id, None)
+        if entry:
+            self._size -= entry[3]
+
+
+_matrix_cache = _EmbeddingMatrixCache(settings.rag_cache_max_bytes, settings.rag_cache_ttl_seconds)
+
+
+def _fetch_rows(table: str, job_id: str, page_size: int = 500, columns: str = "*") -> List[Dict[str, Any]]:
+    supabase = get_supabase_client()
+    if not supabase:
+        return []
+    rows: List[Dict[str, Any]] = []
+    try:
+        while True:
+            response = (
+                supabase.table(table)
+                .select(columns)
+                .eq("job_id", job_id)
+                .order("id")
+                .range(len(rows), len(rows) + page_size - 1)
+                .execute()
+            )
+            page = response.data or []
+            rows.extend(page)
+            if len(page) < page_size:
+                return rows
+    except Exception as exc:
+        logger.error("Failed to fetch rows from %s: %s", table, exc)
+        return rows
+
+
+def _match_rows(
+    tables: List[str],
+    query: np.ndarray,
+    top_k: int,
+    filters: Dict[str, Any],
+) -> List[Tuple[float, Dict[str, Any]]] | None:
+    """Top-k through the SQL match function; None when it is unavailable."""
+    supabase = get_supabase_client()
+    if not supabase or not settings.rag_match_function:
+        return None
+    params = {
+        "query_embedding": "[" + ",".join(f"{value:.7g}" for value in query.tolist()) + "]",
+        "match_job_id": filters["job_id"],
+        "match_count": top_k,
+        "match_tables": tables,
+        "match_vendor": filters.get("vendor"),
+        "match_source_type": filters.get("source_type"),
+    }
+    try:
+        response = supabase.rpc(settings.rag_match_function, params).execute()
+    except Exception as exc:
+        logger.warning("Match function %s failed; ranking client-side: %s", settings.rag_match_function, exc)
+        return None
+    return [(float(row.pop("similarity", 0.0) or 0.0), row) for row in response.data or []]
+
+
+def _has_chunks(tables: List[str], job_id: str) -> bool:
+    """
+    Whether the job has any embedded chunk. An empty match result for a job
+    that does is wrong (e.g. an index post-filtering the job away), so the
+    caller ranks client-side instead.
+    """
+    supabase = get_supabase_client()
+    if not supabase:
+        return False
+    for table in tables:
+        try:
+            rows = supabase.table(table).select("id").eq("job_id", job_id).limit(1).execute().data or []
+        except Exception as exc:
+            logger.error("Failed to check chunks in %s: %s", table, exc)
+            return True
+        if rows:
+            logger.warning("Match function returned no rows for job %s with chunks in %s; ranking client-side.", job_id, table)
+            return True
+    return False
+
+
+class SupabaseVectorStore(VectorStore):
+    """
+    pgvector tables in Supabase. Queries run the SQL match function (an exact
+    scan of the job's rows, only top-k returned); without it, or when it returns
+    nothing for a job that has chunks, they rank a cached per-job matrix client-side.
+    """
+
+    def upsert(self, table: str, records: List[Dict[str, Any]]) -> None:
+        if not records:
+            return
+        supabase = get_supabase_client()
+        if not supabase:
+            logger.debug("Supabase client unavailable; skipping RAG indexing.")
+            return
+        for batch in _batched(records, 50):
+            try:
+                supabase.table(table).upsert(batch).execute()
+            except Exception as exc:
+                logger.error("Failed to upsert %s records into %s: %s", len(batch), table, exc)
+
+    def search(
+        self,
+        tables: List[str],
+        query: np.ndarray,
+        top_k: int,
+        filters: Dict[str, Any],
+    ) -> List[Tuple[float, Dict[str, Any]]]:
+        matched = _match_rows(tables, query, top_k, filters)
+        if matched:
+            return [(score, row) for score, row in matched if score > 0]
+        if matched is not None and not _has_chunks(tables, filters["job_id"]):
+            return []
+
+        job_id = filters["job_id"]
+        cached = _matrix_cache.get(job_id, query.shape[0])
+        if cached:
+            codes, scales, kept_rows = cached
+        else:
+            rows = [row for table in tables for row in _fetch_rows(table, job_id)]
+            matrix, kept_rows = _build_embedding_matrix(rows, query.shape[0])
+            codes, scales = _quantize(matrix, settings.rag_vector_dtype)
+            # Embeddings live in the codes; keep only the metadata per row
+            kept_rows = [{key: value for key, value in row.items() if key != "embedding"} for row in kept_rows]
+            _matrix_cache.put(job_id, codes, scales, kept_rows)
+
+        extra = {field: value for field, value in filters.items() if field != "job_id"}
+        if extra:
+            selected = [idx for idx, row in enumerate(kept_rows) if _matches(row, extra)]
+            codes, scales, kept_rows = codes[selected], scales[selected], [kept_rows[idx] for idx in selected]
+        return [(score, kept_rows[idx]) for idx, score in _top_k_codes(codes, scales, query, top_k)]
+
+    def prune(self, table: str, job_id: str, keep_ids: Set[str]) -> int:
+        supabase = get_supabase_client()
+        if not supabase:
+            return 0
+        # A failed page only leaves some stale rows for the next run
+        stale = [row["id"] for row in _fetch_rows(table, job_id, columns="id") if row["id"] not in keep_ids]
+        deleted = 0
+        for batch in _batched(stale, 100):
+            try:
+                supabase.table(table).delete().in_("id", batch).execute()
+                deleted += len(batch)
+            except Exception as exc:
+                logger.error("Failed to delete %s stale chunks from %s: %s", len(batch), table, exc)
+        return deleted
+
+    def invalidate(self, job_id: str) -> None:
+        _matrix_cache.invalidate(job_id)
+
+
+def _train_centroids(vectors: np.ndarray, nlist: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on a sample of the (normalized) vectors."""
+    rng = np.random.default_rng(seed)
+    sample_size = min(vectors.shape[0], nlist * 64)
+    sample = vectors[rng.choice(vectors.shape[0], sample_size, replace=False)]
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        counts = np.bincount(assignments, minlength=nlist)
+        filled = counts > 0
+        centroids[filled] = _normalize_rows(sums[filled])
+    return centroids
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, block: int = 2048) -> np.ndarray:
+    return np.concatenate(
+        [np.argmax(vectors[idx : idx + block] @ centroids.T, axis=1) for idx in range(0, vectors.shape[0], block)]
+    ).astype(np.int32) if vectors.shape[0] else np.empty(0, dtype=np.int32)
+
+
+class _IVFList:
+    """
+    One inverted list: float32 vectors (memory-mapped), quantized codes and
+    scales, and the chunk records with their filter columns. Rows whose record
+    is None were deleted and are skipped until the next rebuild compacts them.
+    """
+
+    def __init__(
+        self,
+        meta: Dict[str, Any],
+        vectors: np.ndarray,
+        codes: np.ndarray,
+        scales: np.ndarray,
+        records: List[Optional[Dict[str, Any]]],
+    ):
+        self.meta = meta
+        self.vectors = vectors
+        self.codes = codes
+        self.scales = scales
+        self.records = records
+        self.alive = np.array([record is not None for record in records], dtype=bool)
+        self.columns = {
+            field: np.array([(record or {}).get(field) for record in records], dtype=object) for field in _FILTER_FIELDS
+        }
+
+
+class _IVFIndex:
+    """
+    Inverted-file index for one table: normalized vectors partitioned into
+    k-means lists, plus the chunk records and filter columns. Queries probe the
+    ``nprobe`` nearest lists (small filtered subsets are scanned in full) over
+    the in-memory quantized codes, then rescore the best candidates against the
+    memory-mapped float32 vectors.
+
+    Each list is a set of append-only files (vectors, codes, scales and a JSON
+    lines record log) in the current segment directory, and ``manifest.json``
+    records the committed row and log sizes of every list. Upserts append new
+    rows to their nearest centroid's list and overwrite updated rows in place,
+    so a batch costs what it writes; the lists are retrained and rewritten into
+    a fresh segment directory only once the stored rows reach twice the size of
+    the last build. Writers hold an exclusive file lock and readers a shared
+    one, and ``refresh`` reloads just the lists another process changed.
+    """
+
+    MIN_TRAIN_SIZE = 1024
+    _MANIFEST = "manifest.json"
+    _LOCK = ".lock"
+    _LEGACY_FILES = ("records.json", "vectors.npy", "codes.npy", "scales.npy", "centroids.npy", "assignments.npy")
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.manifest: Dict[str, Any] = {}
+        self.centroids: Optional[np.ndarray] = None
+        self.lists: Dict[int, _IVFList] = {}
+        self._locations: Dict[str, Tuple[int, int]] = {}
+        self._stamp: Optional[Tuple[int, int, int]] = None
+        if not (path / self._MANIFEST).exists() and (path / "records.json").exists():
+            self._import_legacy()
+        self.refresh()
+
+    # Reading
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = (self.path / self._MANIFEST).stat()
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def refresh(self) -> None:
+        """Picks up writes from other processes; costs one stat when there were none."""
+        if self._stat() == self._stamp:
+            return
+        with file_lock(self.path / self._LOCK, exclusive=False):
+            self._refresh()
+
+    def _refresh(self) -> None:
+        stamp = self._stat()
+        if stamp == self._stamp:
+            return
+        try:
+            manifest = json.loads((self.path / self._MANIFEST).read_text(encoding="utf-8"))
+            if manifest["segments"] != self.manifest.get("segments"):
+                self.lists, self._locations = {}, {}
+                centroids_path = self.path / manifest["segments"] / "centroids.npy"
+                self.centroids = np.load(centroids_path) if centroids_path.exists() else None
+            for key, meta in manifest["lists"].items():
+                current = self.lists.get(int(key))
+                if current is None or current.meta != meta:
+                    self._set_list(int(key), self._read_list(manifest, int(key), meta))
+        except (OSError, ValueError, KeyError) as exc:
+            logger.error("Failed to load local vector index %s: %s", self.path, exc)
+            return
+        self.manifest = manifest
+        self._stamp = stamp
+
+    def _prefix(self, list_id: int, manifest: Optional[Dict[str, Any]] = None) -> Path:
+        return self.path / (manifest or self.manifest)["segments"] / str(list_id)
+
+    def _read_list(self, manifest: Dict[str, Any], list_id: int, meta: Dict[str, Any]) -> _IVFList:
+        prefix, rows, dim = self._prefix(list_id, manifest), meta["rows"], manifest["dim"]
+        vectors = np.memmap(f"{prefix}.vectors", dtype=np.float32, mode="r", shape=(rows, dim))
+        if manifest["dtype"] == str(np.dtype(settings.rag_vector_dtype)):
+            codes = np.fromfile(f"{prefix}.codes", dtype=manifest["dtype"], count=rows * dim).reshape(rows, dim)
+            scales = np.fromfile(f"{prefix}.scales", dtype=np.float32, count=rows)
+        else:
+            # Written under another rag_vector_dtype; requantized in memory until the next rebuild
+            codes, scales = _quantize(np.asarray(vectors), settings.rag_vector_dtype)
+        records: List[Optional[Dict[str, Any]]] = [None] * rows
+        with open(f"{prefix}.records.jsonl", "rb") as handle:
+            for line in handle.read(meta["log_bytes"]).splitlines():
+                entry = json.loads(line)
+                records[entry["row"]] = entry["record"]
+        return _IVFList(meta, vectors, codes, scales, records)
+
+    def _set_list(self, list_id: int, ivf_list: _IVFList) -> None:
+        previous = self.lists.get(list_id)
+        for record in previous.records if previous else []:
+            if record is not None:
+                self._locations.pop(record["id"], None)
+        self.lists[list_id] = ivf_list
+        for row, record in enumerate(ivf_list.records):
+            if record is not None:
+                self._locations[record["id"]] = (list_id, row)
+
+    # Writing
+
+    def _write_manifest(self) -> None:
+        atomic_write(self.path / self._MANIFEST, json.dumps(self.manifest).encode("utf-8"))
+        self._stamp = self._stat()
+
+    def _live(self) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+        records = [record for ivf_list in self.lists.values() for record in ivf_list.records if record is not None]
+        dim = self.manifest.get("dim", 0)
+        parts = [np.asarray(ivf_list.vectors[ivf_list.alive]) for ivf_list in self.lists.values()]
+        vectors = np.concatenate(parts) if parts else np.empty((0, dim), dtype=np.float32)
+        return records, vectors
+
+    def _rebuild(self, records: List[Dict[str, Any]], vectors: np.ndarray) -> None:
+        """Retrains the centroids over ``records`` and writes every list into a new segment directory."""
+        size = vectors.shape[0]
+        centroids = None
+        if size >= self.MIN_TRAIN_SIZE:
+            centroids = _train_centroids(vectors, int(min(4096, max(8, np.sqrt(size)))))
+        assignments = _assign(vectors, centroids) if centroids is not None else np.zeros(size, dtype=np.int32)
+        codes, scales = _quantize(vectors, settings.rag_vector_dtype)
+
+        version = self.manifest.get("version", 0) + 1
+        manifest = {
+            "version": version,
+            "segments": f"segments-{version}",
+            "dim": int(vectors.shape[1]),
+            "dtype": str(codes.dtype),
+            "built_size": size,
+            "lists": {},
+        }
+        directory = self.path / manifest["segments"]
+        directory.mkdir(parents=True, exist_ok=True)
+        if centroids is not None:
+            np.save(directory / "centroids.npy", centroids)
+        for list_id in np.unique(assignments).tolist():
+            rows = np.flatnonzero(assignments == list_id)
+            prefix = directory / str(list_id)
+            vectors[rows].astype(np.float32).tofile(f"{prefix}.vectors")
+            codes[rows].tofile(f"{prefix}.codes")
+            scales[rows].tofile(f"{prefix}.scales")
+            log = "".join(
+                json.dumps({"row": row, "record": records[idx]}, default=str) + "\n" for row, idx in enumerate(rows)
+            ).encode("utf-8")
+            Path(f"{prefix}.records.jsonl").write_bytes(log)
+            manifest["lists"][str(list_id)] = {"rows": int(rows.shape[0]), "log_bytes": len(log), "dead": 0}
+
+        previous = self.manifest.get("segments")
+        self.manifest = manifest
+        self.lists, self._locations, self.centroids = {}, {}, centroids
+        self._write_manifest()
+        for key, meta in manifest["lists"].items():
+            self._set_list(int(key), self._read_list(manifest, int(key), meta))
+        if previous and previous != manifest["segments"]:
+            # Readers that still map old files keep them alive until they reload
+            shutil.rmtree(self.path / previous, ignore_errors=True)
+
+    def _write_list(
+        self,
+        list_id: int,
+        appends: List[Tuple[Dict[str, Any], np.ndarray]],
+        updates: List[Tuple[int, Optional[Dict[str, Any]], Optional[np.ndarray]]],
+    ) -> None:
+        """Appends rows to one list and overwrites (or, with a None record, deletes) existing rows."""
+        meta = dict(self.manifest["lists"].get(str(list_id)) or {"rows": 0, "log_bytes": 0, "dead": 0})
+        prefix, dim, dtype = self._prefix(list_id), self.manifest["dim"], np.dtype(self.manifest["dtype"])
+        widths = {"vectors": 4 * dim, "codes": dtype.itemsize * dim, "scales": 4}
+        paths = {name: Path(f"{prefix}.{name}") for name in widths}
+        log_path = Path(f"{prefix}.records.jsonl")
+        # Bytes past the committed sizes come from a writer that died before updating the manifest
+        for name, width in widths.items():
+            if paths[name].exists() and paths[name].stat().st_size > meta["rows"] * width:
+                os.truncate(paths[name], meta["rows"] * width)
+        if log_path.exists() and log_path.stat().st_size > meta["log_bytes"]:
+            os.truncate(log_path, meta["log_bytes"])
+
+        dtype_name = self.manifest["dtype"]
+        overwrites = [(row, vector) for row, _, vector in updates if vector is not None]
+        over_vectors = np.asarray([vector for _, vector in overwrites], dtype=np.float32).reshape(-1, dim)
+        over_codes, over_scales = _quantize(over_vectors, dtype_name)
+        new_vectors = np.asarray([vector for _, vector in appends], dtype=np.float32).reshape(-1, dim)
+        new_codes, new_scales = _quantize(new_vectors, dtype_name)
+
+        for name, written, added in (
+            ("vectors", over_vectors, new_vectors),
+            ("codes", over_codes, new_codes),
+            ("scales", over_scales, new_scales),
+        ):
+            if overwrites:
+                with open(paths[name], "r+b") as handle:
+                    for (row, _), values in zip(overwrites, written):
+                        handle.seek(row * widths[name])
+                        handle.write(np.ascontiguousarray(values).tobytes())
+            if appends:
+                with open(paths[name], "ab") as handle:
+                    added.tofile(handle)
+        entries = [{"row": row, "record": record} for row, record, _ in updates]
+        entries.extend({"row": meta["rows"] + idx, "record": record} for idx, (record, _) in enumerate(appends))
+        log = "".join(json.dumps(entry, default=str) + "\n" for entry in entries).encode("utf-8")
+        with open(log_path, "ab") as handle:
+            handle.write(log)
+        meta["rows"] += len(appends)
+        meta["log_bytes"] += len(log)
+        meta["dead"] += sum(record is None for _, record, _ in updates)
+        self.manifest["lists"][str(list_id)] = meta
+
+        # Mirror the write in memory instead of re-reading the list
+        previous = self.lists.get(list_id)
+        records = list(previous.records) if previous else []
+        codes = np.array(previous.codes) if previous else np.empty((0, dim), dtype=dtype)
+        scales = np.array(previous.scales) if previous else np.empty(0, dtype=np.float32)
+        if overwrites:
+            rows = [row for row, _ in overwrites]
+            codes[rows], scales[rows] = over_codes, over_scales
+        for row, record, _ in updates:
+            records[row] = record
+        codes, scales = np.concatenate([codes, new_codes]), np.concatenate([scales, new_scales])
+        records.extend(record for record, _ in appends)
+        vectors = np.memmap(paths["vectors"], dtype=np.float32, mode="r", shape=(meta["rows"], dim))
+        self._set_list(list_id, _IVFList(meta, vectors, codes, scales, records))
+
+    def _needs_rebuild(self) -> bool:
+        stored = sum(meta["rows"] for meta in self.manifest["lists"].values())
+        if self.manifest["dtype"] != str(np.dtype(settings.rag_vector_dtype)):
+            return True
+        # Doubling keeps the amortized rebuild cost per row constant; deleted rows count until compacted
+        return stored >= max(self.MIN_TRAIN_SIZE, 2 * self.manifest["built_size"])
+
+    def _import_legacy(self) -> None:
+        """Moves an index written in the single-matrix layout into segment files."""
+        with file_lock(self.path / self._LOCK):
+            if (self.path / self._MANIFEST).exists():
+                return
+            try:
+                records = json.loads((self.path / "records.json").read_text(encoding="utf-8"))["records"]
+                vectors = np.asarray(np.load(self.path / "vectors.npy"), dtype=np.float32)
+            except (OSError, ValueError, KeyError) as exc:
+                logger.error("Failed to import legacy vector index %s: %s", self.path, exc)
+                return
+            if records:
+                self._rebuild(records, vectors)
+            for name in self._LEGACY_FILES:
+                (self.path / name).unlink(missing_ok=True)
+
+    def upsert(self, records: List[Dict[str, Any]]) -> None:
+        incoming: Dict[str, Tuple[Dict[str, Any], List[float]]] = {}
+        for record in records:
+            embedding = _parse_embedding(record.get("embedding"))
+            if embedding is not None:
+                incoming[record["id"]] = ({key: value for key, value in record.items() if key != "embedding"}, embedding)
+        if not incoming:
+            return
+        stored = [record for record, _ in incoming.values()]
+        vectors = _normalize_rows(np.asarray([embedding for _, embedding in incoming.values()], dtype=np.float32))
+
+        with file_lock(self.path / self._LOCK):
+            self._refresh()
+            if not self.manifest or self.manifest["dim"] != vectors.shape[1]:
+                if self.manifest:
+                    logger.warning("Embedding size changed for %s; rebuilding the local index.", self.path)
+                self._rebuild(stored, vectors)
+                return
+            appends: Dict[int, List[Tuple[Dict[str, Any], np.ndarray]]] = {}
+            updates: Dict[int, List[Tuple[int, Optional[Dict[str, Any]], Optional[np.ndarray]]]] = {}
+            targets = (
+                np.argmax(vectors @ self.centroids.T, axis=1)
+                if self.centroids is not None
+                else np.full(len(stored), next(iter(self.lists), 0))
+            )
+            for record, vector, target in zip(stored, vectors, targets.tolist()):
+                location = self._locations.get(record["id"])
+                if location:
+                    updates.setdefault(location[0], []).append((location[1], record, vector))
+                else:
+                    appends.setdefault(target, []).append((record, vector))
+            for list_id in set(appends) | set(updates):
+                self._write_list(list_id, appends.get(list_id, []), updates.get(list_id, []))
+            self._write_manifest()
+            if self._needs_rebuild():
+                self._rebuild(*self._live())
+
+    def prune(self, job_id: str, keep_ids: Set[str]) -> int:
+        if not (self.path / self._MANIFEST).exists():
+            return 0
+        with file_lock(self.path / self._LOCK):
+            self._refresh()
+            deletes: Dict[int, List[Tuple[int, Optional[Dict[str, Any]], Optional[np.ndarray]]]] = {}
+            for record_id, (list_id, row) in self._locations.items():
+                if record_id not in keep_ids and self.lists[list_id].records[row].get("job_id") == job_id:
+                    deletes.setdefault(list_id, []).append((row, None, None))
+            for list_id, rows in deletes.items():
+                self._write_list(list_id, [], rows)
+            if deletes:
+                self._write_manifest()
+        return sum(len(rows) for rows in deletes.values())
+
+    def search(self, query: np.ndarray, top_k: int, filters: Dict[str, Any]) -> List[Tuple[float, Dict[str, Any]]]:
+        if not self.lists or self.manifest.get("dim") != query.shape[0]:
+            return []
+        masks: Dict[int, np.ndarray] = {}
+        for list_id, ivf_list in self.lists.items():
+            mask = ivf_list.alive.copy()
+            for field, value in filters.items():
+                if value is not None and field in ivf_list.columns:
+                    mask &= ivf_list.columns[field] == value
+            if mask.any():
+                masks[list_id] = mask
+        if self.centroids is not None and sum(int(mask.sum()) for mask in masks.values()) > settings.rag_local_exact_threshold:
+            nprobe = min(settings.rag_ivf_nprobe, len(self.centroids))
+            probe = set(np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe].tolist())
+            masks = {list_id: mask for list_id, mask in masks.items() if list_id in probe}
+
+        hits: List[Tuple[float, Dict[str, Any]]] = []
+        for list_id, mask in masks.items():
+            ivf_list = self.lists[list_id]
+            rows = np.flatnonzero(mask)
+            for idx, score in _top_k_codes(
+                ivf_list.codes[rows], ivf_list.scales[rows], query, top_k, full=ivf_list.vectors, positions=rows
+            ):
+                hits.append((score, ivf_list.records[rows[idx]]))
+        hits.sort(key=lambda item: item[0], reverse=True)
+        return hits[:top_k]
+
+
+class LocalVectorStore(VectorStore):
+    """
+    Embedded on-disk IVF indexes, one per table, under ``rag_local_index_dir``.
+    Every search first checks the index manifest, so chunks written by another
+    process (e.g. the Celery worker) are visible to the next query.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._indexes: Dict[str, _IVFIndex] = {}
+        self._lock = threading.Lock()
+
+    def _index(self, table: str) -> _IVFIndex:
+        if table not in self._indexes:
+            self._indexes[table] = _IVFIndex(self.root / table)
+        return self._indexes[table]
+
+    def upsert(self, table: str, records: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._index(table).upsert(records)
+
+    def search(
+        self,
+        tables: List[str],
+        query: np.ndarray,
+        top_k: int,
+        filters: Dict[str, Any],
+    ) -> List[Tuple[float, Dict[str, Any]]]:
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+        query = (query / norm).astype(np.float32)
+        hits: List[Tuple[float, Dict[str, Any]]] = []
+        with self._lock:
+            for table in tables:
+                index = self._index(table)
+                index.refresh()
+                hits.extend(index.search(query, top_k, filters))
+        hits.sort(key=lambda item: item[0], reverse=True)
+        return hits[:top_k]
+
+    def prune(self, table: str, job_id: str, keep_ids: Set[str]) -> int:
+        with self._lock:
+            return self._index(table).prune(job_id, keep_ids)
+
+    def invalidate(self, job_id: str) -> None:
+        with self._lock:
+            for index in self._indexes.values():
+                index.refresh()
+
+
+_vector_store: VectorStore | None = None
+
+
+def get_vector_store() -> VectorStore:
+    global _vector_store
+    if _vector_store is None:
+        if settings.rag_vector_backend == "local":
+            root = Path(settings.rag_local_index_dir or Path(tempfile.gettempdir()) / "contractguard_vector_index")
+            _vector_store = LocalVectorStore(root)
+        else:
+            _vector_store = SupabaseVectorStore()
+    return _vector_store
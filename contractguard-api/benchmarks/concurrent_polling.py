@@ -0,0 +1,92 @@
+"""
+Load test for dashboard status polling: concurrent clients poll
+GET /upload/{job_id}/status on a fixed schedule through the real FastAPI app
+while the repository talks to a PostgREST stand-in with a fixed per-request
+latency. Latency is measured from each poll's scheduled time, so queueing
+behind a blocked event loop counts. Compares the repository pool against
+running the blocking repository on the event loop.
+
+    python -m benchmarks.concurrent_polling --clients 50 --polls 20 --interval 0.5 --rtt-ms 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from typing import List
+
+import httpx
+import numpy as np
+
+from app.config import get_settings
+from app.main import app
+from app.services import job_repository, job_repository_async
+from benchmarks.job_loading import _PostgrestStandIn
+
+
+async def _inline(func, *args, **kwargs):
+    # What the routes did before: the blocking call runs on the event loop
+    return func(*args, **kwargs)
+
+
+async def _poll(
+    client: httpx.AsyncClient,
+    job_id: str,
+    polls: int,
+    interval: float,
+    offset: float,
+    latencies: List[float],
+) -> None:
+    start = time.perf_counter() + offset
+    for poll in range(polls):
+        scheduled = start + poll * interval
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        response = await client.get(f"/upload/{job_id}/status")
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - scheduled) * 1000)
+
+
+async def _scenario(job_id: str, clients: int, polls: int, interval: float) -> List[float]:
+    latencies: List[float] = []
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        await asyncio.gather(
+            *[
+                _poll(client, job_id, polls, interval, interval * idx / clients, latencies)
+                for idx in range(clients)
+            ]
+        )
+    return latencies
+
+
+def run(clients: int, polls: int, interval: float, rtt_ms: float) -> None:
+    settings = get_settings()
+    # Measure the database path, not the job cache
+    settings.job_cache_ttl_seconds = 0
+    stand_in = _PostgrestStandIn(rtt_ms / 1000, documents=10, discrepancies=50)
+    job_repository._client = lambda: stand_in
+    job_id = stand_in.tables["jobs"][0]["id"]
+
+    pooled = job_repository_async.run
+    print(
+        f"clients={clients} polls={polls} interval={interval}s rtt={rtt_ms}ms pool={settings.repository_pool_size}"
+    )
+    print(f"{'mode':>9} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for mode, runner in (("blocking", _inline), ("pooled", pooled)):
+        job_repository_async.run = runner
+        started = time.perf_counter()
+        latencies = asyncio.run(_scenario(job_id, clients, polls, interval))
+        elapsed = time.perf_counter() - started
+        p50, p99 = np.percentile(latencies, [50, 99])
+        print(f"{mode:>9} {len(latencies) / elapsed:>8.0f} {p50:>8.1f} {p99:>8.1f}")
+    job_repository_async.run = pooled
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--polls", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.5)
+    parser.add_argument("--rtt-ms", type=float, default=20.0)
+    args = parser.parse_args()
+    run(args.clients, args.polls, args.interval, args.rtt_ms)
@@ -0,0 +1,111 @@
+"""
+Latency of job_repository.load_job strategies against an in-process PostgREST
+stand-in that charges a fixed round-trip time per request: the previous five
+sequential queries, the concurrent fallback, and the single aggregate RPC.
+
+    python -m benchmarks.job_loading --rtt-ms 20 --loads 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from app.services import job_repository
+
+
+class _Response:
+    def __init__(self, data: Any):
+        self.data = data
+
+
+class _Query:
+    def __init__(self, stand_in: "_PostgrestStandIn", data: Any):
+        self._stand_in = stand_in
+        self._data = data
+
+    def select(self, *args, **kwargs) -> "_Query":
+        return self
+
+    eq = order = limit = select
+
+    def execute(self) -> _Response:
+        self._stand_in.requests += 1
+        time.sleep(self._stand_in.rtt)
+        return _Response(self._data)
+
+
+class _PostgrestStandIn:
+    """Serves one canned job; every execute() costs ``rtt`` seconds."""
+
+    def __init__(self, rtt: float, documents: int, discrepancies: int):
+        self.rtt = rtt
+        self.requests = 0
+        job_id = "00000000-0000-0000-0000-000000000001"
+        self.tables: Dict[str, List[Dict[str, Any]]] = {
+            "jobs": [
+                {"id": job_id, "vendor_name": "Bench", "created_at": datetime.utcnow().isoformat(), "status": "completed"}
+            ],
+            "job_stages": [{"name": name, "status": "completed"} for name in ("upload", "extraction", "llm", "recon")],
+            "job_documents": [
+                {"document_type": "contract" if idx % 2 else "billing", "filename": f"doc-{idx}.pdf", "metadata": {}}
+                for idx in range(documents)
+            ],
+            "job_discrepancies": [{"data": {"issue": f"issue-{idx}", "value": idx}} for idx in range(discrepancies)],
+            "job_metrics": [{"metrics": {"documents_processed": documents}}],
+        }
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, self.tables[name])
+
+    def rpc(self, name: str, params: Dict[str, Any]) -> _Query:
+        aggregate = {
+            "job": self.tables["jobs"][0],
+            "stages": self.tables["job_stages"],
+            "documents": self.tables["job_documents"],
+            "discrepancies": self.tables["job_discrepancies"],
+            "metrics": self.tables["job_metrics"][0]["metrics"],
+        }
+        return _Query(self, aggregate)
+
+
+def _sequential(client, job_id: str) -> Dict[str, Any]:
+    rows = job_repository._query_job(client, job_id, None)
+    return {
+        "job": rows[0],
+        "stages": job_repository._query_stages(client, job_id),
+        "documents": job_repository._query_documents(client, job_id),
+        "discrepancies": job_repository._query_discrepancies(client, job_id),
+        "metrics": job_repository._query_metrics(client, job_id),
+    }
+
+
+def run(rtt_ms: float, loads: int, documents: int, discrepancies: int) -> None:
+    client = _PostgrestStandIn(rtt_ms / 1000, documents, discrepancies)
+    job_id = client.tables["jobs"][0]["id"]
+    strategies = {
+        "sequential": lambda: _sequential(client, job_id),
+        "concurrent": lambda: job_repository._fetch_aggregate_concurrent(client, job_id, None),
+        "rpc": lambda: job_repository._fetch_aggregate_rpc(client, job_id, None),
+    }
+    print(f"rtt={rtt_ms}ms documents={documents} discrepancies={discrepancies}")
+    print(f"{'strategy':>11} {'requests':>9} {'mean ms':>8}")
+    for name, fetch in strategies.items():
+        client.requests = 0
+        started = time.perf_counter()
+        for _ in range(loads):
+            job_repository._job_from_aggregate(fetch())
+        mean_ms = (time.perf_counter() - started) * 1000 / loads
+        print(f"{name:>11} {client.requests / loads:>9.0f} {mean_ms:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rtt-ms", type=float, default=20.0)
+    parser.add_argument("--loads", type=int, default=50)
+    parser.add_argument("--documents", type=int, default=40)
+    parser.add_argument("--discrepancies", type=int, default=200)
+    args = parser.parse_args()
+    run(args.rtt_ms, args.loads, args.documents, args.discrepancies)
@@ -0,0 +1,64 @@
+"""
+Memory, scan latency and recall@10 of quantized embedding codes against exact
+float32 search, with and without full-precision rescoring of the top
+candidates, on clustered synthetic embeddings.
+
+    python -m benchmarks.quantization --sizes 10000 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import List
+
+import numpy as np
+
+from app.services.vector_store import _normalize_rows, _quantize, _top_k, _top_k_codes
+
+DIM = 1536
+TOP_K = 10
+QUERIES = 50
+
+
+def _clustered(rng: np.random.Generator, count: int, centers: np.ndarray) -> np.ndarray:
+    labels = rng.integers(0, centers.shape[0], count)
+    noise = rng.normal(scale=1.0, size=(count, DIM)).astype(np.float32)
+    return _normalize_rows(centers[labels] + noise / np.sqrt(DIM))
+
+
+def _recall(found: List[set], exact: List[set]) -> float:
+    return float(np.mean([len(f & e) / max(1, len(e)) for f, e in zip(found, exact)]))
+
+
+def run(sizes: List[int]) -> None:
+    rng = np.random.default_rng(7)
+    centers = _normalize_rows(rng.normal(size=(256, DIM)).astype(np.float32))
+    print(f"{'chunks':>8} {'dtype':>8} {'MB':>8} {'ratio':>6} {'scan ms':>8} {'recall':>7} {'rescored':>9}")
+    for size in sizes:
+        vectors = _clustered(rng, size, centers)
+        queries = _clustered(rng, QUERIES, centers)
+        exact = [{idx for idx, _ in _top_k(vectors, query, TOP_K)} for query in queries]
+        baseline = vectors.nbytes
+
+        for dtype in ("float32", "float16", "int8"):
+            codes, scales = _quantize(vectors, dtype)
+            stored = codes.nbytes + (scales.nbytes if dtype == "int8" else 0)
+
+            started = time.perf_counter()
+            approx = [{idx for idx, _ in _top_k_codes(codes, scales, query, TOP_K)} for query in queries]
+            scan_ms = (time.perf_counter() - started) * 1000 / QUERIES
+            rescored = [
+                {idx for idx, _ in _top_k_codes(codes, scales, query, TOP_K, full=vectors)} for query in queries
+            ]
+            print(
+                f"{size:>8} {dtype:>8} {stored / 2**20:>8.1f} {baseline / stored:>6.1f} {scan_ms:>8.2f} "
+                f"{_recall(approx, exact):>7.3f} {_recall(rescored, exact):>9.3f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+    run(args.sizes)
@@ -0,0 +1,72 @@
+"""
+Compares the old pure-Python cosine scan in rag_store.query_context with the
+NumPy matrix top-k.
+
+    python -m benchmarks.rag_similarity --sizes 1000 10000 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import List
+
+import numpy as np
+
+from app.services.vector_store import _build_embedding_matrix, _top_k
+
+DIM = 1536
+TOP_K = 4
+# Rows reuse a pool of distinct vectors so 100k Python-list rows fit in memory
+POOL_SIZE = 1000
+
+
+def _python_cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm_a = sum(x * x for x in a) ** 0.5
+    norm_b = sum(x * x for x in b) ** 0.5
+    if norm_a == 0 or norm_b == 0:
+        return 0.0
+    return dot / (norm_a * norm_b)
+
+
+def _python_top_k(rows, question: List[float], k: int):
+    scored = [(_python_cosine(question, row["embedding"]), row) for row in rows]
+    scored = [item for item in scored if item[0] > 0]
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return scored[:k]
+
+
+def run(sizes: List[int], repeats: int) -> None:
+    rng = random.Random(7)
+    pool = [[rng.uniform(-1, 1) for _ in range(DIM)] for _ in range(POOL_SIZE)]
+    question = [rng.uniform(-1, 1) for _ in range(DIM)]
+    q_vector = np.asarray(question, dtype=np.float32)
+
+    print(f"{'chunks':>8} {'python ms':>12} {'build ms':>10} {'numpy ms':>10} {'speedup':>9}")
+    for size in sizes:
+        rows = [{"embedding": pool[idx % POOL_SIZE], "text": str(idx)} for idx in range(size)]
+
+        started = time.perf_counter()
+        _python_top_k(rows, question, TOP_K)
+        python_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        matrix, _ = _build_embedding_matrix(rows, DIM)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        for _ in range(repeats):
+            _top_k(matrix, q_vector, TOP_K)
+        numpy_ms = (time.perf_counter() - started) * 1000 / repeats
+
+        print(f"{size:>8} {python_ms:>12.1f} {build_ms:>10.1f} {numpy_ms:>10.2f} {python_ms / numpy_ms:>8.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+    run(args.sizes, args.repeats)
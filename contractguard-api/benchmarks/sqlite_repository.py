@@ -0,0 +1,65 @@
+"""
+Latency of the embedded SQLite job repository: a seeded job is loaded through
+each projection and then rewritten the way the pipeline does (stage update,
+metrics patch, discrepancy sync). No network or Supabase project is needed.
+
+    python -m benchmarks.sqlite_repository --loads 1000 --discrepancies 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from app.services import job_repository
+from app.services.job_repository_sqlite import SQLiteJobRepository
+
+
+def _timed(label: str, repeats: int, func) -> None:
+    started = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    mean_ms = (time.perf_counter() - started) * 1000 / repeats
+    print(f"{label:>22} {mean_ms:>9.3f}")
+
+
+def run(loads: int, documents: int, discrepancies: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = SQLiteJobRepository(str(Path(tmp) / "jobs.sqlite3"))
+        # Route the module-level functions (natural keys, hashing) through the benchmark database
+        job_repository.settings.job_repository_backend = "sqlite"
+        job_repository._backend = backend
+
+        job = job_repository.create_job_record("Bench", None)
+        job_repository.replace_contract_files(
+            job.id,
+            [{"filename": f"doc-{idx}.pdf", "storage_path": f"bench/doc-{idx}.pdf", "metadata": {}} for idx in range(documents)],
+        )
+        findings = [{"customer": f"c-{idx % 50}", "issue": f"issue-{idx}", "value": idx} for idx in range(discrepancies)]
+        job_repository.replace_discrepancies(job.id, findings)
+        job.metrics.update({"currency": "USD", "recoverable_amount": 1.0, "chat_history": [{"q": "x" * 200}] * 50})
+        job_repository.save_metrics(job.id, job.metrics)
+
+        print(f"documents={documents} discrepancies={discrepancies}")
+        print(f"{'operation':>22} {'mean ms':>9}")
+        for projection in job_repository.PROJECTIONS:
+            _timed(f"load_job[{projection}]", loads, lambda: job_repository.load_job(job.id, projection=projection))
+        _timed("update_stage", loads, lambda: job_repository.update_stage(job.id, "reconciliation", "in_progress", None))
+
+        def patch_metrics() -> None:
+            job.metrics["recoverable_amount"] += 1
+            job_repository.save_metrics(job.id, job.metrics)
+
+        _timed("save_metrics (patch)", loads, patch_metrics)
+        _timed("replace_discrepancies", 10, lambda: job_repository.replace_discrepancies(job.id, findings))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--loads", type=int, default=1000)
+    parser.add_argument("--documents", type=int, default=40)
+    parser.add_argument("--discrepancies", type=int, default=2000)
+    args = parser.parse_args()
+    run(args.loads, args.documents, args.discrepancies)
@@ -0,0 +1,75 @@
+"""
+Build and query benchmark for the local IVF vector index against exact
+brute-force search, on clustered synthetic embeddings. Chunks are upserted in
+the pipeline's batch size (50), and "add s" is the time to index ``--add``
+further chunks onto the built index the same way.
+
+    python -m benchmarks.vector_index --sizes 10000 20000 50000 --batch-size 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from app.services.vector_store import _IVFIndex, _normalize_rows, _top_k
+
+DIM = 1536
+TOP_K = 10
+QUERIES = 50
+
+
+def _clustered(rng: np.random.Generator, count: int, centers: np.ndarray) -> np.ndarray:
+    labels = rng.integers(0, centers.shape[0], count)
+    noise = rng.normal(scale=1.0, size=(count, DIM)).astype(np.float32)
+    return _normalize_rows(centers[labels] + noise / np.sqrt(DIM))
+
+
+def run(sizes: List[int], batch_size: int, add: int) -> None:
+    rng = np.random.default_rng(11)
+    centers = _normalize_rows(rng.normal(size=(256, DIM)).astype(np.float32))
+    print(f"{'chunks':>8} {'build s':>8} {'add s':>7} {'exact ms':>9} {'ivf ms':>8} {'recall@10':>10}")
+    for size in sizes:
+        vectors = _clustered(rng, size + add, centers)
+        queries = _clustered(rng, QUERIES, centers)
+        records = [
+            {"id": str(idx), "job_id": "bench", "source_type": "contract_clause", "embedding": vectors[idx]}
+            for idx in range(size + add)
+        ]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            index = _IVFIndex(Path(tmp) / "chunks")
+            started = time.perf_counter()
+            for start in range(0, size, batch_size):
+                index.upsert(records[start : min(size, start + batch_size)])
+            build_s = time.perf_counter() - started
+
+            started = time.perf_counter()
+            for start in range(size, size + add, batch_size):
+                index.upsert(records[start : start + batch_size])
+            add_s = time.perf_counter() - started
+
+            started = time.perf_counter()
+            exact = [{idx for idx, _ in _top_k(vectors, query, TOP_K)} for query in queries]
+            exact_ms = (time.perf_counter() - started) * 1000 / QUERIES
+
+            started = time.perf_counter()
+            approx = [{int(row["id"]) for _, row in index.search(query, TOP_K, {"job_id": "bench"})} for query in queries]
+            ivf_ms = (time.perf_counter() - started) * 1000 / QUERIES
+
+        recall = np.mean([len(a & e) / max(1, len(e)) for a, e in zip(approx, exact)])
+        print(f"{size:>8} {build_s:>8.1f} {add_s:>7.2f} {exact_ms:>9.2f} {ivf_ms:>8.2f} {recall:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 20000, 50000])
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--add", type=int, default=2000)
+    args = parser.parse_args()
+    run(args.sizes, args.batch_size, args.add)
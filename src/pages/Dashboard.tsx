@@ -1689,6 +1689,16 @@ type JobMetrics = Record<string, unknown> & {
   billing_files?: BillingFile[];
 };
 
+type Discrepancy = {
+  customer?: string;
+  issue?: string;
+  value?: number;
+  priority?: string;
+  due?: string;
+  invoice_date?: string;
+  evidence?: DiscrepancyEvidence[];
+};
+
 type AnalysisSummary = {
   job: {
     id: string;
@@ -1696,17 +1706,26 @@ type AnalysisSummary = {
     vendor_name?: string;
     metrics: JobMetrics;
   };
-  discrepancies: Array<{
-    customer?: string;
-    issue?: string;
-    value?: number;
-    priority?: string;
-    due?: string;
-    invoice_date?: string;
-    evidence?: DiscrepancyEvidence[];
-  }>;
+  discrepancies: Discrepancy[];
+  next_cursor?: string | null;
+};
+
+type DiscrepancyPage = {
+  discrepancies: Discrepancy[];
+  next_cursor?: string | null;
+};
+
+type DiscrepancyTotals = {
+  count: number;
+  total_value: number;
+  by_priority: Array<{ priority?: string | null; count: number; value: number }>;
+  by_customer: Array<{ customer?: string | null; count: number; value: number }>;
+  by_month?: Array<{ month: string; category: string; count: number; value: number }>;
 };
 
+// Rows per alert-list page; counts, sums and the trend come from the totals, never from loaded rows
+const DISCREPANCY_PAGE_SIZE = 100;
+
 const defaultMetricHighlights = [
   {
     label: "Recoverable revenue",
@@ -1846,58 +1865,13 @@ const generateMessageId = () => {
 
 const delay = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
 
-const parseInvoiceDate = (value?: string | null) => {
-  if (!value) return null;
-  const trimmed = value.trim();
-  if (!trimmed) return null;
-
-  const isoMatch = trimmed.match(/^(\d{4})-(\d{2})-(\d{2})$/);
-  if (isoMatch) {
-    const [, yearStr, monthStr, dayStr] = isoMatch;
-    const dt = new Date(Number(yearStr), Number(monthStr) - 1, Number(dayStr));
-    if (!Number.isNaN(dt.getTime())) {
-      return dt;
-    }
-  }
-
-  const direct = Date.parse(trimmed);
-  if (!Number.isNaN(direct)) {
-    return new Date(direct);
-  }
-
-  const normalized = trimmed.replace(/\./g, "/").replace(/-/g, "/");
-  const parts = normalized.split("/");
-  if (parts.length === 3 && parts.every((part) => part && /^\d+$/.test(part))) {
-    const [first, second, rawYear] = parts.map((part) => parseInt(part, 10));
-    const year = rawYear < 100 ? rawYear + 2000 : rawYear;
-    const candidateOrders = [
-      { month: first, day: second },
-      { month: second, day: first },
-    ];
-    for (const candidate of candidateOrders) {
-      const { month, day } = candidate;
-      if (month >= 1 && month <= 12 && day >= 1 && day <= 31) {
-        const dt = new Date(year, month - 1, day);
-        if (!Number.isNaN(dt.getTime())) return dt;
-      }
-    }
-  }
-
-  const monthNameMatch = trimmed.match(/([A-Za-z]+)\s+(\d{1,2}),\s*(\d{4})/);
-  if (monthNameMatch) {
-    const parsed = Date.parse(trimmed.replace(/(\d+)(st|nd|rd|th)/, "$1"));
-    if (!Number.isNaN(parsed)) {
-      return new Date(parsed);
-    }
-  }
-
-  return null;
-};
-
 const Dashboard = () => {
   const [searchParams] = useSearchParams();
   const jobId = searchParams.get("job");
   const [analysis, setAnalysis] = useState<AnalysisSummary | null>(null);
+  const [discrepancyTotals, setDiscrepancyTotals] = useState<DiscrepancyTotals | null>(null);
+  const [discrepancyCursor, setDiscrepancyCursor] = useState<string | null>(null);
+  const [loadingMoreDiscrepancies, setLoadingMoreDiscrepancies] = useState(false);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [selectedRange, setSelectedRange] = useState("Last 6 months");
@@ -1931,17 +1905,26 @@ const Dashboard = () => {
   useEffect(() => {
     if (!jobId) {
       setAnalysis(null);
+      setDiscrepancyTotals(null);
+      setDiscrepancyCursor(null);
       return;
     }
     const controller = new AbortController();
+    const { signal } = controller;
     setLoading(true);
     setError(null);
-    fetch(`${API_BASE}/analysis/${jobId}/summary`, { signal: controller.signal })
-      .then(async (res) => {
-        if (!res.ok) throw new Error(`Request failed (${res.status})`);
-        const payload = (await res.json()) as AnalysisSummary;
-        setAnalysis(payload);
-      })
+    const loadAnalysis = async () => {
+      const [summaryRes, totalsRes] = await Promise.all([
+        fetch(`${API_BASE}/analysis/${jobId}/summary?limit=${DISCREPANCY_PAGE_SIZE}`, { signal }),
+        fetch(`${API_BASE}/analysis/${jobId}/discrepancies/totals`, { signal }),
+      ]);
+      if (!summaryRes.ok) throw new Error(`Request failed (${summaryRes.status})`);
+      const payload = (await summaryRes.json()) as AnalysisSummary;
+      setAnalysis(payload);
+      setDiscrepancyCursor(payload.next_cursor ?? null);
+      setDiscrepancyTotals(totalsRes.ok ? ((await totalsRes.json()) as DiscrepancyTotals) : null);
+    };
+    loadAnalysis()
       .catch((err) => {
         if (err.name !== "AbortError") {
           setError(err.message || "Failed to load job data.");
@@ -1953,6 +1936,29 @@ const Dashboard = () => {
     return () => controller.abort();
   }, [jobId]);
 
+  // Later pages load on request and are appended once each; the first page came with the summary
+  const loadMoreDiscrepancies = async () => {
+    if (!jobId || !discrepancyCursor || loadingMoreDiscrepancies) return;
+    setLoadingMoreDiscrepancies(true);
+    try {
+      const res = await fetch(
+        `${API_BASE}/analysis/${jobId}/discrepancies?limit=${DISCREPANCY_PAGE_SIZE}&cursor=${encodeURIComponent(discrepancyCursor)}`,
+      );
+      if (!res.ok) throw new Error(`Request failed (${res.status})`);
+      const page = (await res.json()) as DiscrepancyPage;
+      setAnalysis((current) =>
+        current && current.job.id === jobId
+          ? { ...current, discrepancies: current.discrepancies.concat(page.discrepancies) }
+          : current,
+      );
+      setDiscrepancyCursor(page.next_cursor ?? null);
+    } catch (err: any) {
+      setError(err.message || "Failed to load more discrepancies.");
+    } finally {
+      setLoadingMoreDiscrepancies(false);
+    }
+  };
+
   const metrics = (analysis?.job.metrics ?? {}) as JobMetrics;
   const contractCurrency = (metrics.gpt4o_rules as any)?.currency || 
   (metrics as any)?.currency || 
@@ -1967,6 +1973,7 @@ const Dashboard = () => {
   };
   const clauseDistribution = metrics.clause_distribution ?? {};
   const discrepancies = analysis?.discrepancies ?? [];
+  const discrepancyCount = discrepancyTotals?.count ?? 0;
   const llmSummary = metrics.llm_summary as string | undefined;
   const clauseHits = metrics.total_clauses ?? 0;
   const recoverableAmount = metrics.recoverable_amount ?? 0;
@@ -2068,13 +2075,13 @@ const Dashboard = () => {
   const highlightCards = useMemo(() => {
     if (!analysis) return defaultMetricHighlights;
     
-    const hasIssues = discrepancies.length > 0;
+    const hasIssues = discrepancyCount > 0;
     
     return [
       {
         label: "Active escalations",
         value: hasIssues 
-          ? `${discrepancies.length} ${discrepancies.length === 1 ? 'issue' : 'issues'}` 
+          ? `${discrepancyCount} ${discrepancyCount === 1 ? 'issue' : 'issues'}` 
           : "All clear",
         delta: hasIssues
           ? `${formatCurrency(recoverableAmount, contractCurrency)} at risk`
@@ -2117,7 +2124,7 @@ const Dashboard = () => {
         label: "Recovery progress",
         value: hasIssues ? "In progress" : "Complete",
         delta: hasIssues 
-          ? `${discrepancies.length} cases pending`
+          ? `${discrepancyCount} cases pending`
           : "All cleared",
         trend: "→ On track",
         icon: CircleCheck,
@@ -2125,35 +2132,16 @@ const Dashboard = () => {
         actionable: false,
       },
     ];
-  }, [analysis, billingSummary, clauseHits, discrepancies.length, metrics.llm_insights, recoverableAmount, contractCurrency]);
+  }, [analysis, billingSummary, clauseHits, discrepancyCount, metrics.llm_insights, recoverableAmount, contractCurrency]);
 
   const leakageTrend = useMemo(() => {
-    const categorize = (issue?: string) => {
-      const text = (issue || "").toLowerCase();
-      if (text.includes("discount")) return "discounts";
-      if (text.includes("renewal")) return "renewals";
-      return "escalators";
-    };
-  
-    const discrepancyDates = discrepancies
-      .map((discrepancy) => {
-        const primaryDate = parseInvoiceDate(discrepancy.invoice_date);
-        if (primaryDate) return { date: primaryDate, disc: discrepancy };
-        
-        const evidenceDate = discrepancy.evidence?.find((ev: any) => ev.invoice_date)?.invoice_date;
-        const parsed = parseInvoiceDate(evidenceDate);
-        if (parsed) return { date: parsed, disc: discrepancy };
-        
-        return null;
-      })
-      .filter((item): item is { date: Date; disc: typeof discrepancies[number] } => !!item);
-  
+    const monthTotals = discrepancyTotals?.by_month ?? [];
     const now = new Date();
-    const earliest =
-      discrepancyDates.reduce(
-        (min, current) => (current.date < min ? current.date : min),
-        discrepancyDates[0]?.date ?? now,
-      ) || now;
+    const parseMonth = (month: string) => {
+      const [year, monthIndex] = month.split("-").map(Number);
+      return new Date(year, monthIndex - 1, 1);
+    };
+    const earliest = monthTotals.length ? parseMonth(monthTotals[0].month) : now;
   
     const monthsDiff =
       (now.getFullYear() - earliest.getFullYear()) * 12 + (now.getMonth() - earliest.getMonth());
@@ -2178,24 +2166,13 @@ const Dashboard = () => {
       return acc;
     }, {});
   
-    discrepancyDates.forEach(({ date, disc }) => {
-      const key = `${date.getFullYear()}-${String(date.getMonth() + 1).padStart(2, '0')}`;
-      const bucket = bucketMap[key];
-      
-      if (bucket) {
-        const category = categorize(disc.issue);
-        const value = Math.round(disc.value ?? 0);
-        bucket[category as "escalators" | "discounts" | "renewals"] += value;
-      } else {
-        const lastBucket = monthBuckets[monthBuckets.length - 1];
-        const category = categorize(disc.issue);
-        const value = Math.round(disc.value ?? 0);
-        lastBucket[category as "escalators" | "discounts" | "renewals"] += value;
-      }
+    monthTotals.forEach(({ month, category, value }) => {
+      const bucket = bucketMap[month] ?? monthBuckets[monthBuckets.length - 1];
+      bucket[category as "escalators" | "discounts" | "renewals"] += Math.round(value);
     });
   
     return monthBuckets;
-  }, [discrepancies]);
+  }, [discrepancyTotals]);
 
   const discrepancyAlerts = useMemo(() => {
     if (!analysis) return defaultContractAlerts;
@@ -2239,10 +2216,10 @@ const Dashboard = () => {
   const vendorRisk = useMemo(() => {
     if (!analysis) return null;
     const leakage = recoverableAmount;
-    const discrepancyCount = discrepancies.length;
-    const highSeverity = discrepancies.filter(
-      (item) => (item.priority || "").toLowerCase() === "high" || (item.issue || "").toLowerCase().includes("critical"),
-    ).length;
+    const isHighSeverity = (priority?: string | null) => ["critical", "high"].includes((priority || "").toLowerCase());
+    const highSeverity = (discrepancyTotals?.by_priority ?? [])
+      .filter((group) => isHighSeverity(group.priority))
+      .reduce((sum, group) => sum + group.count, 0);
     const score = Math.min(100, Math.round(45 + leakage / 1000 + discrepancyCount * 6 + highSeverity * 12));
     const level = score >= 75 ? "High" : score >= 55 ? "Medium" : "Low";
     const summary =
@@ -2259,7 +2236,7 @@ const Dashboard = () => {
       leakage,
       highSeverity,
     };
-  }, [analysis, recoverableAmount, discrepancies]);
+  }, [analysis, recoverableAmount, discrepancyCount, discrepancyTotals]);
 
 const ChartTooltipContent = ({ active, payload }: { active?: boolean; payload?: any[] }) => {
   if (!active || !payload || !payload.length) return null;
@@ -2359,7 +2336,7 @@ const chartFriendlyLabel = {
         {/* 🔥 ENHANCED: Improved metric cards */}
         <section className="grid gap-4 md:grid-cols-2 xl:grid-cols-5">
           {highlightCards.map((metric, index) => {
-            const hasIssues = metric.priority === "critical" && discrepancies.length > 0;
+            const hasIssues = metric.priority === "critical" && discrepancyCount > 0;
             const isActionable = metric.actionable;
             
             return (
@@ -2376,7 +2353,7 @@ const chartFriendlyLabel = {
                   backgroundImage: getCardGradient(metric.priority, hasIssues),
                 }}
                 onClick={() => {
-                  if (metric.label === "Active escalations" && discrepancies.length > 0) {
+                  if (metric.label === "Active escalations" && discrepancyCount > 0) {
                     scrollToDiscrepancies();
                   } else if (metric.label === "AI confidence" && clauseHits > 0) {
                     scrollToEvidence();
@@ -2439,7 +2416,7 @@ const chartFriendlyLabel = {
               </div>
               <Button variant="ghost" size="sm" className="gap-2">
                 <RefreshCw className="h-4 w-4" />
-                View all {discrepancyAlerts.length} discrepancies
+                View all {analysis ? discrepancyCount : discrepancyAlerts.length} discrepancies
               </Button>
             </div>
             <div data-chart="leakage" className="h-72 flex justify-center">
@@ -2536,7 +2513,7 @@ const chartFriendlyLabel = {
               </div>
               <div className="flex flex-wrap gap-2">
                 <Button variant="ghost" size="sm" className="gap-2">
-                  Review all {discrepancyAlerts.length} discrepancies
+                  Review all {analysis ? discrepancyCount : discrepancyAlerts.length} discrepancies
                   <ArrowUpRight className="h-4 w-4" />
                 </Button>
                 <div className="flex gap-2">
@@ -2649,6 +2626,16 @@ const chartFriendlyLabel = {
                 </div>
               ))}
             </div>
+            {discrepancyCursor && (
+              <div className="pt-4 flex items-center justify-between text-sm text-muted-foreground">
+                <span>
+                  Showing {discrepancies.length} of {discrepancyCount} discrepancies
+                </span>
+                <Button variant="secondary" size="sm" onClick={loadMoreDiscrepancies} disabled={loadingMoreDiscrepancies}>
+                  {loadingMoreDiscrepancies ? "Loading..." : "Load more"}
+                </Button>
+              </div>
+            )}
           </div>
 
           <div className="rounded-3xl border border-border bg-card/90 shadow-hover p-6 space-y-5">
@@ -2702,18 +2689,20 @@ const chartFriendlyLabel = {
                 <span className="font-semibold text-foreground">
                   {formatCurrency(recoverableAmount, contractCurrency)} at risk
                 </span>
-                {discrepancies.length > 1 ? (
+                {discrepancyCount > 1 ? (
                   <>
                     {" across "}
                     <span className="font-semibold text-foreground">
-                      {discrepancies.length} invoices
+                      {discrepancyCount} invoices
                     </span>
                     {(() => {
-                      const dates = discrepancies.map(d => d.invoice_date).filter((d): d is string => !!d).sort();
-                      if (dates.length > 0) {
-                        const earliest = new Date(dates[0]).toLocaleDateString('en-US', { month: 'short', year: 'numeric' });
-                        const latest = new Date(dates[dates.length - 1]).toLocaleDateString('en-US', { month: 'short', year: 'numeric' });
-                        return dates.length > 1 ? ` (${earliest} - ${latest})` : ` in ${earliest}`;
+                      const months = (discrepancyTotals?.by_month ?? []).map((group) => group.month);
+                      if (months.length > 0) {
+                        const formatMonth = (month: string) =>
+                          new Date(`${month}-01T00:00:00`).toLocaleDateString('en-US', { month: 'short', year: 'numeric' });
+                        const earliest = formatMonth(months[0]);
+                        const latest = formatMonth(months[months.length - 1]);
+                        return earliest !== latest ? ` (${earliest} - ${latest})` : ` in ${earliest}`;
                       }
                       return "";
                     })()}
@@ -2760,7 +2749,7 @@ const chartFriendlyLabel = {
             <div className="grid md:grid-cols-[2fr_1fr] divide-y md:divide-y-0 md:divide-x divide-border/60">
               <div className="p-6 max-h-80 overflow-auto pr-2">
                 {/* 🔥 NEW: Invoice breakdown */}
-                {discrepancies.length > 1 && (
+                {discrepancyCount > 1 && (
                   <div className="mb-4 p-3 rounded-lg border border-border/60 bg-secondary/30 text-xs">
                     <p className="font-semibold text-foreground mb-2">Affected Invoices:</p>
                     <div className="space-y-1">
@@ -2774,9 +2763,9 @@ const chartFriendlyLabel = {
                           </span>
                         </div>
                       ))}
-                      {discrepancies.length > 6 && (
+                      {discrepancyCount > Math.min(discrepancies.length, 6) && (
                         <p className="text-muted-foreground italic">
-                          ... and {discrepancies.length - 6} more
+                          ... and {discrepancyCount - Math.min(discrepancies.length, 6)} more
                         </p>
                       )}
                     </div>
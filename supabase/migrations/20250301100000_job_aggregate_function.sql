@@ -0,0 +1,36 @@
+-- Loads a job with its stages, documents, discrepancies and metrics as one
+-- JSON document, so job_repository.load_job costs a single round trip.
+-- Returns null when the job does not exist (or belongs to another organization).
+create or replace function public.get_job_aggregate(
+    p_job_id uuid,
+    p_organization_id text default null
+)
+returns jsonb
+language sql
+stable
+as $$
+    select jsonb_build_object(
+        'job', to_jsonb(j),
+        'stages', coalesce(
+            (select jsonb_agg(to_jsonb(s) order by s.sequence) from public.job_stages s where s.job_id = j.id),
+            '[]'::jsonb
+        ),
+        'documents', coalesce(
+            (select jsonb_agg(to_jsonb(d)) from public.job_documents d where d.job_id = j.id),
+            '[]'::jsonb
+        ),
+        'discrepancies', coalesce(
+            (select jsonb_agg(to_jsonb(x)) from public.job_discrepancies x where x.job_id = j.id),
+            '[]'::jsonb
+        ),
+        'metrics', coalesce(
+            (select m.metrics from public.job_metrics m where m.job_id = j.id),
+            '{}'::jsonb
+        )
+    )
+    from public.jobs j
+    where j.id = p_job_id
+        and (p_organization_id is null or j.organization_id = p_organization_id);
+$$;
+
+grant execute on function public.get_job_aggregate(uuid, text) to service_role;
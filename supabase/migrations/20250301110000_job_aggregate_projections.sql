@@ -0,0 +1,63 @@
+-- Projection-aware job loading. get_job_aggregate gains a projection:
+--   'status'  job row, stages and only the metric keys listed in p_metric_keys
+--   'summary' everything except chat history and per-document full_text
+--   'full'    the complete aggregate (unchanged behaviour)
+drop function if exists public.get_job_aggregate(uuid, text);
+
+create or replace function public.get_job_aggregate(
+    p_job_id uuid,
+    p_organization_id text default null,
+    p_projection text default 'full',
+    p_metric_keys text[] default null
+)
+returns jsonb
+language sql
+stable
+as $$
+    select jsonb_build_object(
+        'job', to_jsonb(j),
+        'stages', coalesce(
+            (select jsonb_agg(to_jsonb(s) order by s.sequence) from public.job_stages s where s.job_id = j.id),
+            '[]'::jsonb
+        ),
+        'documents', case when p_projection = 'status' then '[]'::jsonb else coalesce(
+            (select jsonb_agg(to_jsonb(d)) from public.job_documents d where d.job_id = j.id),
+            '[]'::jsonb
+        ) end,
+        'discrepancies', case when p_projection = 'status' then '[]'::jsonb else coalesce(
+            (select jsonb_agg(to_jsonb(x)) from public.job_discrepancies x where x.job_id = j.id),
+            '[]'::jsonb
+        ) end,
+        'metrics', coalesce(
+            (
+                select case p_projection
+                    when 'status' then (
+                        select coalesce(jsonb_object_agg(e.key, e.value), '{}'::jsonb)
+                        from jsonb_each(m.metrics) e
+                        where e.key = any (p_metric_keys)
+                    )
+                    when 'summary' then case
+                        when jsonb_typeof(m.metrics -> 'documents') = 'array' then jsonb_set(
+                            m.metrics - 'chat_history',
+                            '{documents}',
+                            coalesce(
+                                (select jsonb_agg(doc - 'full_text') from jsonb_array_elements(m.metrics -> 'documents') doc),
+                                '[]'::jsonb
+                            )
+                        )
+                        else m.metrics - 'chat_history'
+                    end
+                    else m.metrics
+                end
+                from public.job_metrics m
+                where m.job_id = j.id
+            ),
+            '{}'::jsonb
+        )
+    )
+    from public.jobs j
+    where j.id = p_job_id
+        and (p_organization_id is null or j.organization_id = p_organization_id);
+$$;
+
+grant execute on function public.get_job_aggregate(uuid, text, text, text[]) to service_role;
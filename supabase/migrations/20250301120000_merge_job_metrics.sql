@@ -0,0 +1,20 @@
+-- Key-level metrics persistence: merges changed top-level keys into
+-- job_metrics.metrics (and drops removed ones) instead of rewriting the
+-- whole document, so each save costs the size of what changed.
+create or replace function public.merge_job_metrics(
+    p_job_id uuid,
+    p_patch jsonb,
+    p_removed text[] default '{}'
+)
+returns void
+language sql
+volatile
+as $$
+    insert into public.job_metrics as m (job_id, metrics, updated_at)
+    values (p_job_id, coalesce(p_patch, '{}'::jsonb), timezone('utc', now()))
+    on conflict (job_id) do update
+        set metrics = (m.metrics - coalesce(p_removed, '{}')) || coalesce(p_patch, '{}'::jsonb),
+            updated_at = timezone('utc', now());
+$$;
+
+grant execute on function public.merge_job_metrics(uuid, jsonb, text[]) to service_role;
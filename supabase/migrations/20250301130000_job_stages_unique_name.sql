@@ -0,0 +1,9 @@
+-- Stage updates are a single UPDATE keyed by (job_id, name); enforce that the
+-- key identifies one row. Older duplicates (if any) keep the earliest row.
+delete from public.job_stages s
+using public.job_stages d
+where s.job_id = d.job_id
+    and s.name = d.name
+    and (s.created_at, s.id) > (d.created_at, d.id);
+
+create unique index if not exists uq_job_stages_job_name on public.job_stages (job_id, name);
@@ -0,0 +1,20 @@
+-- Stable natural keys for diff-based persistence of job documents and
+-- discrepancies (upsert on (job_id, natural_key), prune what disappeared).
+-- content_hash lets writers skip rows whose content did not change.
+alter table public.job_documents
+    add column if not exists natural_key text,
+    add column if not exists content_hash text;
+
+alter table public.job_discrepancies
+    add column if not exists natural_key text,
+    add column if not exists content_hash text;
+
+-- Existing rows get a unique placeholder key; the next sync replaces them once
+update public.job_documents set natural_key = id::text where natural_key is null;
+update public.job_discrepancies set natural_key = id::text where natural_key is null;
+
+alter table public.job_documents alter column natural_key set not null;
+alter table public.job_discrepancies alter column natural_key set not null;
+
+create unique index if not exists uq_job_documents_natural_key on public.job_documents (job_id, natural_key);
+create unique index if not exists uq_job_discrepancies_natural_key on public.job_discrepancies (job_id, natural_key);
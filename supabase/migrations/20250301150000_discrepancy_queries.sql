@@ -0,0 +1,127 @@
+-- Paginated, filterable discrepancy queries. The summary endpoint pages
+-- through job_discrepancies by keyset (sort column, id) instead of loading
+-- every row, filters on priority / customer / type, and reads totals from
+-- job_discrepancy_totals. priority_rank orders critical before info.
+alter table public.job_discrepancies
+    add column if not exists type text,
+    add column if not exists priority_rank smallint;
+
+update public.job_discrepancies
+set type = data ->> 'type',
+    priority_rank = case priority
+        when 'critical' then 0
+        when 'high' then 1
+        when 'medium' then 2
+        when 'low' then 3
+        when 'info' then 4
+        else 5
+    end
+where priority_rank is null;
+
+create index if not exists idx_job_discrepancies_value on public.job_discrepancies (job_id, value desc, id);
+create index if not exists idx_job_discrepancies_priority_rank on public.job_discrepancies (job_id, priority_rank, id);
+create index if not exists idx_job_discrepancies_due on public.job_discrepancies (job_id, due, id);
+create index if not exists idx_job_discrepancies_priority on public.job_discrepancies (job_id, priority);
+create index if not exists idx_job_discrepancies_customer on public.job_discrepancies (job_id, customer);
+create index if not exists idx_job_discrepancies_type on public.job_discrepancies (job_id, type);
+
+create or replace function public.job_discrepancy_totals(p_job_id uuid)
+returns jsonb
+language sql
+stable
+as $$
+    select jsonb_build_object(
+        'count', (select count(*) from public.job_discrepancies where job_id = p_job_id),
+        'total_value', (select coalesce(sum(value), 0) from public.job_discrepancies where job_id = p_job_id),
+        'by_priority', coalesce(
+            (
+                select jsonb_agg(
+                    jsonb_build_object('priority', t.priority, 'count', t.count, 'value', t.value)
+                    order by t.rank
+                )
+                from (
+                    select priority, min(priority_rank) as rank, count(*) as count, coalesce(sum(value), 0) as value
+                    from public.job_discrepancies
+                    where job_id = p_job_id
+                    group by priority
+                ) t
+            ),
+            '[]'::jsonb
+        ),
+        'by_customer', coalesce(
+            (
+                select jsonb_agg(
+                    jsonb_build_object('customer', t.customer, 'count', t.count, 'value', t.value)
+                    order by t.value desc, t.customer
+                )
+                from (
+                    select customer, count(*) as count, coalesce(sum(value), 0) as value
+                    from public.job_discrepancies
+                    where job_id = p_job_id
+                    group by customer
+                ) t
+            ),
+            '[]'::jsonb
+        )
+    );
+$$;
+
+grant execute on function public.job_discrepancy_totals(uuid) to service_role;
+
+-- The 'summary' projection no longer carries discrepancies; readers page
+-- through them (or read the totals) instead.
+create or replace function public.get_job_aggregate(
+    p_job_id uuid,
+    p_organization_id text default null,
+    p_projection text default 'full',
+    p_metric_keys text[] default null
+)
+returns jsonb
+language sql
+stable
+as $$
+    select jsonb_build_object(
+        'job', to_jsonb(j),
+        'stages', coalesce(
+            (select jsonb_agg(to_jsonb(s) order by s.sequence) from public.job_stages s where s.job_id = j.id),
+            '[]'::jsonb
+        ),
+        'documents', case when p_projection = 'status' then '[]'::jsonb else coalesce(
+            (select jsonb_agg(to_jsonb(d)) from public.job_documents d where d.job_id = j.id),
+            '[]'::jsonb
+        ) end,
+        'discrepancies', case when p_projection <> 'full' then '[]'::jsonb else coalesce(
+            (select jsonb_agg(to_jsonb(x)) from public.job_discrepancies x where x.job_id = j.id),
+            '[]'::jsonb
+        ) end,
+        'metrics', coalesce(
+            (
+                select case p_projection
+                    when 'status' then (
+                        select coalesce(jsonb_object_agg(e.key, e.value), '{}'::jsonb)
+                        from jsonb_each(m.metrics) e
+                        where e.key = any (p_metric_keys)
+                    )
+                    when 'summary' then case
+                        when jsonb_typeof(m.metrics -> 'documents') = 'array' then jsonb_set(
+                            m.metrics - 'chat_history',
+                            '{documents}',
+                            coalesce(
+                                (select jsonb_agg(doc - 'full_text') from jsonb_array_elements(m.metrics -> 'documents') doc),
+                                '[]'::jsonb
+                            )
+                        )
+                        else m.metrics - 'chat_history'
+                    end
+                    else m.metrics
+                end
+                from public.job_metrics m
+                where m.job_id = j.id
+            ),
+            '{}'::jsonb
+        )
+    )
+    from public.jobs j
+    where j.id = p_job_id
+        and (p_organization_id is null or j.organization_id = p_organization_id);
+$$;
@@ -0,0 +1,83 @@
+-- match_rag_chunks ranked the job's chunks with "where job_id = ... order by
+-- embedding <=> q limit k", which the planner serves from the global HNSW
+-- index: the index returns roughly hnsw.ef_search nearest rows across all
+-- jobs and the job filter is applied afterwards, so small jobs got few or no
+-- rows. The job's rows are now selected first through the job_id b-tree
+-- (materialized CTE, so the filter cannot be pushed below the index scan) and
+-- ranked exactly; a job holds at most a few thousand chunks. This works on
+-- every pgvector version, unlike hnsw.iterative_scan (>= 0.8).
+create or replace function public.match_rag_chunks(
+    query_embedding vector(1536),
+    match_job_id uuid,
+    match_count integer default 4,
+    match_tables text[] default array['contract_chunks', 'billing_chunks'],
+    match_vendor text default null,
+    match_source_type text default null
+)
+returns table (
+    id uuid,
+    source_table text,
+    job_id uuid,
+    vendor text,
+    source_type text,
+    filename text,
+    reference text,
+    text text,
+    metadata jsonb,
+    similarity double precision
+)
+language sql
+stable
+as $$
+    with job_chunks as materialized (
+        select
+            c.id,
+            'contract_chunks'::text as source_table,
+            c.job_id,
+            c.vendor,
+            c.source_type,
+            c.filename,
+            c.reference,
+            c.text,
+            c.metadata,
+            c.embedding
+        from public.contract_chunks c
+        where 'contract_chunks' = any (match_tables)
+            and c.job_id = match_job_id
+            and c.embedding is not null
+            and (match_vendor is null or c.vendor = match_vendor)
+            and (match_source_type is null or c.source_type = match_source_type)
+        union all
+        select
+            b.id,
+            'billing_chunks'::text,
+            b.job_id,
+            b.vendor,
+            b.source_type,
+            null::text,
+            b.reference,
+            b.text,
+            b.metadata,
+            b.embedding
+        from public.billing_chunks b
+        where 'billing_chunks' = any (match_tables)
+            and b.job_id = match_job_id
+            and b.embedding is not null
+            and (match_vendor is null or b.vendor = match_vendor)
+            and (match_source_type is null or b.source_type = match_source_type)
+    )
+    select
+        j.id,
+        j.source_table,
+        j.job_id,
+        j.vendor,
+        j.source_type,
+        j.filename,
+        j.reference,
+        j.text,
+        j.metadata,
+        1 - (j.embedding <=> query_embedding) as similarity
+    from job_chunks j
+    order by j.embedding <=> query_embedding
+    limit match_count;
+$$;
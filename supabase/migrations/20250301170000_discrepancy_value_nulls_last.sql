@@ -0,0 +1,7 @@
+-- Discrepancies sorted by value put rows without a value first (Postgres
+-- default for descending order), so they crowded out real amounts in the top
+-- rows and in the chat context. The API now orders by "value desc nulls last,
+-- id"; the index is rebuilt in that order so the keyset scan still walks it.
+drop index if exists public.idx_job_discrepancies_value;
+create index if not exists idx_job_discrepancies_value
+    on public.job_discrepancies (job_id, value desc nulls last, id);
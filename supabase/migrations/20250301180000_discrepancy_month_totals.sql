@@ -0,0 +1,89 @@
+-- The dashboard's leakage trend summed discrepancy values per invoice month
+-- and category from the rows it had loaded, which meant loading every page.
+-- The month (YYYY-MM of the invoice date, else the first dated evidence item)
+-- and the category (matched on the issue text) are now columns written with
+-- each row, and job_discrepancy_totals returns them grouped as 'by_month'.
+alter table public.job_discrepancies add column if not exists invoice_month text;
+alter table public.job_discrepancies add column if not exists leakage_category text;
+
+update public.job_discrepancies
+set invoice_month = coalesce(
+        substring(data->>'invoice_date' from '^(\d{4}-\d{2})-\d{2}'),
+        (
+            select substring(item->>'invoice_date' from '^(\d{4}-\d{2})-\d{2}')
+            from jsonb_array_elements(
+                case when jsonb_typeof(data->'evidence') = 'array' then data->'evidence' else '[]'::jsonb end
+            ) with ordinality as e(item, position)
+            where item->>'invoice_date' ~ '^\d{4}-\d{2}-\d{2}'
+            order by position
+            limit 1
+        )
+    ),
+    leakage_category = case
+        when lower(coalesce(issue, '')) like '%discount%' then 'discounts'
+        when lower(coalesce(issue, '')) like '%renewal%' then 'renewals'
+        else 'escalators'
+    end
+where leakage_category is null;
+
+create or replace function public.job_discrepancy_totals(p_job_id uuid)
+returns jsonb
+language sql
+stable
+as $$
+    select jsonb_build_object(
+        'count', (select count(*) from public.job_discrepancies where job_id = p_job_id),
+        'total_value', (select coalesce(sum(value), 0) from public.job_discrepancies where job_id = p_job_id),
+        'by_priority', coalesce(
+            (
+                select jsonb_agg(
+                    jsonb_build_object('priority', t.priority, 'count', t.count, 'value', t.value)
+                    order by t.rank
+                )
+                from (
+                    select priority, min(priority_rank) as rank, count(*) as count, coalesce(sum(value), 0) as value
+                    from public.job_discrepancies
+                    where job_id = p_job_id
+                    group by priority
+                ) t
+            ),
+            '[]'::jsonb
+        ),
+        'by_customer', coalesce(
+            (
+                select jsonb_agg(
+                    jsonb_build_object('customer', t.customer, 'count', t.count, 'value', t.value)
+                    order by t.value desc, t.customer
+                )
+                from (
+                    select customer, count(*) as count, coalesce(sum(value), 0) as value
+                    from public.job_discrepancies
+                    where job_id = p_job_id
+                    group by customer
+                ) t
+            ),
+            '[]'::jsonb
+        ),
+        'by_month', coalesce(
+            (
+                select jsonb_agg(
+                    jsonb_build_object('month', t.month, 'category', t.category, 'count', t.count, 'value', t.value)
+                    order by t.month, t.category
+                )
+                from (
+                    select
+                        invoice_month as month,
+                        coalesce(leakage_category, 'escalators') as category,
+                        count(*) as count,
+                        coalesce(sum(value), 0) as value
+                    from public.job_discrepancies
+                    where job_id = p_job_id and invoice_month is not null
+                    group by 1, 2
+                ) t
+            ),
+            '[]'::jsonb
+        )
+    );
+$$;
+
+grant execute on function public.job_discrepancy_totals(uuid) to service_role;
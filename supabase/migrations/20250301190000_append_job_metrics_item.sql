@@ -0,0 +1,36 @@
+-- Appends one item to a list-valued metrics key (e.g. chat_history) in a
+-- single statement, keeping the last p_limit entries. The conflicting row is
+-- locked by the upsert, so concurrent appends are applied one after another
+-- instead of each overwriting the list it read.
+create or replace function public.append_job_metrics_item(
+    p_job_id uuid,
+    p_key text,
+    p_item jsonb,
+    p_limit integer default null
+)
+returns void
+language sql
+volatile
+as $$
+    insert into public.job_metrics as m (job_id, metrics, updated_at)
+    values (p_job_id, jsonb_build_object(p_key, jsonb_build_array(p_item)), timezone('utc', now()))
+    on conflict (job_id) do update
+        set metrics = m.metrics || jsonb_build_object(
+                p_key,
+                (
+                    select coalesce(jsonb_agg(t.item order by t.position), '[]'::jsonb)
+                    from (
+                        select e.item, e.position
+                        from jsonb_array_elements(
+                            case when jsonb_typeof(m.metrics -> p_key) = 'array' then m.metrics -> p_key else '[]'::jsonb end
+                            || jsonb_build_array(p_item)
+                        ) with ordinality as e(item, position)
+                        order by e.position desc
+                        limit p_limit
+                    ) t
+                )
+            ),
+            updated_at = timezone('utc', now());
+$$;
+
+grant execute on function public.append_job_metrics_item(uuid, text, jsonb, integer) to service_role;
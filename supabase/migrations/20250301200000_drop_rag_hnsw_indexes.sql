@@ -0,0 +1,12 @@
+-- Intended path for RAG retrieval: match_rag_chunks selects the job's chunks
+-- through the job_id b-tree and ranks them with an exact cosine scan
+-- (20250301160000). A job holds at most a few thousand chunks, so the exact
+-- scan is cheap, has perfect recall and works on every pgvector version.
+--
+-- The HNSW indexes from 20250301090000 are no longer read by that function
+-- (the materialized CTE keeps the planner off them), yet every chunk insert
+-- still pays to maintain them, so they are dropped. If retrieval ever has to
+-- span jobs, recreate them and filter with hnsw.iterative_scan (pgvector
+-- >= 0.8) instead.
+drop index if exists public.contract_chunks_embedding_hnsw_idx;
+drop index if exists public.billing_chunks_embedding_hnsw_idx;